@@ -1,70 +1,280 @@
 import cv2
 import mediapipe as mp
 import time
+import sys
+import os
+import shutil
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+# Rende importabile il modulo condiviso `tracking_common` dalla radice del repository.
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from tracking_common.capture import FramePreprocessor
+from tracking_common.replay import open_source
+from tracking_common.inference import results_to_array
+from tracking_common.recording import LandmarkRecorder, SUFFIX as RECORDING_SUFFIX
 
 # --- IMPOSTAZIONI INIZIALI ---
 
+# Impostazioni della webcam: risoluzione, FPS e formato dei pixel vengono richiesti
+# esplicitamente invece di lasciarli scegliere al driver.
+# La sorgente si può cambiare dalla riga di comando: `python body_tracking.py video.mp4` rilegge
+# un video registrato, `python body_tracking.py synthetic` usa dei frame artificiali.
+# Con `--batch CARTELLA` lo script elabora invece tutti i video di una cartella (vedi sotto).
+CAMERA_WIDTH = 640
+CAMERA_HEIGHT = 480
+CAMERA_FPS = 30
+CAMERA_FOURCC = 'MJPG'
+
 # Inizializza MediaPipe per il disegno e per il modello Pose
 mp_drawing = mp.solutions.drawing_utils
 mp_pose = mp.solutions.pose  # <-- MODIFCA: Importiamo mp.solutions.pose
 
-# Inizializza la webcam usando OpenCV
-cap = cv2.VideoCapture(0)
-
-# Inizializza il contatore per il calcolo degli FPS (Frames Per Second)
-pTime = 0 # Previous time
-
-# --- LOGICA PRINCIPALE IN UN BLOCCO 'with' ---
-# Usiamo il modello Pose Landmarker di MediaPipe
-with mp_pose.Pose(  # <-- MODIFCA: Usiamo mp_pose.Pose
-    min_detection_confidence=0.5,  # Soglia di confidenza per rilevare una persona
-    min_tracking_confidence=0.5    # Soglia per continuare a tracciare la persona
-) as pose:  # <-- MODIFCA: Rinominiamo la variabile
-
-    # Ciclo principale: continua finché la webcam è aperta
-    while cap.isOpened():
-        # Legge un singolo fotogramma (frame) dalla webcam
-        success, image = cap.read()
-        if not success:
-            print("Impossibile accedere alla webcam.")
-            continue
+# --- MODALITÀ INTERATTIVA: WEBCAM E FINESTRA ---
 
-        # Per migliorare le performance, l'immagine viene prima elaborata
-        # OpenCV legge in formato BGR, MediaPipe si aspetta RGB
-        image = cv2.cvtColor(cv2.flip(image, 1), cv2.COLOR_BGR2RGB)
-        
-        # Passa l'immagine al modello MediaPipe per trovare la posa
-        results = pose.process(image)  # <-- MODIFCA: Chiamiamo pose.process()
+def run_interactive(source):
+    """Il ciclo interattivo: legge `source`, disegna la posa e la mostra in una finestra."""
+    # Inizializza la webcam usando OpenCV
+    cap = open_source(source, CAMERA_WIDTH, CAMERA_HEIGHT, CAMERA_FPS, CAMERA_FOURCC,
+                      replay_fps=CAMERA_FPS)
+    print(cap.describe())
+
+    # Specchia e converte i frame in buffer allocati una volta sola
+    preprocess = FramePreprocessor(mirror=True)
 
-        # Riconverti l'immagine in BGR per poterla mostrare con OpenCV
-        image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
+    # Inizializza il contatore per il calcolo degli FPS (Frames Per Second)
+    pTime = 0 # Previous time
+
+    # --- LOGICA PRINCIPALE IN UN BLOCCO 'with' ---
+    # Usiamo il modello Pose Landmarker di MediaPipe
+    with mp_pose.Pose(  # <-- MODIFCA: Usiamo mp_pose.Pose
+        min_detection_confidence=0.5,  # Soglia di confidenza per rilevare una persona
+        min_tracking_confidence=0.5    # Soglia per continuare a tracciare la persona
+    ) as pose:  # <-- MODIFCA: Rinominiamo la variabile
+
+        # Ciclo principale: continua finché la webcam è aperta
+        while cap.isOpened():
+            # Legge un singolo fotogramma (frame) dalla webcam
+            frame = cap.read()
+            if frame is None:
+                # Un video registrato (o la sorgente sintetica) è finito: usciamo dal ciclo.
+                if not str(source).isdigit():
+                    break
+                print("Impossibile accedere alla webcam.")
+                continue
+
+            # OpenCV legge in formato BGR, MediaPipe si aspetta RGB: il frame viene specchiato
+            # (image, BGR, per disegnare e mostrare) e convertito (image_rgb, per il modello)
+            image, image_rgb = preprocess(frame)
+        
+            # Passa l'immagine al modello MediaPipe per trovare la posa.
+            # Disegniamo direttamente su `image`, quindi non serve riconvertire da RGB a BGR.
+            results = pose.process(image_rgb)  # <-- MODIFCA: Chiamiamo pose.process()
 
-        # --- DISEGNO SULL'IMMAGINE ---
-        # Se il modello ha trovato una posa...
-        if results.pose_landmarks:  # <-- MODIFCA: Controlliamo results.pose_landmarks
+            # --- DISEGNO SULL'IMMAGINE ---
+            # Se il modello ha trovato una posa...
+            if results.pose_landmarks:  # <-- MODIFCA: Controlliamo results.pose_landmarks
             
-            # Disegna lo "scheletro" del corpo (le connessioni tra i punti)
-            mp_drawing.draw_landmarks(
-                image, 
-                results.pose_landmarks,       # <-- MODIFCA: Usiamo i landmark della posa
-                mp_pose.POSE_CONNECTIONS)     # <-- MODIFCA: Usiamo le connessioni della posa
-
-        # --- CALCOLO E VISUALIZZAZIONE DEGLI FPS ---
-        cTime = time.time() # Current time
-        fps = 1 / (cTime - pTime)
-        pTime = cTime
-        # Scrivi il valore degli FPS sull'immagine
-        cv2.putText(image, f'FPS: {int(fps)}', (10, 50), cv2.FONT_HERSHEY_PLAIN, 3, (255, 0, 255), 3)
-
-        # Mostra l'immagine elaborata in una finestra chiamata "Riconoscimento Posa"
-        cv2.imshow('Riconoscimento Posa MediaPipe', image) # <-- MODIFCA: Nome finestra
-
-        # Interrompi il ciclo se viene premuto il tasto 'q'
-        if cv2.waitKey(5) & 0xFF == ord('q'):
-            break
-
-# --- PULIZIA FINALE ---
-# Rilascia la risorsa della webcam
-cap.release()
-# Chiude tutte le finestre di OpenCV
-cv2.destroyAllWindows()
+                # Disegna lo "scheletro" del corpo (le connessioni tra i punti)
+                mp_drawing.draw_landmarks(
+                    image, 
+                    results.pose_landmarks,       # <-- MODIFCA: Usiamo i landmark della posa
+                    mp_pose.POSE_CONNECTIONS)     # <-- MODIFCA: Usiamo le connessioni della posa
+
+            # --- CALCOLO E VISUALIZZAZIONE DEGLI FPS ---
+            cTime = time.time() # Current time
+            fps = 1 / (cTime - pTime)
+            pTime = cTime
+            # Scrivi il valore degli FPS sull'immagine
+            cv2.putText(image, f'FPS: {int(fps)}', (10, 50), cv2.FONT_HERSHEY_PLAIN, 3, (255, 0, 255), 3)
+
+            # Mostra l'immagine elaborata in una finestra chiamata "Riconoscimento Posa"
+            cv2.imshow('Riconoscimento Posa MediaPipe', image) # <-- MODIFCA: Nome finestra
+
+            # Interrompi il ciclo se viene premuto il tasto 'q'
+            if cv2.waitKey(5) & 0xFF == ord('q'):
+                break
+
+    # --- PULIZIA FINALE ---
+    # Rilascia la risorsa della webcam
+    cap.release()
+    # Chiude tutte le finestre di OpenCV
+    cv2.destroyAllWindows()
+
+
+# --- MODALITÀ BATCH: TANTI VIDEO REGISTRATI, SENZA FINESTRE ---
+#
+# `python body_tracking.py --batch sessioni/ --output pose/` estrae la posa da tutti i video di
+# una cartella (e delle sottocartelle) e salva i landmark di ogni video in una registrazione
+# (vedi tracking_common/recording.py), alla massima velocità: niente finestra, niente
+# `waitKey`, niente specchiatura, e un video per processo su tutti i core.
+
+# Estensioni dei file considerati video.
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv', '.webm', '.m4v')
+
+# Con `--static-image-mode auto`: sotto questi frame al secondo (FPS del video / stride) i
+# frame elaborati sono troppo distanti nel tempo perché il tracciamento di MediaPipe
+# (che cerca la persona dove era nel frame precedente) funzioni, e ogni frame viene
+# trattato come un'immagine a sé. Sopra, il tracciamento evita il rilevamento completo
+# su quasi tutti i frame ed è molto più veloce.
+STATIC_BELOW_FPS = 10
+
+
+def extract_poses(video, output, stride=1, scale=1.0, static_image_mode=None, model_complexity=1):
+    """
+    Estrae la posa da un video (un frame ogni `stride`) e la registra in `output`.
+
+    Viene eseguita nei processi del pool. La registrazione viene scritta in una cartella
+    `.partial` e rinominata solo alla fine: un'elaborazione interrotta non lascia mai una
+    registrazione incompleta con il nome definitivo.
+
+    Args:
+        video: Percorso del video
+        output: Cartella della registrazione da creare
+        stride: Elabora un frame ogni `stride` (gli altri vengono solo decodificati)
+        scale: Fattore di riduzione dei frame prima del modello (1.0 = dimensioni originali)
+        static_image_mode: True/False, o None per sceglierlo in base agli FPS elaborati
+        model_complexity: 0, 1 o 2 (modello più leggero o più preciso)
+
+    Returns:
+        Dizionario con frame elaborati, frame con una posa, secondi impiegati e modalità usata.
+    """
+    start = time.perf_counter()
+    # Un processo per core: i thread interni di OpenCV si contenderebbero i core con gli altri processi.
+    cv2.setNumThreads(1)
+    capture = cv2.VideoCapture(str(video))
+    if not capture.isOpened():
+        raise OSError(f"Impossibile aprire il video {video}")
+    fps = capture.get(cv2.CAP_PROP_FPS) or CAMERA_FPS
+    if static_image_mode is None:
+        static_image_mode = fps / stride < STATIC_BELOW_FPS
+
+    output = Path(output)
+    partial = output.with_name(output.name + '.partial')
+    shutil.rmtree(partial, ignore_errors=True)
+    metadata = {'source': str(video), 'fps': fps, 'stride': stride, 'scale': scale,
+                'static_image_mode': static_image_mode, 'model_complexity': model_complexity}
+
+    processed = detected = 0
+    # Buffer riutilizzati da un frame all'altro: il frame letto, quello ridotto e quello RGB.
+    frame = small = rgb = None
+    with mp_pose.Pose(static_image_mode=static_image_mode, model_complexity=model_complexity,
+                      min_detection_confidence=0.5, min_tracking_confidence=0.5) as pose, \
+            LandmarkRecorder(partial, model='pose', metadata=metadata) as recorder:
+        index = 0
+        # `grab()` avanza di un frame senza convertirlo in immagine: i frame saltati dallo
+        # stride costano solo la decodifica; `retrieve()` completa la lettura di quelli elaborati.
+        while capture.grab():
+            if index % stride == 0:
+                success, frame = capture.retrieve(frame)
+                if not success:
+                    break
+                image = frame
+                if scale != 1.0:
+                    size = (max(1, round(frame.shape[1] * scale)), max(1, round(frame.shape[0] * scale)))
+                    small = cv2.resize(frame, size, dst=small, interpolation=cv2.INTER_AREA)
+                    image = small
+                rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB, dst=rgb)
+                # I landmark sono normalizzati (0-1): la riduzione non cambia le coordinate.
+                landmarks = results_to_array('pose', pose.process(rgb))
+                # Il tempo è quello del video, non dell'elaborazione.
+                recorder.append(landmarks, timestamp=index / fps)
+                processed += 1
+                detected += len(landmarks)
+            index += 1
+    capture.release()
+
+    shutil.rmtree(output, ignore_errors=True)
+    partial.rename(output)
+    return {
+        'frames': processed,
+        'detected': detected,
+        'seconds': time.perf_counter() - start,
+        'static_image_mode': static_image_mode,
+    }
+
+
+def run_batch(args):
+    """Elabora tutti i video di `args.batch` con un pool di processi."""
+    root = Path(args.batch)
+    output_root = Path(args.output)
+    videos = sorted(path for path in root.rglob('*')
+                    if path.suffix.lower() in VIDEO_EXTENSIONS and path.is_file())
+    # La struttura delle cartelle viene ricopiata: sessioni/a/1.mp4 -> pose/a/1.mp4.landmarks.
+    tasks = []
+    for video in videos:
+        relative = video.relative_to(root)
+        output = output_root / relative.parent / (relative.name + RECORDING_SUFFIX)
+        # Le registrazioni già complete vengono saltate: un'elaborazione interrotta riparte da dove era.
+        if not args.overwrite and (output / 'meta.json').exists():
+            continue
+        output.parent.mkdir(parents=True, exist_ok=True)
+        tasks.append((video, output))
+
+    static = {'auto': None, 'on': True, 'off': False}[args.static_image_mode]
+    print(f"[BATCH] {len(videos)} video in {root}, {len(videos) - len(tasks)} già elaborati; "
+          f"{args.workers} processi, stride {args.stride}, scala {args.scale}, "
+          f"static_image_mode {args.static_image_mode}")
+
+    start = time.perf_counter()
+    total_frames = failed = 0
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = {
+            pool.submit(extract_poses, video, output, args.stride, args.scale, static, args.model_complexity): video
+            for video, output in tasks
+        }
+        for done, future in enumerate(as_completed(futures), 1):
+            name = futures[future].relative_to(root)
+            try:
+                result = future.result()
+            except Exception as e:
+                failed += 1
+                print(f"[ERRORE] {done}/{len(tasks)} {name}: {e}")
+                continue
+            total_frames += result['frames']
+            speed = result['frames'] / result['seconds'] if result['seconds'] else 0
+            print(f"[BATCH] {done}/{len(tasks)} {name}: {result['frames']} frame, "
+                  f"{result['detected']} con una posa, {speed:.0f} FPS "
+                  f"(static_image_mode {result['static_image_mode']})")
+
+    elapsed = time.perf_counter() - start
+    print(f"\n[RIEPILOGO] {len(tasks) - failed} video e {total_frames} frame in {elapsed:.1f} s "
+          f"({total_frames / elapsed if elapsed else 0:.0f} frame/s in totale), {failed} errori.")
+    return 1 if failed else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Riconoscimento della posa: dalla webcam in una finestra, o da una cartella di video in batch.")
+    parser.add_argument('source', nargs='?', default='0',
+                        help="Modalità interattiva: indice della webcam, video o 'synthetic' (predefinito: 0)")
+    parser.add_argument('--batch', metavar='CARTELLA',
+                        help="Elabora tutti i video della cartella senza finestre")
+    parser.add_argument('--output', default='pose_landmarks',
+                        help="Batch: cartella delle registrazioni (predefinito: pose_landmarks)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="Batch: processi in parallelo (predefinito: uno per core)")
+    parser.add_argument('--stride', type=int, default=1,
+                        help="Batch: elabora un frame ogni N (predefinito: 1, tutti)")
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help="Batch: riduce i frame di questo fattore prima del modello (es. 0.5)")
+    parser.add_argument('--static-image-mode', choices=('auto', 'on', 'off'), default='auto',
+                        help=f"Batch: 'on' rileva la posa da zero in ogni frame, 'off' la traccia tra "
+                             f"un frame e l'altro; 'auto' sceglie 'on' sotto {STATIC_BELOW_FPS} FPS elaborati")
+    parser.add_argument('--model-complexity', type=int, choices=(0, 1, 2), default=1,
+                        help="Batch: 0 = più veloce, 2 = più preciso (predefinito: 1)")
+    parser.add_argument('--overwrite', action='store_true',
+                        help="Batch: rielabora anche i video con una registrazione già completa")
+    args = parser.parse_args()
+
+    if args.batch is None:
+        run_interactive(args.source)
+        return 0
+    if args.stride < 1 or not 0 < args.scale <= 1:
+        parser.error("--stride deve essere almeno 1 e --scale compreso tra 0 (escluso) e 1")
+    return run_batch(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
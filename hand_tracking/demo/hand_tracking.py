@@ -1,16 +1,38 @@
 import cv2
 import mediapipe as mp
 import time
+import sys
+from pathlib import Path
+
+# Rende importabile il modulo condiviso `tracking_common` dalla radice del repository.
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from tracking_common.capture import FramePreprocessor
+from tracking_common.replay import open_source
 
 # --- IMPOSTAZIONI INIZIALI ---
 
+# Impostazioni della webcam: risoluzione, FPS e formato dei pixel vengono richiesti
+# esplicitamente invece di lasciarli scegliere al driver.
+# La sorgente si può cambiare dalla riga di comando: `python hand_tracking.py video.mp4` rilegge
+# un video registrato, `python hand_tracking.py synthetic` usa dei frame artificiali.
+CAMERA_SOURCE = sys.argv[1] if len(sys.argv) > 1 else 0
+CAMERA_WIDTH = 640
+CAMERA_HEIGHT = 480
+CAMERA_FPS = 30
+CAMERA_FOURCC = 'MJPG'
+
 # Inizializza MediaPipe per il disegno degli "scheletri" e dei punti
 mp_drawing = mp.solutions.drawing_utils
 mp_hands = mp.solutions.hands
 
 # Inizializza la webcam usando OpenCV
 # Il numero '0' si riferisce alla webcam predefinita del tuo computer
-cap = cv2.VideoCapture(0)
+cap = open_source(CAMERA_SOURCE, CAMERA_WIDTH, CAMERA_HEIGHT, CAMERA_FPS, CAMERA_FOURCC,
+                  replay_fps=CAMERA_FPS)
+print(cap.describe())
+
+# Specchia e converte i frame in buffer allocati una volta sola
+preprocess = FramePreprocessor(mirror=True)
 
 # Inizializza il contatore per il calcolo degli FPS (Frames Per Second)
 pTime = 0 # Previous time
@@ -25,20 +47,21 @@ with mp_hands.Hands(
     # Ciclo principale: continua finché la webcam è aperta
     while cap.isOpened():
         # Legge un singolo fotogramma (frame) dalla webcam
-        success, image = cap.read()
-        if not success:
+        frame = cap.read()
+        if frame is None:
+            # Un video registrato (o la sorgente sintetica) è finito: usciamo dal ciclo.
+            if not str(CAMERA_SOURCE).isdigit():
+                break
             print("Impossibile accedere alla webcam.")
             continue
 
-        # Per migliorare le performance, l'immagine viene prima elaborata
-        # OpenCV legge in formato BGR, MediaPipe si aspetta RGB
-        image = cv2.cvtColor(cv2.flip(image, 1), cv2.COLOR_BGR2RGB)
+        # OpenCV legge in formato BGR, MediaPipe si aspetta RGB: il frame viene specchiato
+        # (image, BGR, per disegnare e mostrare) e convertito (image_rgb, per il modello)
+        image, image_rgb = preprocess(frame)
         
-        # Passa l'immagine al modello MediaPipe per trovare le mani
-        results = hands.process(image)
-
-        # Riconverti l'immagine in BGR per poterla mostrare con OpenCV
-        image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
+        # Passa l'immagine al modello MediaPipe per trovare le mani.
+        # Disegniamo direttamente su `image`, quindi non serve riconvertire da RGB a BGR.
+        results = hands.process(image_rgb)
 
         # --- DISEGNO SULL'IMMAGINE ---
         # Se il modello ha trovato almeno una mano...
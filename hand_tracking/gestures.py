@@ -0,0 +1,166 @@
+# --- MOTORE DEI GESTI VETTORIALIZZATO ---
+#
+# Questo modulo riconosce i gesti "pinch" (due punte di dita che si toccano) su tutte
+# le mani di un frame con poche operazioni NumPy, invece di un ciclo Python per ogni
+# dito e ogni mano. I landmark di tutte le mani diventano un unico array di forma
+# (mani, 21, 3) e tutte le distanze tra le coppie di dita dei gesti configurati vengono
+# calcolate in una sola operazione: aggiungere decine di gesti non aggiunge cicli.
+
+import numpy as np
+
+
+# --- 1. INDICI DEI LANDMARK ---
+
+# I numeri dei 21 landmark della mano usati più spesso (gli stessi di mp_hands.HandLandmark).
+# Li ridefiniamo qui per non dover importare MediaPipe solo per delle costanti.
+WRIST = 0
+THUMB_TIP = 4
+INDEX_FINGER_TIP = 8
+MIDDLE_FINGER_TIP = 12
+RING_FINGER_TIP = 16
+PINKY_TIP = 20
+
+# Numero di landmark per mano.
+HAND_POINTS = 21
+
+
+# --- 2. CONVERSIONE DEI LANDMARK IN ARRAY ---
+
+def landmarks_to_array(multi_landmarks, points=HAND_POINTS):
+    """
+    Converte i landmark di MediaPipe (una lista di mani) in un array NumPy.
+
+    Args:
+        multi_landmarks: `results.multi_hand_landmarks` (o una lista di pose), anche None
+        points: Numero di landmark per mano (21 per le mani, 33 per la posa)
+
+    Returns:
+        Array float32 di forma (mani, points, 3) con le coordinate (x, y, z) normalizzate.
+        Senza mani la forma è (0, points, 3).
+    """
+    if not multi_landmarks:
+        return np.empty((0, points, 3), dtype=np.float32)
+    return np.array(
+        [[(point.x, point.y, point.z) for point in hand.landmark] for hand in multi_landmarks],
+        dtype=np.float32
+    )
+
+
+# --- 3. DEFINIZIONE DI UN GESTO ---
+
+class PinchGesture:
+    """
+    Un gesto "pinch": la distanza tra due landmark scende sotto una soglia.
+
+    - threshold: soglia (in coordinate normalizzate, 0-1) sotto cui il gesto inizia.
+    - release_threshold: soglia sopra cui il gesto finisce (isteresi). Deve essere
+      >= threshold: tra le due soglie il gesto resta nello stato in cui si trova, così
+      il rumore del tracciamento vicino alla soglia non lo fa scattare più volte.
+    - frames: numero di frame consecutivi in cui la condizione deve valere prima che
+      il gesto venga segnalato (debounce contro i falsi positivi di un singolo frame).
+    """
+
+    def __init__(self, name, point_a, point_b, threshold, release_threshold=None, frames=1):
+        if release_threshold is None:
+            release_threshold = threshold
+        if release_threshold < threshold:
+            raise ValueError(f"Gesto '{name}': release_threshold deve essere >= threshold")
+        if frames < 1:
+            raise ValueError(f"Gesto '{name}': frames deve essere almeno 1")
+        self.name = name
+        self.point_a = point_a
+        self.point_b = point_b
+        self.threshold = threshold
+        self.release_threshold = release_threshold
+        self.frames = frames
+
+    def __repr__(self):
+        return f"PinchGesture({self.name!r}, {self.point_a}, {self.point_b}, {self.threshold})"
+
+
+# Gesti della web app: il pollice tocca indice, medio, anulare o mignolo (azioni 1-4).
+# Soglia 0.05 trovata empiricamente, come nella versione originale con math.sqrt.
+DEFAULT_GESTURES = [
+    PinchGesture("Azione 1", THUMB_TIP, INDEX_FINGER_TIP, 0.05),
+    PinchGesture("Azione 2", THUMB_TIP, MIDDLE_FINGER_TIP, 0.05),
+    PinchGesture("Azione 3", THUMB_TIP, RING_FINGER_TIP, 0.05),
+    PinchGesture("Azione 4", THUMB_TIP, PINKY_TIP, 0.05),
+]
+
+
+# --- 4. IL MOTORE ---
+
+class GestureEngine:
+    """
+    Valuta tutti i gesti su tutte le mani di un frame con operazioni vettoriali.
+
+    Le definizioni dei gesti vengono trasformate una volta sola in array di indici e
+    soglie; a ogni frame `update` calcola la matrice delle distanze (mani × gesti) e
+    aggiorna lo stato di isteresi e debounce di ogni coppia (mano, gesto).
+    Le mani sono identificate dalla loro posizione nella lista di MediaPipe.
+    """
+
+    def __init__(self, gestures=None, max_hands=2):
+        self.gestures = list(gestures if gestures is not None else DEFAULT_GESTURES)
+        self.names = [gesture.name for gesture in self.gestures]
+        self.max_hands = max_hands
+        # Un array per ogni campo delle definizioni, nell'ordine dei gesti.
+        self.point_a = np.array([g.point_a for g in self.gestures], dtype=np.intp)
+        self.point_b = np.array([g.point_b for g in self.gestures], dtype=np.intp)
+        self.threshold = np.array([g.threshold for g in self.gestures], dtype=np.float32)
+        self.release = np.array([g.release_threshold for g in self.gestures], dtype=np.float32)
+        self.frames = np.array([g.frames for g in self.gestures], dtype=np.int32)
+        self.reset()
+
+    def reset(self):
+        """Azzera lo stato di tutti i gesti (es. quando il riconoscimento viene riattivato)."""
+        shape = (self.max_hands, len(self.gestures))
+        self.active = np.zeros(shape, dtype=bool)      # Gesto in corso (già segnalato).
+        self.streak = np.zeros(shape, dtype=np.int32)  # Frame consecutivi sotto soglia.
+
+    def distances(self, hands):
+        """
+        Distanze 2D (x, y) tra le coppie di landmark di ogni gesto, per ogni mano.
+
+        Args:
+            hands: Array (mani, 21, 3) da landmarks_to_array
+
+        Returns:
+            Array (mani, gesti)
+        """
+        # Indicizzazione "fancy": (mani, gesti, 2) per entrambi i punti in un colpo solo.
+        delta = hands[:, self.point_a, :2] - hands[:, self.point_b, :2]
+        return np.sqrt(np.einsum('hgk,hgk->hg', delta, delta))
+
+    def update(self, hands):
+        """
+        Aggiorna lo stato con i landmark di un nuovo frame.
+
+        Args:
+            hands: Array (mani, 21, 3) da landmarks_to_array
+
+        Returns:
+            Lista di tuple (indice_mano, nome_gesto) dei gesti appena iniziati in questo
+            frame, ordinate per mano e poi per ordine di definizione dei gesti.
+        """
+        n_hands = min(len(hands), self.max_hands)
+        # Le mani non più presenti perdono il loro stato.
+        self.active[n_hands:] = False
+        self.streak[n_hands:] = 0
+        if n_hands == 0 or not self.gestures:
+            return []
+
+        dist = self.distances(hands[:n_hands])
+        active = self.active[:n_hands]
+        # Isteresi: un gesto attivo resta tale finché la distanza non supera la soglia
+        # di rilascio; uno inattivo parte solo sotto la soglia di attivazione.
+        touching = np.where(active, dist < self.release, dist < self.threshold)
+        # Debounce: conta i frame consecutivi in cui le dita si toccano.
+        streak = np.where(touching, self.streak[:n_hands] + 1, 0)
+        started = touching & ~active & (streak >= self.frames)
+
+        self.streak[:n_hands] = streak
+        self.active[:n_hands] = np.where(touching, active | started, False)
+
+        hand_idx, gesture_idx = np.nonzero(started)
+        return [(int(h), self.names[g]) for h, g in zip(hand_idx, gesture_idx)]
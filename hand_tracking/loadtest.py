@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Test di carico per lo streaming MJPEG della web app (/video_feed).
+
+Apre un numero crescente di "spettatori" simultanei (connessioni HTTP che leggono il
+flusso MJPEG come farebbe un tag <img>), misura per ognuno i frame al secondo ricevuti
+e riporta fino a quanti spettatori il server regge la frequenza minima richiesta.
+Non servono librerie oltre a quella standard: lo si può lanciare da qualsiasi macchina.
+
+Esempi (con la web app già avviata, es. HAND_TRACKING_SERVER=eventlet python webapp.py):
+    python loadtest.py
+    python loadtest.py --url http://192.168.1.20:8888 --viewers 1,10,50,100 --duration 15
+    python loadtest.py --viewers 5,20,50 --min-fps 15
+"""
+
+import argparse
+import http.client
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+import numpy as np
+
+
+# Il separatore tra i frame usato da `generate_frames` nella web app.
+BOUNDARY = b'--frame\r\n'
+
+# Quanto attendere (in secondi) un dato dal server prima di considerare lo spettatore bloccato.
+READ_TIMEOUT = 5.0
+
+# Pausa tra un gradino e l'altro, per dare al server il tempo di chiudere le connessioni.
+STEP_PAUSE = 2.0
+
+
+class Viewer(threading.Thread):
+    """
+    Uno spettatore: legge il flusso MJPEG e conta i frame ricevuti.
+
+    I frame vengono contati dai separatori nel flusso, senza decodificare i JPEG:
+    il client deve costare poco, altrimenti misureremmo lui invece del server.
+    """
+
+    def __init__(self, url, stop_event):
+        super().__init__(daemon=True)
+        self.url = urlsplit(url)
+        self.stop_event = stop_event
+        self.frame_times = []   # Istante di arrivo di ogni frame.
+        self.bytes = 0
+        self.error = None
+        self.started = None
+
+    def run(self):
+        connection = http.client.HTTPConnection(self.url.hostname, self.url.port or 80,
+                                                timeout=READ_TIMEOUT)
+        self.started = time.perf_counter()
+        try:
+            connection.request('GET', self.url.path or '/')
+            response = connection.getresponse()
+            if response.status != 200:
+                self.error = f"HTTP {response.status}"
+                return
+            # Gli ultimi byte del blocco precedente: un separatore può arrivare spezzato in due.
+            tail = b''
+            while not self.stop_event.is_set():
+                # `read1` restituisce i byte già arrivati invece di aspettarne un numero fisso.
+                chunk = response.read1(65536)
+                if not chunk:
+                    self.error = "connessione chiusa dal server"
+                    return
+                self.bytes += len(chunk)
+                data = tail + chunk
+                now = time.perf_counter()
+                self.frame_times.extend([now] * data.count(BOUNDARY))
+                tail = data[-(len(BOUNDARY) - 1):]
+        except OSError as e:
+            # Comprende i timeout: il server non ha inviato nulla per READ_TIMEOUT secondi.
+            self.error = str(e) or type(e).__name__
+        finally:
+            connection.close()
+
+    def fps(self, since):
+        """Frame al secondo ricevuti dall'istante `since` (esclude l'avvio della connessione)."""
+        times = [t for t in self.frame_times if t >= since]
+        if len(times) < 2:
+            return 0.0
+        return (len(times) - 1) / (times[-1] - times[0])
+
+    def first_frame_delay(self):
+        return self.frame_times[0] - self.started if self.frame_times else None
+
+
+def run_step(url, n_viewers, duration, warmup):
+    """
+    Mantiene `n_viewers` spettatori connessi per `warmup + duration` secondi.
+
+    Returns:
+        Dizionario con FPS per spettatore (mediana, 10° percentile, minimo), traffico
+        totale, tempo medio al primo frame ed errori.
+    """
+    stop_event = threading.Event()
+    viewers = [Viewer(url, stop_event) for _ in range(n_viewers)]
+    for viewer in viewers:
+        viewer.start()
+    time.sleep(warmup)
+    since = time.perf_counter()
+    bytes_before = sum(viewer.bytes for viewer in viewers)
+    time.sleep(duration)
+    bytes_after = sum(viewer.bytes for viewer in viewers)
+    stop_event.set()
+    for viewer in viewers:
+        viewer.join(READ_TIMEOUT + 1)
+
+    fps = np.array([viewer.fps(since) for viewer in viewers])
+    delays = [d for d in (viewer.first_frame_delay() for viewer in viewers) if d is not None]
+    errors = [viewer.error for viewer in viewers if viewer.error]
+    return {
+        'viewers': n_viewers,
+        'fps_median': float(np.median(fps)),
+        'fps_p10': float(np.percentile(fps, 10)),
+        'fps_min': float(fps.min()),
+        'total_mbps': (bytes_after - bytes_before) * 8 / duration / 1e6,
+        'first_frame_s': float(np.mean(delays)) if delays else None,
+        'errors': errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Test di carico per lo streaming MJPEG della web app di hand tracking.",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__.split('Esempi', 1)[1].join(('Esempi', '')),
+    )
+    parser.add_argument('--url', default='http://localhost:8888',
+                        help="Indirizzo della web app (predefinito: http://localhost:8888)")
+    parser.add_argument('--viewers', default='1,5,10,25,50',
+                        help="Spettatori simultanei per ogni gradino, separati da virgole "
+                             "(predefinito: 1,5,10,25,50)")
+    parser.add_argument('--duration', type=float, default=10.0,
+                        help="Secondi di misura per gradino (predefinito: 10)")
+    parser.add_argument('--warmup', type=float, default=2.0,
+                        help="Secondi esclusi dalla misura all'inizio di ogni gradino (predefinito: 2)")
+    parser.add_argument('--min-fps', type=float, default=10.0,
+                        help="FPS minimi che il 90%% degli spettatori deve ricevere perché il "
+                             "gradino sia considerato sostenuto (predefinito: 10)")
+    args = parser.parse_args()
+
+    try:
+        steps = [int(n) for n in args.viewers.split(',')]
+    except ValueError:
+        print(f"[ERRORE] --viewers non valido: '{args.viewers}' (atteso es. 1,5,10)")
+        return 1
+    feed_url = args.url.rstrip('/') + '/video_feed'
+
+    print(f"[CARICO] {feed_url}: gradini {steps}, {args.duration:.0f} s ciascuno, "
+          f"soglia {args.min_fps:.0f} FPS")
+    print(f"\n{'spettatori':>10}{'FPS med':>9}{'FPS p10':>9}{'FPS min':>9}{'Mbit/s':>9}"
+          f"{'1° frame':>10}{'errori':>8}")
+    sustained = 0
+    for n in steps:
+        result = run_step(feed_url, n, args.duration, args.warmup)
+        first = f"{result['first_frame_s']:.2f} s" if result['first_frame_s'] is not None else "-"
+        print(f"{n:>10}{result['fps_median']:>9.1f}{result['fps_p10']:>9.1f}{result['fps_min']:>9.1f}"
+              f"{result['total_mbps']:>9.1f}{first:>10}{len(result['errors']):>8}")
+        for error in sorted(set(result['errors'])):
+            print(f"{'':>10}  [ERRORE] {error}")
+        if result['errors'] or result['fps_p10'] < args.min_fps:
+            break
+        sustained = n
+        time.sleep(STEP_PAUSE)
+
+    if sustained:
+        print(f"\n[RISULTATO] Il server sostiene almeno {sustained} spettatori a {args.min_fps:.0f} FPS.")
+    else:
+        print(f"\n[RISULTATO] Il server non sostiene nemmeno {steps[0]} spettatori a {args.min_fps:.0f} FPS.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
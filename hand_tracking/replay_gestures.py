@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Rilegge una registrazione di landmark nel motore dei gesti, senza telecamera.
+
+Le registrazioni si ottengono avviando la web app con HAND_TRACKING_RECORD_DIR (vedi
+tracking_common/recording.py). Il motore riceve i frame uno dopo l'altro alla massima
+velocità, come se arrivassero dal modello: si possono provare soglie e debounce dei
+gesti su una sessione vera in una frazione del tempo che è durata.
+
+Esempi (dalla cartella hand_tracking):
+    python replay_gestures.py registrazioni/camera0-20250101-120000.landmarks
+    python replay_gestures.py sessione.landmarks --quiet
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+from gestures import GestureEngine, DEFAULT_GESTURES
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from tracking_common.recording import LandmarkRecording
+
+
+def replay(recording, engine, verbose=True):
+    """
+    Passa tutti i frame della registrazione a `engine.update`.
+
+    Returns:
+        Lista di tuple (tempo, indice_mano, nome_gesto) dei gesti riconosciuti.
+    """
+    detected = []
+    for timestamp, hands in recording.frames():
+        for hand, name in engine.update(hands):
+            detected.append((timestamp, hand, name))
+            if verbose:
+                print(f"{timestamp:>10.2f} s  mano {hand}  {name}")
+    return detected
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Rilegge una registrazione di landmark nel motore dei gesti.",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__.split('Esempi', 1)[1].join(('Esempi', '')),
+    )
+    parser.add_argument('path', help="Cartella della registrazione (.landmarks)")
+    parser.add_argument('--max-hands', type=int, default=2,
+                        help="Mani seguite dal motore (predefinito: 2, come nella web app)")
+    parser.add_argument('--quiet', action='store_true',
+                        help="Stampa solo il riepilogo, non ogni gesto")
+    args = parser.parse_args()
+
+    recording = LandmarkRecording(args.path)
+    if recording.model != 'hands':
+        print(f"[ERRORE] {args.path}: registrazione del modello '{recording.model}', servono le mani")
+        return 1
+
+    engine = GestureEngine(DEFAULT_GESTURES, max_hands=args.max_hands)
+    start = time.perf_counter()
+    detected = replay(recording, engine, verbose=not args.quiet)
+    elapsed = time.perf_counter() - start
+
+    speed = recording.frame_count / elapsed if elapsed else float('inf')
+    print(f"\n[RIEPILOGO] {recording.frame_count} frame ({recording.duration:.1f} s di sessione) "
+          f"in {elapsed:.2f} s: {speed:.0f} frame/s")
+    for name in engine.names:
+        print(f"  {name:<12}{sum(1 for _, _, gesture in detected if gesture == name):>6}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
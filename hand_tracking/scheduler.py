@@ -0,0 +1,238 @@
+# --- SCHEDULER DELL'INFERENZA: RILEVAMENTO COMPLETO, ROI E FRAME SALTATI ---
+#
+# Sui dispositivi poco potenti il collo di bottiglia è `hands.process`, eseguito su ogni
+# frame intero alla risoluzione della webcam. Questo modulo decide, frame per frame,
+# quanto lavoro fare:
+#
+# - 'full': inferenza sul frame intero. Ogni `detect_every` frame, quando nessuna mano
+#   è tracciata, oppure quando c'è movimento FUORI dalla zona della mano (una nuova
+#   mano potrebbe essere entrata nell'inquadratura).
+# - 'roi': inferenza solo su un ritaglio quadrato intorno alla posizione prevista della
+#   mano (Region Of Interest), ridotto a `roi_size` pixel di lato.
+# - 'skip': nessuna inferenza; i landmark vengono previsti dalla velocità con cui la
+#   mano si stava muovendo (`skip_frames` frame saltati tra due inferenze).
+#
+# Il modulo lavora con array NumPy (mani, 21, 3) in coordinate normalizzate sul frame
+# intero, quindi i landmark trovati nel ritaglio vengono riportati sul frame completo.
+
+import time
+
+import cv2
+import numpy as np
+
+from gestures import landmarks_to_array
+
+
+# Lato (in pixel) dell'immagine in miniatura usata per rilevare il movimento.
+MOTION_SIZE = (64, 48)
+
+# Modalità dello scheduler, nell'ordine in cui compaiono nelle statistiche.
+MODES = ('full', 'roi', 'skip')
+
+
+class InferenceScheduler:
+    """
+    Sceglie per ogni frame tra inferenza completa, su ROI o nessuna inferenza.
+
+    Args:
+        detect: Funzione (frame_rgb) -> multi_hand_landmarks per il frame intero
+        track: Funzione (ritaglio_rgb) -> multi_hand_landmarks per la ROI, o None per
+               usare sempre `detect` (con un modello separato conviene: vedi webapp.py)
+        detect_every: Un rilevamento completo ogni N frame (1 = sempre, come senza scheduler)
+        skip_frames: Frame senza inferenza tra due inferenze su ROI (0 = nessuno)
+        roi_size: Lato massimo in pixel del ritaglio passato al modello
+        roi_margin: Margine aggiunto intorno alle mani, in frazione della loro dimensione
+        motion_threshold: Differenza media (0-255) fuori dalla ROI che forza un rilevamento completo
+        max_roi_fraction: Se la ROI copre più di questa frazione del frame, si usa il frame intero
+        to_array: Funzione che converte multi_hand_landmarks in un array (mani, 21, 3)
+    """
+
+    def __init__(self, detect, track=None, detect_every=10, skip_frames=0, roi_size=256,
+                 roi_margin=0.25, motion_threshold=12.0, max_roi_fraction=0.6,
+                 to_array=landmarks_to_array):
+        self.detect = detect
+        self.track = track if track is not None else detect
+        self.detect_every = max(1, detect_every)
+        self.skip_frames = max(0, skip_frames)
+        self.roi_size = roi_size
+        self.roi_margin = roi_margin
+        self.motion_threshold = motion_threshold
+        self.max_roi_fraction = max_roi_fraction
+        self.to_array = to_array
+
+        self.hands = None           # Landmark dell'ultima inferenza (completa o su ROI).
+        self.velocity = None        # Spostamento medio per frame di ogni landmark.
+        self.roi = None             # Ultima ROI (x0, y0, x1, y1) in pixel.
+        self.since_full = 0         # Frame dall'ultimo rilevamento completo.
+        self.since_inference = 0    # Frame dall'ultima inferenza (completa o su ROI).
+        self.previous_small = None  # Miniatura in scala di grigi del frame precedente.
+        self.reset_stats()
+
+    @property
+    def enabled(self):
+        """False se lo scheduler esegue comunque l'inferenza completa su ogni frame."""
+        return self.detect_every > 1
+
+    # --- STATISTICHE ---
+
+    def reset_stats(self):
+        """Azzera i contatori della finestra di statistiche corrente."""
+        self.window_start = time.perf_counter()
+        self.counts = dict.fromkeys(MODES, 0)
+        self.seconds = dict.fromkeys(MODES, 0.0)
+
+    def stats(self):
+        """
+        Statistiche dall'ultimo reset_stats.
+
+        Returns:
+            Dizionario con i frame e i millisecondi medi per modalità, gli FPS effettivi
+            e il risparmio stimato rispetto all'inferenza completa su ogni frame.
+        """
+        frames = sum(self.counts.values())
+        elapsed = time.perf_counter() - self.window_start
+        avg_ms = {mode: (self.seconds[mode] / self.counts[mode] * 1000 if self.counts[mode] else None)
+                  for mode in MODES}
+        saving = None
+        if avg_ms['full'] and frames:
+            # Quanto sarebbe costata la stessa finestra con 'full' su ogni frame.
+            baseline = avg_ms['full'] * frames
+            saving = 1.0 - sum(self.seconds.values()) * 1000 / baseline
+        return {
+            'frames': frames,
+            'fps': frames / elapsed if elapsed > 0 else 0.0,
+            'counts': dict(self.counts),
+            'avg_ms': avg_ms,
+            'saving': saving,
+        }
+
+    def summary(self):
+        """Le statistiche in una riga leggibile, per il terminale."""
+        stats = self.stats()
+        parts = [f"{stats['fps']:.1f} FPS"]
+        for mode in MODES:
+            if stats['counts'][mode]:
+                parts.append(f"{mode} {stats['counts'][mode]} ({stats['avg_ms'][mode]:.1f} ms)")
+        if stats['saving'] is not None:
+            parts.append(f"tempo di inferenza risparmiato ~{stats['saving'] * 100:.0f}%")
+        return ", ".join(parts)
+
+    # --- LOGICA PRINCIPALE ---
+
+    def process(self, frame):
+        """
+        Elabora un frame RGB e restituisce i landmark delle mani.
+
+        Returns:
+            Tupla (array (mani, 21, 3) in coordinate normalizzate sul frame intero, modalità usata)
+        """
+        start = time.perf_counter()
+        height, width = frame.shape[:2]
+        self.since_full += 1
+
+        # La miniatura per il movimento va aggiornata a ogni frame, anche se poi non serve.
+        motion = self.enabled and self._motion_outside_roi(frame)
+        tracking = self.hands is not None and len(self.hands) > 0
+        need_full = not self.enabled or not tracking or self.since_full >= self.detect_every or motion
+
+        hands = None
+        mode = 'full'
+        if not need_full and self.since_inference < self.skip_frames:
+            # Nessuna inferenza: la mano prosegue alla velocità misurata.
+            mode = 'skip'
+            hands = self._predict()
+        elif not need_full:
+            roi = self._predict_roi(width, height)
+            if roi is not None:
+                mode = 'roi'
+                hands = self._process_roi(frame, roi)
+                # Mano persa nella ROI: rilevamento completo sullo stesso frame.
+                if len(hands) == 0:
+                    hands = None
+                    mode = 'full'
+        if hands is None:
+            hands = self.to_array(self.detect(frame))
+
+        if mode == 'skip':
+            self.since_inference += 1
+        else:
+            self._update_motion_model(hands)
+            self.hands = hands
+            self.since_inference = 0
+        if mode == 'full':
+            self.since_full = 0
+        if len(hands):
+            self.roi = self._bounding_box(hands, width, height)
+        else:
+            self.roi = None
+
+        self.counts[mode] += 1
+        self.seconds[mode] += time.perf_counter() - start
+        return hands, mode
+
+    def _predict(self):
+        """Landmark previsti per il frame corrente dall'ultima inferenza e dalla velocità."""
+        return self.hands + self.velocity * (self.since_inference + 1)
+
+    def _update_motion_model(self, hands):
+        # Velocità per frame: differenza con l'ultima inferenza divisa per i frame trascorsi.
+        # Con un numero di mani diverso non c'è corrispondenza tra le mani: velocità nulla.
+        if self.hands is not None and len(self.hands) == len(hands) and len(hands):
+            self.velocity = (hands - self.hands) / (self.since_inference + 1)
+        else:
+            self.velocity = np.zeros_like(hands)
+
+    def _motion_outside_roi(self, frame):
+        """True se c'è movimento significativo fuori dalla ROI (possibile nuova mano)."""
+        small = cv2.cvtColor(cv2.resize(frame, MOTION_SIZE, interpolation=cv2.INTER_AREA),
+                             cv2.COLOR_RGB2GRAY)
+        previous, self.previous_small = self.previous_small, small
+        if previous is None or self.roi is None:
+            return False
+        diff = cv2.absdiff(small, previous)
+        # La zona della mano si muove per definizione: la escludiamo dal confronto.
+        height, width = frame.shape[:2]
+        sx, sy = MOTION_SIZE[0] / width, MOTION_SIZE[1] / height
+        x0, y0, x1, y1 = self.roi
+        diff[int(y0 * sy):int(np.ceil(y1 * sy)), int(x0 * sx):int(np.ceil(x1 * sx))] = 0
+        return float(diff.mean()) > self.motion_threshold
+
+    def _bounding_box(self, hands, width, height):
+        """Riquadro quadrato in pixel che contiene tutte le mani, con margine."""
+        xs = hands[:, :, 0] * width
+        ys = hands[:, :, 1] * height
+        x0, x1, y0, y1 = xs.min(), xs.max(), ys.min(), ys.max()
+        side = max(x1 - x0, y1 - y0) * (1 + 2 * self.roi_margin)
+        cx, cy = (x0 + x1) / 2, (y0 + y1) / 2
+        half = side / 2
+        return (max(0, int(cx - half)), max(0, int(cy - half)),
+                min(width, int(np.ceil(cx + half))), min(height, int(np.ceil(cy + half))))
+
+    def _predict_roi(self, width, height):
+        """ROI del frame corrente, spostata in avanti della velocità della mano; None se troppo grande."""
+        x0, y0, x1, y1 = self._bounding_box(self._predict(), width, height)
+        if x1 - x0 < 2 or y1 - y0 < 2:
+            return None
+        if (x1 - x0) * (y1 - y0) > self.max_roi_fraction * width * height:
+            return None
+        return x0, y0, x1, y1
+
+    def _process_roi(self, frame, roi):
+        """Esegue il modello sul ritaglio ridotto e riporta i landmark sul frame intero."""
+        height, width = frame.shape[:2]
+        x0, y0, x1, y1 = roi
+        crop = frame[y0:y1, x0:x1]
+        scale = self.roi_size / max(crop.shape[:2])
+        if scale < 1:
+            crop = cv2.resize(crop, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        # Il modello vuole un array contiguo in memoria; lo slicing non lo è.
+        hands = self.to_array(self.track(np.ascontiguousarray(crop)))
+        if len(hands) == 0:
+            return hands
+        # Da coordinate normalizzate sul ritaglio a coordinate normalizzate sul frame.
+        crop_w, crop_h = x1 - x0, y1 - y0
+        hands[:, :, 0] = (hands[:, :, 0] * crop_w + x0) / width
+        hands[:, :, 1] = (hands[:, :, 1] * crop_h + y0) / height
+        # z di MediaPipe è in proporzione alla larghezza dell'immagine elaborata.
+        hands[:, :, 2] *= crop_w / width
+        return hands
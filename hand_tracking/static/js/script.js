@@ -1,8 +1,9 @@
 // Esegui lo script solo quando l'intera pagina è stata caricata
 document.addEventListener('DOMContentLoaded', () => {
 
-    // Stabilisce la connessione WebSocket con il server
-    const socket = io();
+    // Stabilisce la connessione WebSocket con il server, indicando quale telecamera
+    // stiamo guardando: il server tiene lo stato del riconoscimento per ogni browser.
+    const socket = io({ query: { camera: document.body.dataset.cameraId } });
 
     // Seleziona gli elementi della pagina con cui interagire
     const toggleBtn = document.getElementById('toggle-btn');
@@ -72,4 +73,94 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     });
 
+    // --- 4. MODALITÀ 'landmarks': SCHELETRO DISEGNATO NEL BROWSER ---
+    // In questa modalità il server non disegna nulla sul video: invia solo le
+    // coordinate dei landmark come blocco binario di numeri float32.
+
+    // Le 21 connessioni tra i landmark della mano (le stesse di mp_hands.HAND_CONNECTIONS).
+    const HAND_CONNECTIONS = [
+        [0, 1], [1, 2], [2, 3], [3, 4],           // Pollice
+        [0, 5], [5, 6], [6, 7], [7, 8],           // Indice
+        [5, 9], [9, 10], [10, 11], [11, 12],      // Medio
+        [9, 13], [13, 14], [14, 15], [15, 16],    // Anulare
+        [13, 17], [0, 17], [17, 18], [18, 19], [19, 20]  // Mignolo e palmo
+    ];
+    // Ogni mano occupa 21 punti × (x, y, z) = 63 numeri nel blocco binario.
+    const FLOATS_PER_HAND = 21 * 3;
+
+    if (document.body.dataset.streamMode === 'landmarks') {
+        setupLandmarkOverlay();
+    }
+
+    function setupLandmarkOverlay() {
+        const video = document.getElementById('video-feed');
+        const canvas = document.getElementById('landmark-overlay');
+        const ctx = canvas.getContext('2d');
+
+        // Chiede al server i landmark; ripetuto a ogni riconnessione del WebSocket.
+        // I gestori vengono registrati prima di chiedere la webcam: se la richiesta
+        // fallisce, lo scheletro continua comunque ad arrivare.
+        socket.on('connect', () => socket.emit('subscribe_landmarks'));
+        if (socket.connected) {
+            socket.emit('subscribe_landmarks');
+        }
+
+        // Socket.IO consegna i messaggi binari come ArrayBuffer: Float32Array lo legge
+        // senza copie né parsing, a differenza di un messaggio JSON.
+        socket.on('landmarks', (data) => {
+            const coords = new Float32Array(data);
+
+            // Il canvas deve avere la stessa dimensione (in pixel) del video visualizzato.
+            const width = video.clientWidth;
+            const height = video.clientHeight;
+            if (canvas.width !== width || canvas.height !== height) {
+                canvas.width = width;
+                canvas.height = height;
+            }
+            ctx.clearRect(0, 0, width, height);
+
+            for (let start = 0; start + FLOATS_PER_HAND <= coords.length; start += FLOATS_PER_HAND) {
+                drawHand(ctx, coords, start, width, height);
+            }
+        });
+
+        // Con `?video=local` il video arriva dalla webcam di questo browser. Lo scheletro
+        // viene però calcolato sulla telecamera del server: coincide con la mano solo se
+        // sono la stessa telecamera, con la stessa inquadratura.
+        if (video.tagName === 'VIDEO') {
+            // `navigator.mediaDevices` esiste solo nei contesti sicuri (https:// o localhost):
+            // aprendo la pagina da un altro computer con http://IP:8888 è undefined.
+            if (!navigator.mediaDevices?.getUserMedia) {
+                addLogEntry('Webcam non disponibile: il browser la concede solo su https:// o localhost.');
+                return;
+            }
+            navigator.mediaDevices.getUserMedia({ video: true })
+                .then((stream) => { video.srcObject = stream; })
+                .catch((err) => addLogEntry(`Webcam non disponibile: ${err.message}`));
+        }
+    }
+
+    // Disegna una mano: le coordinate sono normalizzate (0-1), quindi si moltiplicano
+    // per la dimensione del canvas. I colori sono quelli che il server usa in modalità 'mjpeg'.
+    function drawHand(ctx, coords, start, width, height) {
+        const x = (i) => coords[start + i * 3] * width;
+        const y = (i) => coords[start + i * 3 + 1] * height;
+
+        ctx.lineWidth = 2;
+        ctx.strokeStyle = 'rgb(255, 255, 0)';
+        ctx.beginPath();
+        for (const [a, b] of HAND_CONNECTIONS) {
+            ctx.moveTo(x(a), y(a));
+            ctx.lineTo(x(b), y(b));
+        }
+        ctx.stroke();
+
+        ctx.fillStyle = 'rgb(128, 0, 255)';
+        for (let i = 0; i < 21; i++) {
+            ctx.beginPath();
+            ctx.arc(x(i), y(i), 3, 0, 2 * Math.PI);
+            ctx.fill();
+        }
+    }
+
 });
\ No newline at end of file
@@ -0,0 +1,255 @@
+# --- STREAMING MJPEG ADATTIVO: QUALITÀ, RISOLUZIONE E FPS PER OGNI CLIENT ---
+#
+# Con `cv2.imencode('.jpg', frame)` ogni client riceve il frame intero alla qualità
+# predefinita di OpenCV: su una rete debole i frame si accumulano nei buffer (del server,
+# del sistema operativo, del browser) e chi guarda vede con secondi di ritardo.
+#
+# Questo modulo definisce una "scala" di profili di codifica, dal migliore al più leggero
+# (scala dell'immagine e qualità JPEG), e un controllore per ogni client che sceglie
+# profilo e frame al secondo in base a:
+# - la velocità con cui il client riceve i dati (byte inviati / tempo di invio);
+# - il tempo di codifica del server per ogni profilo;
+# - i frame scartati perché il client non li ha ritirati in tempo.
+# L'obiettivo è che un frame arrivi entro `latency_budget` secondi dalla sua cattura.
+#
+# Il frame viene codificato una volta per ogni profilo in uso, non una volta per client:
+# cento client sulla stessa rete condividono le stesse codifiche.
+
+import time
+
+import cv2
+
+
+# Profili di codifica (scala, qualità JPEG), dal migliore al più leggero. Ogni gradino
+# riduce i byte per frame di circa un terzo; il primo corrisponde allo streaming originale.
+DEFAULT_PROFILES = (
+    (1.0, 90),
+    (1.0, 75),
+    (1.0, 60),
+    (0.75, 60),
+    (0.75, 45),
+    (0.5, 45),
+    (0.5, 30),
+    (0.35, 30),
+)
+
+# Frame al secondo proposti a un client, dal più fluido al più lento. Si scende di FPS
+# solo dopo aver esaurito i profili: un video lento ma nitido è meno utile di uno
+# fluido un po' sgranato per vedere i gesti.
+DEFAULT_FPS_LEVELS = (30, 20, 15, 10, 5)
+
+# Peso dell'ultima misura nelle medie mobili esponenziali (0-1).
+SMOOTHING = 0.2
+
+
+def ewma(previous, value, weight=SMOOTHING):
+    """Media mobile esponenziale; con `previous` None restituisce la misura così com'è."""
+    return value if previous is None else previous + weight * (value - previous)
+
+
+# --- 1. CODIFICA PER PROFILO ---
+
+class StreamEncoder:
+    """
+    Codifica un frame in JPEG per ciascuno dei profili richiesti e misura, per ogni
+    profilo, il tempo di codifica e la dimensione media del risultato.
+    """
+
+    def __init__(self, profiles=DEFAULT_PROFILES):
+        self.profiles = tuple(profiles)
+        self.encode_seconds = [None] * len(self.profiles)  # Media mobile per profilo.
+        self.frame_bytes = [None] * len(self.profiles)     # Media mobile per profilo.
+        self.params = [[cv2.IMWRITE_JPEG_QUALITY, quality] for _, quality in self.profiles]
+
+    def encode(self, frame, levels):
+        """
+        Args:
+            frame: Frame BGR da codificare
+            levels: Indici dei profili da produrre
+
+        Returns:
+            Dizionario {indice del profilo: bytes JPEG}
+        """
+        encoded = {}
+        resized = {}  # Più profili con la stessa scala riducono l'immagine una volta sola.
+        for level in sorted(levels):
+            scale, _ = self.profiles[level]
+            start = time.perf_counter()
+            image = frame
+            if scale != 1.0:
+                if scale not in resized:
+                    resized[scale] = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+                image = resized[scale]
+            ok, buffer = cv2.imencode('.jpg', image, self.params[level])
+            if not ok:
+                continue
+            encoded[level] = buffer.tobytes()
+            self.encode_seconds[level] = ewma(self.encode_seconds[level], time.perf_counter() - start)
+            self.frame_bytes[level] = ewma(self.frame_bytes[level], len(encoded[level]))
+        return encoded
+
+    def estimate(self, level):
+        """
+        Tempo di codifica e dimensione attesi per un profilo. Per un profilo mai usato si
+        parte dal profilo misurato più vicino, contando un terzo in più (o in meno) di byte
+        per gradino: è solo il punto di partenza, corretto dalla prima misura vera.
+        """
+        if self.frame_bytes[level] is not None:
+            return self.encode_seconds[level], self.frame_bytes[level]
+        known = [i for i, size in enumerate(self.frame_bytes) if size is not None]
+        if not known:
+            return None, None
+        nearest = min(known, key=lambda i: abs(i - level))
+        factor = 1.5 ** (nearest - level)
+        return self.encode_seconds[nearest] * factor, self.frame_bytes[nearest] * factor
+
+    def stats(self):
+        return [
+            {
+                'scale': scale,
+                'quality': quality,
+                'encode_ms': None if seconds is None else round(seconds * 1000, 2),
+                'frame_kb': None if size is None else round(size / 1024, 1),
+            }
+            for (scale, quality), seconds, size in zip(self.profiles, self.encode_seconds, self.frame_bytes)
+        ]
+
+
+# --- 2. IL CONTROLLORE DI UN CLIENT ---
+
+class AdaptiveController:
+    """
+    Sceglie profilo di codifica e FPS per un client.
+
+    Ogni `adjust_interval` secondi confronta la latenza stimata di un frame (codifica +
+    invio alla velocità misurata del client) con `latency_budget`, e la banda necessaria
+    (byte per frame × FPS) con quella misurata:
+    - se una delle due è superata, o se il client ha perso frame, scende di un gradino (prima il profilo,
+      poi gli FPS; direttamente gli FPS se i frame si perdono con una latenza già bassa);
+    - se per `upgrade_after` intervalli di fila c'è ampio margine anche per il gradino
+      superiore, risale (prima gli FPS, poi il profilo).
+    La risalita è più lenta della discesa, così il controllore non oscilla tra due gradini.
+
+    Args:
+        encoder: Lo StreamEncoder della telecamera (per i tempi e le dimensioni dei profili)
+        latency_budget: Secondi entro cui un frame deve arrivare al client
+        fps_levels: FPS proposti, dal più alto al più basso
+        adaptive: Se False, il client resta sul profilo e sugli FPS migliori
+    """
+
+    def __init__(self, encoder, latency_budget=0.25, fps_levels=DEFAULT_FPS_LEVELS, adaptive=True,
+                 adjust_interval=1.0, upgrade_after=3, headroom=0.5):
+        self.encoder = encoder
+        self.latency_budget = latency_budget
+        self.fps_levels = tuple(fps_levels)
+        self.adaptive = adaptive
+        self.adjust_interval = adjust_interval
+        self.upgrade_after = upgrade_after
+        self.headroom = headroom
+
+        self.level = 0          # Indice del profilo in encoder.profiles.
+        self.fps_level = 0      # Indice in fps_levels.
+        self.throughput = None  # Byte al secondo, media mobile (None finché non si misura).
+        self.send_seconds = None
+        self.sent = 0
+        self.dropped = 0
+        self.dropped_since_adjust = 0
+        self.good_intervals = 0
+        self.last_sent_at = 0.0
+        self.last_adjust = time.perf_counter()
+
+    @property
+    def fps(self):
+        return self.fps_levels[self.fps_level]
+
+    def wants_frame(self, now):
+        """True se è ora di mandare un frame a questo client, secondo i suoi FPS."""
+        # Un piccolo margine: con una sorgente a 30 FPS e 30 FPS richiesti, un frame in
+        # anticipo di qualche millisecondo non deve far saltare il frame intero.
+        return now - self.last_sent_at >= 0.9 / self.fps
+
+    def on_queued(self, now, dropped):
+        """Un frame è stato accodato per il client; `dropped` se ha sostituito uno mai ritirato."""
+        self.last_sent_at = now
+        if dropped:
+            self.dropped += 1
+            self.dropped_since_adjust += 1
+
+    def on_sent(self, nbytes, seconds, now=None):
+        """Il client ha ricevuto `nbytes` byte in `seconds` secondi (il tempo di scrittura sul socket)."""
+        self.sent += 1
+        # Invii istantanei (il buffer del sistema operativo ha assorbito i dati) non dicono
+        # nulla sulla rete: un limite inferiore evita throughput infiniti.
+        self.throughput = ewma(self.throughput, nbytes / max(seconds, 1e-3))
+        self.send_seconds = ewma(self.send_seconds, seconds)
+        now = time.perf_counter() if now is None else now
+        if now - self.last_adjust >= self.adjust_interval:
+            self.adjust()
+            self.last_adjust = now
+
+    def latency(self, level):
+        """Latenza stimata (secondi) di un frame con il profilo `level`: codifica + invio."""
+        encode_seconds, size = self.encoder.estimate(level)
+        if size is None or self.throughput is None:
+            return None
+        return encode_seconds + size / self.throughput
+
+    def adjust(self):
+        """Sale o scende di un gradino in base alle misure dell'ultimo intervallo."""
+        dropped, self.dropped_since_adjust = self.dropped_since_adjust, 0
+        if not self.adaptive:
+            return
+        latency = self.latency(self.level)
+        if latency is None:
+            return
+
+        # Banda necessaria con il profilo e gli FPS attuali: se supera quella misurata, i
+        # frame si accumulano in coda anche se ognuno, da solo, arriverebbe in tempo.
+        bandwidth = self.encoder.estimate(self.level)[1] * self.fps
+        if dropped or latency > self.latency_budget or bandwidth > self.throughput:
+            self.good_intervals = 0
+            # Frame persi con una latenza già ampiamente nel budget: il problema non è la
+            # dimensione dei frame ma quanti ne arrivano, quindi si riducono gli FPS.
+            reduce_fps = dropped and latency < self.latency_budget * self.headroom
+            if self.level < len(self.encoder.profiles) - 1 and not reduce_fps:
+                self.level += 1
+            elif self.fps_level < len(self.fps_levels) - 1:
+                self.fps_level += 1
+            elif self.level < len(self.encoder.profiles) - 1:
+                self.level += 1
+            return
+
+        # Margine per salire: il gradino superiore deve stare comodamente nel budget.
+        if self.fps_level > 0:
+            upper = self.latency(self.level)
+            bandwidth = self.encoder.estimate(self.level)[1] * self.fps_levels[self.fps_level - 1]
+        elif self.level > 0:
+            upper = self.latency(self.level - 1)
+            bandwidth = self.encoder.estimate(self.level - 1)[1] * self.fps
+        else:
+            return
+        if upper < self.latency_budget * self.headroom and bandwidth < self.throughput * self.headroom:
+            self.good_intervals += 1
+        else:
+            self.good_intervals = 0
+        if self.good_intervals >= self.upgrade_after:
+            self.good_intervals = 0
+            if self.fps_level > 0:
+                self.fps_level -= 1
+            else:
+                self.level -= 1
+
+    def stats(self):
+        scale, quality = self.encoder.profiles[self.level]
+        latency = self.latency(self.level)
+        return {
+            'scale': scale,
+            'quality': quality,
+            'fps': self.fps,
+            'profile': self.level,
+            'throughput_kbps': None if self.throughput is None else round(self.throughput * 8 / 1000, 1),
+            'send_ms': None if self.send_seconds is None else round(self.send_seconds * 1000, 2),
+            'latency_ms': None if latency is None else round(latency * 1000, 1),
+            'frames_sent': self.sent,
+            'frames_dropped': self.dropped,
+        }
@@ -1,15 +1,61 @@
+# --- 0. MODALITÀ DEL SERVER ---
+
+# La variabile d'ambiente HAND_TRACKING_SERVER sceglie come viene servita l'applicazione:
+# - 'dev' (predefinita): il server di sviluppo di Werkzeug, con debug e ricaricamento
+#   automatico. Ogni browser che guarda il video occupa un thread del sistema operativo.
+# - 'eventlet' o 'gevent': un server asincrono per la produzione. Le risposte MJPEG, gli
+#   eventi Socket.IO e il ciclo dei frame diventano "green thread" che condividono un
+#   unico event loop: un browser in più costa poca memoria invece di un thread intero.
+#   Il lavoro bloccante (lettura della webcam, modello, codifica JPEG) viene eseguito
+#   in un pool di thread veri con `run_blocking`, altrimenti fermerebbe l'event loop.
+# Il "monkey patching" (sostituire threading, socket, time.sleep... con versioni
+# cooperative) deve avvenire prima di importare qualsiasi altra libreria.
+import os
+
+SERVER_MODES = ('dev', 'eventlet', 'gevent')
+SERVER_MODE = os.environ.get('HAND_TRACKING_SERVER', 'dev')
+if SERVER_MODE not in SERVER_MODES:
+    raise ValueError(f"HAND_TRACKING_SERVER deve essere uno tra {SERVER_MODES}, non '{SERVER_MODE}'")
+
+if SERVER_MODE == 'eventlet':
+    import eventlet
+    import eventlet.tpool
+    eventlet.monkey_patch()
+elif SERVER_MODE == 'gevent':
+    # Per i WebSocket con gevent serve anche il pacchetto gevent-websocket.
+    from gevent import monkey
+    monkey.patch_all()
+    import gevent
+
+
+def run_blocking(function, *args, **kwargs):
+    """
+    Esegue una funzione bloccante (codice C che tiene occupata la CPU o attende un
+    dispositivo) senza fermare l'event loop. In modalità 'dev' la chiama e basta.
+    """
+    if SERVER_MODE == 'eventlet':
+        return eventlet.tpool.execute(function, *args, **kwargs)
+    if SERVER_MODE == 'gevent':
+        return gevent.get_hub().threadpool.apply(function, args, kwargs)
+    return function(*args, **kwargs)
+
+
 # --- 1. IMPORTAZIONE DELLE LIBRERIE ---
 
 # Da 'flask', importiamo le classi e funzioni necessarie:
 # - Flask: il nucleo del nostro framework web per creare il server.
 # - render_template: serve a caricare e servire i file HTML dalla cartella 'templates'.
 # - Response: è usato per creare una risposta HTTP di tipo streaming, essenziale per il nostro video.
-from flask import Flask, render_template, Response
+# - request: contiene i dati della richiesta corrente (parametri dell'URL, id della sessione WebSocket).
+# - abort: interrompe una richiesta con un errore HTTP (es. 404 per una telecamera inesistente).
+# - jsonify: trasforma un dizionario Python in una risposta JSON (per l'endpoint /stats).
+from flask import Flask, render_template, Response, request, abort, jsonify
 
 # Da 'flask_socketio', importiamo le classi per la comunicazione in tempo reale (WebSocket):
 # - SocketIO: estende Flask per gestire i WebSockets, permettendo una comunicazione bidirezionale.
 # - emit: è la funzione usata per inviare messaggi (eventi) dal server al browser.
-from flask_socketio import SocketIO, emit
+# - join_room: iscrive un client a una "stanza", un gruppo di client a cui inviare gli stessi eventi.
+from flask_socketio import SocketIO, emit, join_room
 
 # cv2 è la libreria OpenCV, il nostro strumento principale per la computer vision:
 # catturare il video, manipolare le immagini (convertire colori, specchiare), e disegnarci sopra.
@@ -19,9 +65,48 @@ import cv2
 # per il riconoscimento dei punti chiave (landmark) della mano.
 import mediapipe as mp
 
-# math ci fornisce funzioni matematiche di base, come la radice quadrata (sqrt),
-# che usiamo per calcolare la distanza tra le dita.
-import math
+# gestures è il nostro modulo (hand_tracking/gestures.py) che riconosce i gesti con NumPy:
+# calcola le distanze tra le dita di tutte le mani con un'unica operazione vettoriale.
+from gestures import GestureEngine, DEFAULT_GESTURES
+
+# scheduler è il nostro modulo (hand_tracking/scheduler.py) che decide per ogni frame se
+# eseguire il modello sul frame intero, solo su un ritaglio intorno alla mano, o per niente.
+from scheduler import InferenceScheduler
+
+# streaming è il nostro modulo (hand_tracking/streaming.py) che adatta qualità JPEG,
+# risoluzione e FPS del video alla rete di ogni client.
+from streaming import StreamEncoder, AdaptiveController, DEFAULT_PROFILES, DEFAULT_FPS_LEVELS
+
+# contextlib.ExitStack chiude insieme tutti i modelli di una telecamera, quanti che siano.
+import contextlib
+
+# atexit ci permette di fermare il pool di inferenza (se attivo) alla chiusura del server.
+import atexit
+
+# time ci serve per stampare periodicamente le statistiche dello scheduler.
+import time
+
+# threading ci permette di leggere la webcam in un thread separato, in parallelo
+# all'inferenza del modello (vedi la sezione 4b).
+import threading
+
+# itertools.count genera numeri progressivi (gli id dei client del video).
+import itertools
+
+# deque è una coda con lunghezza massima: quando è piena, aggiungere un elemento
+# scarta automaticamente il più vecchio. La usiamo come buffer per ogni client.
+from collections import deque
+
+# tracking_common (nella radice del repository) è condiviso con gli altri script di
+# tracciamento: apre la webcam con risoluzione/FPS/formato espliciti e prepara i frame
+# in buffer riutilizzati. `sys.path` viene esteso per poterlo importare da qui.
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from tracking_common.capture import FramePreprocessor
+from tracking_common.replay import open_source
+from tracking_common.inference import InferencePool
+from tracking_common.recording import LandmarkRecorder, SUFFIX as RECORDING_SUFFIX
 
 
 # --- 2. INIZIALIZZAZIONE DELL'APPLICAZIONE ---
@@ -35,17 +120,108 @@ app = Flask(__name__)
 app.config['SECRET_KEY'] = 'la-mia-chiave-super-segreta!'
 
 # Inizializza SocketIO, avvolgendo l'applicazione Flask per aggiungergli
-# le capacità di comunicazione WebSocket.
-socketio = SocketIO(app)
+# le capacità di comunicazione WebSocket. `async_mode` segue la modalità del server
+# (sezione 0): senza indicarlo, Flask-SocketIO userebbe eventlet ogni volta che è
+# installato, anche in sviluppo.
+socketio = SocketIO(app, async_mode='threading' if SERVER_MODE == 'dev' else SERVER_MODE)
 
 
 # --- 3. GESTIONE DELLO STATO ---
 
-# Definiamo una variabile globale che funge da interruttore per il riconoscimento.
-# Se `True`, il server cercherà attivamente i gesti.
-# Se `False`, si limiterà a visualizzare lo scheletro della mano.
-# Questa variabile viene modificata dal browser tramite un evento WebSocket.
-is_recognizing = False
+# Ogni browser ha il suo interruttore per il riconoscimento (vedi SessionState, sezione 4e).
+# Se acceso, il server cercherà attivamente i gesti per quel browser; altrimenti si
+# limiterà a visualizzare lo scheletro della mano. L'interruttore viene acceso dal
+# browser tramite un evento WebSocket.
+
+# Modalità di streaming, scelta con la variabile d'ambiente HAND_TRACKING_STREAM:
+# - 'mjpeg' (predefinita): il server disegna lo scheletro della mano nel frame e lo
+#   invia al browser come video MJPEG.
+# - 'landmarks': il server NON disegna nulla. Invia via Socket.IO solo le coordinate
+#   dei 21 landmark di ogni mano (pochi byte per frame) e il browser disegna lo scheletro
+#   su un canvas sopra il video. Il video può essere quello "pulito" del server
+#   (/video_feed, senza disegni) oppure, aprendo la pagina con `?video=local`, quello
+#   della webcam del browser stesso: in questo caso il server non codifica più alcun JPEG.
+#   Attenzione: i landmark vengono SEMPRE calcolati sulla telecamera del server. Con
+#   `?video=local` lo scheletro coincide con la mano solo se la webcam del browser è lo
+#   stesso dispositivo fisico, nella stessa posizione e con la stessa inquadratura (es.
+#   una telecamera che il browser vede come webcam e il server legge come flusso di rete).
+#   Se server e browser girano sulla stessa macchina (un chiosco), di solito la webcam
+#   non si può aprire due volte: lì va usato /video_feed. Inoltre i browser concedono la
+#   webcam solo in un contesto sicuro (https:// o localhost), non su http://IP:8888.
+STREAM_MODES = ('mjpeg', 'landmarks')
+STREAM_MODE = os.environ.get('HAND_TRACKING_STREAM', 'mjpeg')
+if STREAM_MODE not in STREAM_MODES:
+    raise ValueError(f"HAND_TRACKING_STREAM deve essere uno tra {STREAM_MODES}, non '{STREAM_MODE}'")
+
+# Nome della stanza Socket.IO dei client che ricevono i landmark.
+LANDMARK_ROOM = 'landmarks'
+
+# Scheduler dell'inferenza (vedi scheduler.py), utile sui dispositivi poco potenti:
+# - HAND_TRACKING_DETECT_EVERY: un rilevamento sul frame intero ogni N frame; nei frame
+#   intermedi il modello elabora solo un ritaglio ridotto intorno alla mano. Con 1
+#   (predefinito) ogni frame viene elaborato per intero e lo scheduler non interviene.
+# - HAND_TRACKING_SKIP_FRAMES: frame senza alcuna inferenza tra due inferenze, con i
+#   landmark previsti dalla velocità della mano (richiede DETECT_EVERY > 1).
+# - HAND_TRACKING_ROI_SIZE: lato massimo in pixel del ritaglio passato al modello.
+DETECT_EVERY = int(os.environ.get('HAND_TRACKING_DETECT_EVERY', '1'))
+SKIP_FRAMES = int(os.environ.get('HAND_TRACKING_SKIP_FRAMES', '0'))
+ROI_SIZE = int(os.environ.get('HAND_TRACKING_ROI_SIZE', '256'))
+
+# Ogni quanti secondi stampare sul terminale FPS effettivi e tempo risparmiato dallo scheduler.
+SCHEDULER_REPORT_INTERVAL = 10.0
+
+# Impostazioni della webcam (vedi tracking_common/capture.py):
+# - HAND_TRACKING_CAMERA: indice della webcam (0 = predefinita), percorso di un video
+#   (riprodotto in loop alla frequenza HAND_TRACKING_FPS) oppure 'synthetic' per dei
+#   frame artificiali: le ultime due permettono di provare la web app senza webcam.
+# - HAND_TRACKING_WIDTH / HAND_TRACKING_HEIGHT / HAND_TRACKING_FPS: richiesti al driver.
+# - HAND_TRACKING_FOURCC: formato dei pixel, es. MJPG (predefinito) o YUYV.
+CAMERA_SOURCE = os.environ.get('HAND_TRACKING_CAMERA', '0')
+CAMERA_WIDTH = int(os.environ.get('HAND_TRACKING_WIDTH', '640'))
+CAMERA_HEIGHT = int(os.environ.get('HAND_TRACKING_HEIGHT', '480'))
+CAMERA_FPS = int(os.environ.get('HAND_TRACKING_FPS', '30'))
+CAMERA_FOURCC = os.environ.get('HAND_TRACKING_FOURCC', 'MJPG')
+
+# Più telecamere con un solo server (una pipeline per ciascuna, vedi sezione 5):
+# - HAND_TRACKING_CAMERAS: sorgenti separate da virgole, es. "0,1,rtsp://192.168.1.20/stream,video.mp4".
+#   La telecamera N si guarda su `/?camera=N`. Se manca, si usa solo HAND_TRACKING_CAMERA.
+# - HAND_TRACKING_STANDIN=1: gli URL di rete (rtsp://, http://, ...) vengono sostituiti da
+#   sorgenti sintetiche locali, per provare la configurazione senza le telecamere IP.
+# - HAND_TRACKING_MAX_INFERENCES: inferenze contemporanee al massimo, su tutte le telecamere
+#   (predefinito: il minore tra il numero di telecamere e quello dei core).
+# - HAND_TRACKING_MAX_INFERENCE_FPS: inferenze al secondo al massimo, in totale, divise tra
+#   le telecamere che qualcuno sta guardando (predefinito: 0 = nessun limite).
+CAMERA_SOURCES = [spec.strip() for spec in os.environ.get('HAND_TRACKING_CAMERAS', CAMERA_SOURCE).split(',')
+                  if spec.strip()]
+STAND_IN = os.environ.get('HAND_TRACKING_STANDIN', '0') == '1'
+# - HAND_TRACKING_STANDIN_DROP_EVERY: i sostituti si interrompono ogni N frame per qualche
+#   secondo, come un flusso RTSP che si riconnette (predefinito: 0 = mai).
+STANDIN_DROP_EVERY = int(os.environ.get('HAND_TRACKING_STANDIN_DROP_EVERY', '0')) or None
+MAX_INFERENCES = int(os.environ.get('HAND_TRACKING_MAX_INFERENCES',
+                                    str(min(len(CAMERA_SOURCES), os.cpu_count() or 1))))
+MAX_INFERENCE_FPS = float(os.environ.get('HAND_TRACKING_MAX_INFERENCE_FPS', '0'))
+# - HAND_TRACKING_INFERENCE_WORKERS: se maggiore di 0, il modello non gira nei thread delle
+#   telecamere ma in un pool di N processi (vedi tracking_common/inference.py): con più
+#   telecamere le inferenze procedono davvero in parallelo su più core, senza contendersi
+#   il GIL. Predefinito: 0 (un modello nel thread di ogni telecamera).
+INFERENCE_WORKERS = int(os.environ.get('HAND_TRACKING_INFERENCE_WORKERS', '0'))
+if INFERENCE_WORKERS and SERVER_MODE != 'dev':
+    # Il thread che riceve i risultati dal pool si blocca su code tra processi, che
+    # eventlet/gevent non sanno rendere cooperative: fermerebbe l'event loop.
+    raise ValueError("HAND_TRACKING_INFERENCE_WORKERS richiede HAND_TRACKING_SERVER=dev")
+# - HAND_TRACKING_RECORD_DIR: se impostata, i landmark di ogni telecamera vengono registrati in
+#   questa cartella (vedi tracking_common/recording.py), per analizzare le sessioni o
+#   riprovare i gesti senza telecamera (replay_gestures.py). Predefinito: nessuna registrazione.
+RECORD_DIR = os.environ.get('HAND_TRACKING_RECORD_DIR')
+
+# Streaming MJPEG adattivo (vedi streaming.py e l'endpoint /stats):
+# - HAND_TRACKING_LATENCY_BUDGET_MS: entro quanti millisecondi un frame deve arrivare al
+#   browser; per rispettarlo, ogni client riceve un video più leggero se la sua rete è lenta.
+# - HAND_TRACKING_ADAPTIVE=0: disattiva l'adattamento (tutti ricevono la qualità massima).
+LATENCY_BUDGET = float(os.environ.get('HAND_TRACKING_LATENCY_BUDGET_MS', '250')) / 1000
+ADAPTIVE_STREAM = os.environ.get('HAND_TRACKING_ADAPTIVE', '1') != '0'
+# Gli FPS proposti ai client non superano quelli della telecamera.
+STREAM_FPS_LEVELS = (CAMERA_FPS,) + tuple(fps for fps in DEFAULT_FPS_LEVELS if fps < CAMERA_FPS)
 
 
 # --- 4. CONFIGURAZIONE DI MEDIAPIPE E OPENCV ---
@@ -60,109 +236,656 @@ connection_style = mp.solutions.drawing_utils.DrawingSpec(color=(0, 255, 255), t
 # Inizializza la soluzione "Hands" di MediaPipe, che contiene il modello AI vero e proprio.
 mp_hands = mp.solutions.hands
 
-# Inizializza l'oggetto di cattura video di OpenCV. L'argomento `0` si riferisce
-# alla webcam predefinita del computer. Se avessi più webcam, potresti usare 1, 2, ecc.
-cap = cv2.VideoCapture(0)
 
+def draw_hands(frame, hands):
+    """
+    Disegna lo scheletro delle mani sul frame (BGR), con gli stili definiti sopra.
+
+    Lavora sull'array (mani, 21, 3) invece che sugli oggetti di MediaPipe, perché con
+    lo scheduler i landmark possono venire da un ritaglio o essere previsti.
+    """
+    height, width = frame.shape[:2]
+    for hand in hands:
+        # Da coordinate normalizzate (0-1) a pixel, per tutti i 21 punti in una volta.
+        points = (hand[:, :2] * (width, height)).astype(int).tolist()
+        for a, b in mp_hands.HAND_CONNECTIONS:
+            cv2.line(frame, points[a], points[b], connection_style.color, connection_style.thickness)
+        for point in points:
+            cv2.circle(frame, point, landmark_style.circle_radius, landmark_style.color, landmark_style.thickness)
 
-# --- 5. FUNZIONE PER LO STREAMING VIDEO E LA LOGICA AI ---
 
-def generate_frames():
+# --- 4b. CATTURA ASINCRONA DEI FRAME ---
+
+class LatestFrameCapture:
     """
-    Funzione generatore che produce un flusso di frame video elaborati.
-    Viene eseguita in un loop continuo finché il server è attivo e un client è connesso.
+    Legge la webcam in un thread dedicato e conserva solo l'ultimo frame.
+
+    `cap.read()` si blocca finché la webcam non produce il frame successivo. Se la
+    lettura avvenisse nello stesso ciclo dell'inferenza, il tempo di attesa della
+    webcam si sommerebbe a quello del modello, e i frame non letti in tempo si
+    accumulerebbero nel buffer del driver. Con un thread dedicato la webcam viene
+    letta alla sua velocità e l'inferenza prende sempre il frame più recente:
+    quelli che arrivano mentre il modello è occupato vengono scartati.
+
+    I frame vengono letti a turno in tre buffer allocati una volta sola: uno contiene
+    l'ultimo frame pronto, uno è quello consegnato all'inferenza (che non va toccato
+    finché non chiede il successivo) e nel terzo scrive la webcam.
     """
-    # Dichiara che vogliamo leggere e modificare la variabile globale `is_recognizing`
-    # dall'interno di questa funzione.
-    global is_recognizing
-    
-    # Inizializza il modello `Hands` usando un blocco `with`. Questo è il modo raccomandato
-    # perché gestisce automaticamente l'allocazione e il rilascio delle risorse del modello.
-    # `min_detection_confidence`: soglia di confidenza per rilevare una mano in un'immagine (70%).
-    # `min_tracking_confidence`: soglia per continuare a tracciare una mano già rilevata (50%).
-    with mp_hands.Hands(min_detection_confidence=0.7, min_tracking_confidence=0.5) as hands:
-        # Il loop infinito che costituisce il cuore dell'applicazione in tempo reale.
+
+    SLOTS = 3
+
+    def __init__(self, capture):
+        self.capture = capture
+        # La Condition protegge il frame condiviso e permette di attendere il successivo.
+        self.condition = threading.Condition()
+        self.slots = [None] * self.SLOTS
+        self.latest_slot = None  # Buffer con l'ultimo frame pronto.
+        self.reader_slot = None  # Buffer consegnato all'inferenza.
+        self.frame_id = 0        # Numero progressivo dell'ultimo frame letto dalla webcam.
+        self.dropped = 0         # Frame sovrascritti prima di essere elaborati.
+        self.last_read_id = 0    # Ultimo frame consegnato all'inferenza.
+        self.running = False
+        self.paused = False      # In pausa non legge la sorgente (nessuno guarda la telecamera).
+        self.thread = None
+
+    def start(self):
+        """Avvia il thread di cattura (se non è già attivo)."""
+        with self.condition:
+            if self.running:
+                return
+            self.running = True
+        # `daemon=True`: il thread non impedisce la chiusura del server.
+        self.thread = threading.Thread(target=self._capture_loop, name='capture', daemon=True)
+        self.thread.start()
+
+    @property
+    def frame(self):
+        """L'ultimo frame pronto (None prima del primo)."""
+        return None if self.latest_slot is None else self.slots[self.latest_slot]
+
+    def _capture_loop(self):
+        while self.running:
+            with self.condition:
+                # In pausa il thread dorme qui, senza leggere né decodificare frame.
+                while self.paused and self.running:
+                    self.condition.wait()
+                if not self.running:
+                    break
+                # Il buffer libero: né l'ultimo frame pronto né quello in uso dall'inferenza.
+                slot = next(i for i in range(self.SLOTS) if i not in (self.latest_slot, self.reader_slot))
+            # La lettura (lenta) avviene fuori dal lock, direttamente nel buffer libero.
+            frame = run_blocking(self.capture.read, out=self.slots[slot])
+            with self.condition:
+                if frame is None:
+                    # Webcam disconnessa: svegliamo chi attende, che vedrà running=False.
+                    self.running = False
+                    self.condition.notify_all()
+                    break
+                # Il frame precedente non ancora elaborato viene semplicemente sovrascritto.
+                if self.frame_id > self.last_read_id:
+                    self.dropped += 1
+                self.slots[slot] = frame
+                self.latest_slot = slot
+                self.frame_id += 1
+                self.condition.notify_all()
+
+    def read(self, last_id):
+        """
+        Restituisce il frame più recente successivo a `last_id`, attendendolo se serve.
+
+        Non c'è un limite di attesa: un primo frame lento, un video a meno di 1 FPS o una
+        sorgente di rete che si riconnette (vedi StreamSource) non sono la fine del flusso.
+        Solo il thread di cattura decide che la sorgente è finita, fermandosi.
+
+        Returns:
+            Tupla (frame_id, frame); frame è None se la webcam non produce più frame.
+            Il frame resta valido fino alla chiamata successiva di `read`.
+        """
+        with self.condition:
+            while self.running and self.frame_id <= last_id:
+                self.condition.wait()
+            if self.frame_id <= last_id:
+                return last_id, None
+            self.last_read_id = self.frame_id
+            self.reader_slot = self.latest_slot
+            return self.frame_id, self.slots[self.reader_slot]
+
+    def pause(self):
+        """Sospende la lettura della sorgente finché non viene chiamata `resume`."""
+        with self.condition:
+            self.paused = True
+
+    def resume(self):
+        """Riprende la lettura della sorgente dopo `pause`."""
+        with self.condition:
+            self.paused = False
+            self.condition.notify_all()
+
+    def stop(self):
+        """Ferma il thread di cattura."""
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        if self.thread is not None:
+            self.thread.join(timeout=1.0)
+
+
+# --- 4c. DIFFUSIONE DEI FRAME A TUTTI I CLIENT ---
+
+# Quanti frame JPEG può tenere in coda ogni client. Un client lento (es. su una rete
+# debole) non rallenta gli altri: quando il suo buffer è pieno perde i frame più vecchi.
+CLIENT_BUFFER_FRAMES = 2
+
+
+class StreamClient:
+    """Un browser che guarda il video MJPEG: il suo buffer di frame e il suo controllore."""
+
+    # Numeri progressivi per riconoscere i client nelle statistiche.
+    ids = itertools.count(1)
+
+    def __init__(self, buffer_frames, controller):
+        self.id = next(StreamClient.ids)
+        self.buffer = deque(maxlen=buffer_frames)
+        self.controller = controller
+
+
+class FrameBroadcaster:
+    """
+    Consegna ogni frame prodotto dal thread di inferenza a tutti i client connessi.
+
+    Ogni client ha il proprio buffer limitato (una deque) e il proprio controllore
+    (streaming.AdaptiveController) che sceglie qualità, risoluzione e FPS del suo video.
+    Il frame viene catturato ed elaborato dal modello una sola volta, e codificato una
+    volta per ogni profilo in uso, qualunque sia il numero di browser aperti sulla pagina.
+    """
+
+    def __init__(self, buffer_frames=CLIENT_BUFFER_FRAMES):
+        self.buffer_frames = buffer_frames
+        self.condition = threading.Condition()
+        # Il codificatore condiviso da tutti i client di questa telecamera.
+        self.encoder = StreamEncoder(DEFAULT_PROFILES)
+        # I client indicizzati per id.
+        self.clients = {}
+        # Sessioni Socket.IO iscritte ai landmark (modalità 'landmarks').
+        self.listeners = set()
+        self.closed = False
+
+    def add_client(self):
+        """Registra un nuovo client e lo restituisce."""
+        controller = AdaptiveController(self.encoder, latency_budget=LATENCY_BUDGET,
+                                        fps_levels=STREAM_FPS_LEVELS, adaptive=ADAPTIVE_STREAM)
+        client = StreamClient(self.buffer_frames, controller)
+        with self.condition:
+            self.clients[client.id] = client
+            # Sveglia il thread di inferenza, che potrebbe essere in pausa.
+            self.condition.notify_all()
+        return client
+
+    def remove_client(self, client):
+        """Rimuove un client (es. quando chiude la pagina)."""
+        with self.condition:
+            self.clients.pop(client.id, None)
+
+    def add_listener(self, sid):
+        """Registra una sessione Socket.IO che riceve solo i landmark."""
+        with self.condition:
+            self.listeners.add(sid)
+            self.condition.notify_all()
+
+    def remove_listener(self, sid):
+        """Rimuove una sessione Socket.IO (es. quando si disconnette)."""
+        with self.condition:
+            self.listeners.discard(sid)
+
+    def wait_for_clients(self):
+        """Blocca il thread di inferenza finché non c'è almeno un client da servire."""
+        with self.condition:
+            while not self.clients and not self.listeners and not self.closed:
+                self.condition.wait()
+
+    def levels_wanted(self, now):
+        """I profili di codifica dei client che in questo istante aspettano un frame."""
+        with self.condition:
+            return {client.controller.level for client in self.clients.values()
+                    if client.controller.wants_frame(now)}
+
+    def publish(self, encoded, now):
+        """
+        Aggiunge il frame al buffer di ogni client che lo aspetta, nel suo profilo
+        (scartando il più vecchio se il buffer è pieno).
+
+        Args:
+            encoded: Dizionario {profilo: bytes JPEG} prodotto da StreamEncoder.encode
+            now: Lo stesso istante passato a `levels_wanted`
+        """
+        with self.condition:
+            for client in self.clients.values():
+                controller = client.controller
+                if controller.level not in encoded or not controller.wants_frame(now):
+                    continue
+                dropped = len(client.buffer) == client.buffer.maxlen
+                client.buffer.append(encoded[controller.level])
+                controller.on_queued(now, dropped)
+            self.condition.notify_all()
+
+    def report_sent(self, client, nbytes, seconds):
+        """Registra quanto ha impiegato un frame ad arrivare al client (vedi generate_frames)."""
+        with self.condition:
+            client.controller.on_sent(nbytes, seconds)
+
+    def close(self):
+        """Segnala ai client che non arriveranno altri frame."""
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    def reopen(self):
+        """Riprende a distribuire frame dopo `close` (la telecamera viene riavviata)."""
+        with self.condition:
+            self.closed = False
+
+    def frames(self, client):
+        """Generatore dei frame destinati a un client, nell'ordine in cui sono stati prodotti."""
+        buffer = client.buffer
         while True:
-            # Legge un singolo frame dalla webcam. 'success' è un booleano, 'frame' è l'immagine (array NumPy).
-            success, frame = cap.read()
-            if not success:
-                # Se la lettura del frame fallisce (es. webcam disconnessa), interrompe il ciclo.
-                break
-            
-            # --- PRE-ELABORAZIONE DEL FRAME ---
-            # 1. `cv2.flip(frame, 1)`: Specchia l'immagine orizzontalmente. L'argomento `1` indica il flip orizzontale.
-            # 2. `cv2.cvtColor(...)`: Converte lo spazio colore da BGR (formato standard di OpenCV) a RGB (richiesto da MediaPipe).
-            frame = cv2.cvtColor(cv2.flip(frame, 1), cv2.COLOR_BGR2RGB)
-            
-            # --- INFERENZA DEL MODELLO ---
-            # `hands.process(frame)`: Qui avviene la magia. Il frame viene passato al modello AI
-            # che rileva le mani e calcola la posizione dei 21 landmark per ciascuna.
-            results = hands.process(frame)
-
-            # Riconvertiamo il frame in BGR per poter usare le funzioni di disegno di OpenCV, che si aspettano questo formato.
-            frame = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
-
-            # Inizializza una stringa vuota per il nome dell'azione.
-            action = ""
-
-            # Controlla se il modello ha trovato almeno una mano (`multi_hand_landmarks` è una lista non vuota).
-            if results.multi_hand_landmarks:
-                # Itera su ogni mano trovata nel frame (potrebbero essercene più di una).
-                for hand_landmarks in results.multi_hand_landmarks:
-                    # Disegna SEMPRE lo scheletro della mano, usando gli stili personalizzati.
-                    # Questo viene fatto ad ogni frame, indipendentemente dallo stato di 'is_recognizing'.
-                    mp.solutions.drawing_utils.draw_landmarks(
-                        frame,
-                        hand_landmarks,
-                        mp_hands.HAND_CONNECTIONS,
-                        landmark_style,
-                        connection_style
-                    )
-
-                    # Esegue la logica di riconoscimento del gesto SOLO se l'utente ha premuto il bottone (`is_recognizing` è True).
-                    if is_recognizing:
-                        # Estrae la lista dei 21 landmark per la mano corrente.
-                        landmarks = hand_landmarks.landmark
-                        # Estrae le coordinate della punta del pollice (landmark numero 4).
-                        thumb_tip = landmarks[mp_hands.HandLandmark.THUMB_TIP]
-                        # Crea un dizionario per mappare i numeri delle dita (2-5) ai loro landmark corrispondenti.
-                        finger_tip_ids = {2: mp_hands.HandLandmark.INDEX_FINGER_TIP, 3: mp.solutions.hands.HandLandmark.MIDDLE_FINGER_TIP, 4: mp.solutions.hands.HandLandmark.RING_FINGER_TIP, 5: mp.solutions.hands.HandLandmark.PINKY_TIP}
-                        
-                        # Itera sulle dita (indice, medio, anulare, mignolo).
-                        for finger_num, tip_id in finger_tip_ids.items():
-                            finger_tip = landmarks[tip_id]
-                            # Calcola la distanza Euclidea 2D tra la punta del pollice e quella del dito corrente.
-                            # Le coordinate x e y sono normalizzate (da 0.0 a 1.0), quindi la distanza è relativa alla dimensione dell'immagine.
-                            distance = math.sqrt((thumb_tip.x - finger_tip.x)**2 + (thumb_tip.y - finger_tip.y)**2)
-                            
-                            # Soglia di distanza per considerare un "tocco". Questo valore è stato trovato empiricamente.
-                            touch_threshold = 0.05
-                            
-                            # Se la distanza è sotto la soglia, abbiamo un'azione.
-                            if distance < touch_threshold:
-                                action_num = finger_num - 1 # Converte il numero del dito (2-5) in numero di azione (1-4).
-                                action = f"Azione {action_num} Rilevata" # Prepara una stringa per il log.
-                                
-                                # Invia l'azione al browser tramite un evento WebSocket chiamato 'action_log'.
-                                # Il payload è un dizionario JSON.
-                                socketio.emit('action_log', {'data': action})
-                                
-                                # Disattiva subito il riconoscimento per evitare azioni multiple e accidentali.
-                                # L'utente dovrà premere di nuovo il bottone per un'altra azione.
-                                is_recognizing = False
-                                break # Interrompe il ciclo delle dita, non serve controllarne altre.
-                        if action:
-                            break # Interrompe il ciclo delle mani se un'azione è stata trovata.
-            
-            # --- STREAMING DEL FRAME AL BROWSER ---
-            # Codifica il frame (con i disegni sopra) in formato JPEG in memoria.
-            ret, buffer = cv2.imencode('.jpg', frame)
-            # Converte l'immagine codificata in un array di bytes.
-            frame_bytes = buffer.tobytes()
-            # `yield` è la parola chiave che rende questa funzione un generatore.
-            # Invia il frame al client, formattato secondo lo standard dello streaming MJPEG.
-            yield (b'--frame\r\n'
-                   b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
+            with self.condition:
+                while not buffer and not self.closed:
+                    self.condition.wait()
+                if not buffer:
+                    return
+                frame_bytes = buffer.popleft()
+            yield frame_bytes
+
+    def stats(self):
+        """Impostazioni e misure correnti di ogni client, per l'endpoint /stats."""
+        with self.condition:
+            return [{'client': client.id, **client.controller.stats()} for client in self.clients.values()]
+
+
+def hands_to_bytes(hands):
+    """
+    Impacchetta i landmark di tutte le mani in un blocco binario per il browser.
+
+    `hands` è l'array (mani, 21, 3) di gestures.landmarks_to_array.
+    Formato: numeri float32 little-endian, mano dopo mano, 21 punti per mano e
+    (x, y, z) per punto, cioè 63 numeri (252 byte) per mano. Un frame senza mani è
+    un blocco vuoto. Le coordinate sono normalizzate (da 0.0 a 1.0) sull'immagine
+    già specchiata, quindi il browser le moltiplica per la dimensione del video.
+    In JavaScript il blocco si legge direttamente con `new Float32Array(data)`.
+    """
+    return hands.astype('<f4', copy=False).tobytes()
+
+
+# --- 4d. LIMITE GLOBALE ALL'INFERENZA ---
+
+class InferenceBudget:
+    """
+    Limita il lavoro del modello sommato su tutte le telecamere.
+
+    - `slots`: al massimo `max_concurrent` inferenze contemporanee. Ogni telecamera ha il
+      suo thread e il suo modello: senza limite, con molte telecamere i modelli si
+      contenderebbero i core e rallenterebbero tutti (anche lo streaming).
+    - `max_fps`: inferenze al secondo in totale, divise in parti uguali tra le telecamere
+      che in quel momento hanno qualcuno che guarda (None = nessun limite).
+    """
+
+    def __init__(self, max_concurrent, max_fps=None):
+        self.slots = threading.BoundedSemaphore(max_concurrent)
+        self.max_concurrent = max_concurrent
+        self.max_fps = max_fps
+        self.lock = threading.Lock()
+        self.active = set()  # Id delle telecamere con almeno un client.
+
+    def activate(self, camera_id):
+        with self.lock:
+            self.active.add(camera_id)
+
+    def deactivate(self, camera_id):
+        with self.lock:
+            self.active.discard(camera_id)
+
+    def interval(self):
+        """Secondi minimi tra due inferenze della stessa telecamera."""
+        if not self.max_fps:
+            return 0.0
+        with self.lock:
+            return max(1, len(self.active)) / self.max_fps
+
+
+budget = InferenceBudget(MAX_INFERENCES, MAX_INFERENCE_FPS or None)
+
+# Il pool di processi del modello, condiviso da tutte le telecamere (None = modello nei thread).
+# Va creato prima di avviare qualsiasi thread: i processi vengono generati con fork.
+inference_pool = None
+if INFERENCE_WORKERS:
+    inference_pool = InferencePool('hands', workers=INFERENCE_WORKERS,
+                                   max_width=CAMERA_WIDTH, max_height=CAMERA_HEIGHT,
+                                   max_inflight_per_stream=1)
+    # All'uscita ferma i processi e libera la memoria condivisa dei frame.
+    atexit.register(inference_pool.close)
+    print(f"Pool di inferenza: {INFERENCE_WORKERS} processi.")
+
+
+# --- 4e. STATO DI OGNI BROWSER ---
+
+class SessionState:
+    """
+    Lo stato di un browser connesso (una sessione Socket.IO): quale telecamera guarda,
+    se ha chiesto di riconoscere un gesto e il suo motore dei gesti. Così il bottone
+    premuto in un browser non attiva il riconoscimento negli altri.
+    """
+
+    def __init__(self, camera_id):
+        self.camera_id = camera_id
+        self.is_recognizing = False
+        self.gesture_engine = GestureEngine(DEFAULT_GESTURES)
+
+
+# Le sessioni indicizzate per `request.sid`. Il lock le protegge perché vengono lette dai
+# thread delle telecamere e modificate dai gestori degli eventi Socket.IO.
+sessions = {}
+sessions_lock = threading.Lock()
+
+
+# --- 5. UNA PIPELINE PER OGNI TELECAMERA ---
+
+class CameraPipeline:
+    """
+    Tutto ciò che serve a una telecamera: la sorgente, il thread di cattura, il modello
+    (nel thread di inferenza) e il broadcaster verso i suoi client.
+
+    Le pipeline condividono lo stesso processo, quindi una sola copia in memoria di
+    MediaPipe, OpenCV e del server web, invece di un processo completo per postazione.
+    """
+
+    def __init__(self, camera_id, spec):
+        self.camera_id = camera_id
+        self.spec = spec
+        # Inizializza la sorgente. `0` si riferisce alla webcam predefinita del computer; se
+        # avessi più webcam, potresti usare 1, 2, ecc. Risoluzione, FPS e formato dei pixel
+        # vengono richiesti esplicitamente, e il driver tiene in coda al massimo un frame: i
+        # frame vecchi accumulati nel buffer aumenterebbero solo il ritardo tra la realtà e lo schermo.
+        self.source = open_source(spec, CAMERA_WIDTH, CAMERA_HEIGHT, CAMERA_FPS, CAMERA_FOURCC,
+                                  replay_fps=CAMERA_FPS, loop=True, stand_in=STAND_IN,
+                                  drop_every=STANDIN_DROP_EVERY)
+        print(f"Telecamera {camera_id}: {self.source.describe()}")
+        # L'unico lettore della sorgente: tutte le altre parti del programma chiedono i frame a lui.
+        self.camera = LatestFrameCapture(self.source)
+        # Il punto di incontro tra il thread di inferenza e tutti i client di questa telecamera.
+        self.broadcaster = FrameBroadcaster()
+        # La stanza Socket.IO dei client che ricevono i landmark di questa telecamera.
+        self.landmark_room = f'{LANDMARK_ROOM}:{camera_id}'
+        # La registrazione dei landmark (se attiva), creata all'avvio del thread di inferenza.
+        self.recorder = None
+        # Il thread di inferenza e il lock che evita di avviarne due se più client arrivano insieme.
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def start(self):
+        """Avvia il thread di inferenza se non è già in esecuzione."""
+        with self.lock:
+            if self.thread is None:
+                # Dopo la fine di una sorgente il broadcaster è chiuso: i nuovi client devono
+                # ricevere i frame della nuova esecuzione.
+                self.broadcaster.reopen()
+                self.thread = threading.Thread(target=self.run, name=f'inference-{self.camera_id}',
+                                               daemon=True)
+                self.thread.start()
+
+    def run(self):
+        """
+        Il corpo del thread di inferenza: elabora i frame finché la sorgente non finisce e poi
+        lascia la telecamera pronta per essere riavviata dal prossimo client.
+        """
+        try:
+            self.process_frames()
+        finally:
+            # Niente più frame (o un errore): i client escono dai loro generatori e chiudono lo stream.
+            budget.deactivate(self.camera_id)
+            self.camera.pause()
+            self.broadcaster.close()
+            # Scrive su disco le ultime righe; un riavvio aprirà una nuova registrazione.
+            if self.recorder is not None:
+                self.recorder.close()
+            # Il thread viene dimenticato, così `start` ne può avviare uno nuovo.
+            with self.lock:
+                self.thread = None
+
+    def process_frames(self):
+        """
+        Il cuore dell'applicazione: elabora i frame della telecamera e li consegna a tutti i
+        suoi client. Viene eseguita nel thread in background avviato dal primo client che si
+        connette: un solo modello, un'inferenza e una codifica JPEG per frame.
+        """
+        # Avvia (una sola volta) il thread che legge la sorgente.
+        self.camera.start()
+        # Specchia e converte i frame in buffer allocati una volta sola.
+        preprocess = FramePreprocessor(mirror=True)
+        # Numero dell'ultimo frame elaborato: serve a non elaborare due volte lo stesso frame.
+        last_id = 0
+        # Istante dell'ultima inferenza, per rispettare il limite globale di inferenze al secondo.
+        last_inference = 0.0
+        broadcaster = self.broadcaster
+        if RECORD_DIR:
+            self.start_recording()
+
+        # ExitStack chiude i modelli creati da `create_scheduler` all'uscita dal blocco `with`.
+        with contextlib.ExitStack() as models:
+            scheduler = self.create_scheduler(models)
+
+            # Il loop infinito che costituisce il cuore dell'applicazione in tempo reale.
+            while True:
+                # Se nessuno sta guardando, il modello resta in pausa invece di consumare CPU
+                # (e non conta nella divisione del limite globale tra le telecamere). Anche la
+                # cattura va in pausa: leggere e decodificare frame che nessuno elabora
+                # consumerebbe CPU per ogni telecamera guardata almeno una volta.
+                if not broadcaster.clients and not broadcaster.listeners:
+                    budget.deactivate(self.camera_id)
+                    self.camera.pause()
+                broadcaster.wait_for_clients()
+                self.camera.resume()
+                budget.activate(self.camera_id)
+
+                # Limite globale di inferenze al secondo: se questa telecamera ha già avuto la
+                # sua parte, attende. Il frame letto dopo l'attesa sarà comunque il più recente.
+                wait = last_inference + budget.interval() - time.perf_counter()
+                if wait > 0:
+                    time.sleep(wait)
+
+                # Prende il frame più recente letto dal thread di cattura (un array NumPy).
+                # Se il modello è stato più lento della sorgente, i frame intermedi sono già stati scartati.
+                last_id, frame = self.camera.read(last_id)
+                if frame is None:
+                    # Se non arrivano più frame (es. webcam disconnessa), interrompe il ciclo.
+                    print(f"Telecamera {self.camera_id}: cattura terminata, {self.camera.frame_id} frame letti, "
+                          f"{self.camera.dropped} scartati perché superati.")
+                    break
+
+                # --- PRE-ELABORAZIONE DEL FRAME ---
+                # 1. Specchia l'immagine orizzontalmente (`frame`, BGR: il formato standard di OpenCV,
+                #    su cui disegnare e da codificare in JPEG).
+                # 2. Ne ricava la versione RGB richiesta da MediaPipe (`frame_rgb`).
+                # Entrambe finiscono in buffer riutilizzati: nessuna nuova copia per frame.
+                frame, frame_rgb = preprocess(frame)
+
+                # --- INFERENZA DEL MODELLO ---
+                # Qui avviene la magia. Lo scheduler passa il frame (o un suo ritaglio) al modello AI,
+                # che rileva le mani e calcola la posizione dei 21 landmark per ciascuna.
+                # Il risultato è un unico array NumPy di forma (mani, 21, 3).
+                # `budget.slots` limita le inferenze contemporanee su tutte le telecamere, e in
+                # modalità asincrona il modello gira in un thread del pool (vedi sezione 0).
+                last_inference = time.perf_counter()
+                with budget.slots:
+                    hands_array, _ = run_blocking(scheduler.process, frame_rgb)
+
+                if scheduler.enabled and time.perf_counter() - scheduler.window_start >= SCHEDULER_REPORT_INTERVAL:
+                    print(f"Scheduler (telecamera {self.camera_id}): {scheduler.summary()}")
+                    scheduler.reset_stats()
+
+                # Disegna SEMPRE lo scheletro delle mani, usando gli stili personalizzati.
+                # Questo viene fatto ad ogni frame, indipendentemente dal riconoscimento dei gesti.
+                # In modalità 'landmarks' lo scheletro lo disegna il browser.
+                if STREAM_MODE == 'mjpeg':
+                    draw_hands(frame, hands_array)
+
+                # --- REGISTRAZIONE DEI LANDMARK ---
+                # Una copia in un blocco già allocato: il disco viene toccato ogni qualche migliaio di frame.
+                if self.recorder is not None:
+                    self.recorder.append(hands_array)
+
+                # --- RICONOSCIMENTO DEI GESTI ---
+                self.recognize(hands_array)
+
+                # --- INVIO DEI LANDMARK (modalità 'landmarks') ---
+                # Un solo messaggio binario per frame a tutta la stanza, anche senza mani
+                # (blocco vuoto), così il browser sa quando cancellare lo scheletro.
+                if STREAM_MODE == 'landmarks' and broadcaster.listeners:
+                    socketio.emit('landmarks', hands_to_bytes(hands_array), to=self.landmark_room)
+
+                # Se nessun client sta guardando il video MJPEG (es. tutti usano `?video=local`),
+                # la codifica JPEG viene saltata del tutto.
+                if not broadcaster.clients:
+                    continue
+
+                # --- STREAMING DEL FRAME AL BROWSER ---
+                # Ogni client ha il suo profilo (scala e qualità JPEG) e i suoi FPS: chiediamo
+                # quali profili servono in questo istante. Se nessun client aspetta un frame
+                # (es. tutti a FPS ridotti), la codifica viene saltata.
+                now = time.perf_counter()
+                levels = broadcaster.levels_wanted(now)
+                if not levels:
+                    continue
+                # Codifica il frame (con i disegni sopra) in JPEG in memoria, una volta per profilo.
+                encoded = run_blocking(broadcaster.encoder.encode, frame, levels)
+                # Consegna a ogni client il frame nel suo profilo.
+                broadcaster.publish(encoded, now)
+
+    def start_recording(self):
+        """Apre una nuova registrazione dei landmark di questa telecamera in RECORD_DIR."""
+        name = f"camera{self.camera_id}-{time.strftime('%Y%m%d-%H%M%S')}{RECORDING_SUFFIX}"
+        self.recorder = LandmarkRecorder(Path(RECORD_DIR) / name, model='hands',
+                                         metadata={'source': str(self.spec), 'camera_id': self.camera_id})
+        # Se il server si chiude mentre il thread è ancora attivo, scrive su disco le righe ancora
+        # in memoria; i frame che il thread elabora dopo vengono ignorati (vedi LandmarkRecorder.append).
+        atexit.register(self.recorder.close)
+        print(f"Telecamera {self.camera_id}: registrazione dei landmark in {self.recorder.path}")
+
+    def create_scheduler(self, models):
+        """
+        Crea lo scheduler dell'inferenza con i modelli di questa telecamera: nel thread
+        (modelli registrati in `models`, un contextlib.ExitStack) o nel pool di processi.
+        """
+        options = dict(detect_every=DETECT_EVERY, skip_frames=SKIP_FRAMES, roi_size=ROI_SIZE)
+
+        if inference_pool is not None:
+            # I modelli vivono nei processi del pool, uno per flusso: il frame intero e i
+            # ritagli della ROI sono due flussi distinti (vedi sotto). Il pool restituisce
+            # già l'array (mani, 21, 3), quindi la conversione non serve.
+            def infer(stream, image):
+                return inference_pool.submit(stream, image).result()
+            return InferenceScheduler(
+                detect=lambda image: infer((self.camera_id, 'full'), image),
+                track=(lambda image: infer((self.camera_id, 'roi'), image)) if DETECT_EVERY > 1 else None,
+                to_array=lambda hands: hands,
+                **options,
+            )
+
+        # Inizializza il modello `Hands` come context manager (come in un blocco `with`): è il modo
+        # raccomandato perché gestisce automaticamente l'allocazione e il rilascio delle risorse.
+        # `min_detection_confidence`: soglia di confidenza per rilevare una mano in un'immagine (70%).
+        # `min_tracking_confidence`: soglia per continuare a tracciare una mano già rilevata (50%).
+        hands = models.enter_context(mp_hands.Hands(min_detection_confidence=0.7, min_tracking_confidence=0.5))
+        # Con lo scheduler attivo, i ritagli intorno alla mano vanno a un secondo modello:
+        # MediaPipe ricorda la posizione della mano tra un frame e l'altro, e mescolare nello
+        # stesso modello frame interi e ritagli (con coordinate diverse) lo confonderebbe.
+        roi_hands = None
+        if DETECT_EVERY > 1:
+            roi_hands = models.enter_context(mp_hands.Hands(min_detection_confidence=0.7, min_tracking_confidence=0.5))
+        return InferenceScheduler(
+            detect=lambda image: hands.process(image).multi_hand_landmarks,
+            track=(lambda image: roi_hands.process(image).multi_hand_landmarks) if roi_hands else None,
+            **options,
+        )
+
+    def recognize(self, hands_array):
+        """
+        Esegue il riconoscimento dei gesti per ogni browser che guarda questa telecamera e
+        ha premuto il bottone. Ogni sessione ha il suo motore: i gesti (e il loro debounce)
+        di un browser non interferiscono con quelli degli altri.
+        """
+        actions = []
+        with sessions_lock:
+            for sid, state in sessions.items():
+                # Esegue la logica di riconoscimento SOLO se l'utente ha premuto il bottone.
+                if state.camera_id != self.camera_id or not state.is_recognizing:
+                    continue
+                # Il motore calcola in un colpo solo le distanze tra le dita di tutti i gesti
+                # su tutte le mani e restituisce i gesti appena iniziati, (mano, nome).
+                events = state.gesture_engine.update(hands_array)
+                if events:
+                    # Il primo gesto trovato (per mano e ordine di definizione) diventa l'azione.
+                    _, gesture_name = events[0]
+                    actions.append((sid, f"{gesture_name} Rilevata"))  # Prepara una stringa per il log.
+                    # Disattiva subito il riconoscimento per evitare azioni multiple e accidentali.
+                    # L'utente dovrà premere di nuovo il bottone per un'altra azione.
+                    state.is_recognizing = False
+
+        # Invia l'azione al solo browser che l'ha chiesta, tramite un evento WebSocket chiamato
+        # 'action_log' (fuori dal lock: l'invio può richiedere tempo). Il payload è un dizionario JSON.
+        for sid, action in actions:
+            socketio.emit('action_log', {'data': action}, to=sid)
+
+    def generate_frames(self):
+        """
+        Funzione generatore che produce il flusso MJPEG per un singolo client.
+        Non elabora nulla: riceve i frame già pronti dal thread di inferenza.
+        """
+        self.start()
+        client = self.broadcaster.add_client()
+        try:
+            for frame_bytes in self.broadcaster.frames(client):
+                # `yield` è la parola chiave che rende questa funzione un generatore.
+                # Invia il frame al client, formattato secondo lo standard dello streaming MJPEG.
+                chunk = (b'--frame\r\n'
+                         b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
+                # Il server riprende il generatore solo dopo aver scritto il frame sul socket:
+                # il tempo trascorso dice quanto è veloce la rete di questo client.
+                start = time.perf_counter()
+                yield chunk
+                self.broadcaster.report_sent(client, len(chunk), time.perf_counter() - start)
+        finally:
+            # Eseguito anche quando il browser chiude la connessione (il generatore viene chiuso).
+            self.broadcaster.remove_client(client)
+
+    def stats(self):
+        """Lo stato della telecamera e dello streaming verso i suoi client."""
+        return {
+            'camera': self.camera_id,
+            'source': self.source.describe(),
+            'frames_read': self.camera.frame_id,
+            'frames_dropped': self.camera.dropped,
+            'capture_paused': self.camera.paused,
+            # Riconnessioni dei flussi di rete (None per webcam, video e sorgenti sintetiche).
+            'reconnections': getattr(self.source, 'reconnections', None),
+            'landmark_listeners': len(self.broadcaster.listeners),
+            'clients': self.broadcaster.stats(),
+            'profiles': self.broadcaster.encoder.stats(),
+            'recording': None if self.recorder is None else {
+                'path': str(self.recorder.path),
+                'frames': self.recorder.frames,
+            },
+        }
+
+
+# Una pipeline per ogni sorgente configurata; l'indice nella lista è l'id della telecamera.
+pipelines = [CameraPipeline(camera_id, spec) for camera_id, spec in enumerate(CAMERA_SOURCES)]
+
+
+def get_pipeline(camera_id):
+    """La pipeline della telecamera richiesta, o un errore 404 se non esiste."""
+    if not 0 <= camera_id < len(pipelines):
+        abort(404, description=f"Telecamera {camera_id} inesistente (disponibili: 0-{len(pipelines) - 1})")
+    return pipelines[camera_id]
 
 # --- 6. ROUTING E GESTIONE DEGLI EVENTI ---
 
@@ -170,27 +893,87 @@ def generate_frames():
 @app.route('/')
 def index():
     # Questa funzione semplicemente carica e restituisce il file 'index.html' al browser.
-    return render_template('index.html')
+    # `/?camera=N` sceglie la telecamera (predefinita: la 0).
+    # Al template passiamo la modalità di streaming e, in modalità 'landmarks', se il
+    # video deve arrivare dalla webcam del browser (`/?video=local`) invece che dal server
+    # (solo se è la stessa telecamera del server, vedi STREAM_MODE nella sezione 3).
+    camera_id = request.args.get('camera', 0, type=int)
+    get_pipeline(camera_id)
+    local_video = STREAM_MODE == 'landmarks' and request.args.get('video') == 'local'
+    return render_template('index.html', stream_mode=STREAM_MODE, local_video=local_video,
+                           camera_id=camera_id, camera_count=len(pipelines))
 
-# Il decoratore `@app.route('/video_feed')` collega questo URL allo streaming.
-# L'HTML userà questo URL nell'attributo `src` del tag `<img>`.
-@app.route('/video_feed')
-def video_feed():
-    # Restituisce una 'Response' di tipo streaming, che esegue la nostra funzione generatore.
+# Il decoratore `@app.route('/video_feed/<camera_id>')` collega questo URL allo streaming.
+# L'HTML userà questo URL nell'attributo `src` del tag `<img>`. `/video_feed` da solo
+# è la telecamera 0, come quando il server ne gestiva una sola.
+@app.route('/video_feed', defaults={'camera_id': 0})
+@app.route('/video_feed/<int:camera_id>')
+def video_feed(camera_id):
+    # Restituisce una 'Response' di tipo streaming, che esegue la funzione generatore della pipeline.
     # Il mimetype `multipart/x-mixed-replace` dice al browser di aspettarsi un flusso di dati
     # che si aggiornano continuamente (il nostro video).
-    return Response(generate_frames(), mimetype='multipart/x-mixed-replace; boundary=frame')
+    pipeline = get_pipeline(camera_id)
+    return Response(pipeline.generate_frames(), mimetype='multipart/x-mixed-replace; boundary=frame')
+
+# `/stats` restituisce in JSON, per ogni telecamera, profilo (scala e qualità JPEG), FPS,
+# velocità di rete e latenza stimata di ogni client, e i tempi di codifica di ogni profilo.
+@app.route('/stats')
+def stats():
+    return jsonify({
+        'latency_budget_ms': LATENCY_BUDGET * 1000,
+        'adaptive': ADAPTIVE_STREAM,
+        'cameras': [pipeline.stats() for pipeline in pipelines],
+        # Profondità delle code e contatori del pool di inferenza (se attivo).
+        'inference_pool': inference_pool.stats() if inference_pool is not None else None,
+    })
+
+@socketio.on('connect')
+def handle_connect():
+    """Un browser apre la connessione WebSocket: la telecamera arriva nella query (`?camera=N`)."""
+    camera_id = request.args.get('camera', 0, type=int)
+    if not 0 <= camera_id < len(pipelines):
+        # Rifiuta la connessione: non c'è nessuna telecamera da guardare.
+        return False
+    with sessions_lock:
+        sessions[request.sid] = SessionState(camera_id)
 
 # Il decoratore `@socketio.on(...)` registra una funzione per gestire un evento WebSocket
 # specifico inviato dal client JavaScript.
 @socketio.on('toggle_recognition')
 def handle_toggle_recognition():
     """Questa funzione viene eseguita quando il server riceve l'evento 'toggle_recognition' dal browser."""
-    global is_recognizing
-    # Attiva l'interruttore del riconoscimento (solo se era spento).
-    if not is_recognizing:
-        is_recognizing = True
-        print("Riconoscimento ATTIVATO.") # Log sul terminale del server per debug.
+    with sessions_lock:
+        state = sessions.get(request.sid)
+        # Attiva l'interruttore del riconoscimento di QUESTO browser (solo se era spento).
+        if state is not None and not state.is_recognizing:
+            # Il motore dei gesti riparte da zero a ogni nuova richiesta.
+            state.gesture_engine.reset()
+            state.is_recognizing = True
+            # Log sul terminale del server per debug.
+            print(f"Riconoscimento ATTIVATO (telecamera {state.camera_id}, sessione {request.sid}).")
+
+@socketio.on('subscribe_landmarks')
+def handle_subscribe_landmarks():
+    """Il browser (in modalità 'landmarks') chiede di ricevere le coordinate delle mani."""
+    with sessions_lock:
+        state = sessions.get(request.sid)
+    if state is None:
+        return
+    # `request.sid` è l'identificativo della sessione WebSocket di questo browser.
+    pipeline = pipelines[state.camera_id]
+    join_room(pipeline.landmark_room)
+    pipeline.broadcaster.add_listener(request.sid)
+    pipeline.start()
+
+@socketio.on('disconnect')
+def handle_disconnect():
+    """Eseguita quando un browser chiude la connessione WebSocket."""
+    with sessions_lock:
+        state = sessions.pop(request.sid, None)
+    # Socket.IO toglie il client dalle stanze da solo; noi aggiorniamo il conteggio
+    # usato per mettere in pausa il modello quando nessuno guarda.
+    if state is not None:
+        pipelines[state.camera_id].broadcaster.remove_listener(request.sid)
 
 # --- 7. AVVIO DELL'APPLICAZIONE ---
 
@@ -200,7 +983,18 @@ if __name__ == '__main__':
     # `socketio.run()` avvia il server web. È una versione potenziata di `app.run()`
     # che include il supporto per i WebSockets.
     # `host='0.0.0.0'` rende il server accessibile da altri dispositivi sulla stessa rete locale.
-    # `port=8888` imposta la porta su cui il server si mette in ascolto.
-    # `debug=True` attiva la modalità di debug, che ricarica automaticamente il server ad ogni modifica
-    # del codice e mostra errori dettagliati nel browser. Da non usare in produzione!
-    socketio.run(app, host='0.0.0.0', port=8888, debug=True)
\ No newline at end of file
+    # `port` imposta la porta su cui il server si mette in ascolto (8888, o HAND_TRACKING_PORT).
+    port = int(os.environ.get('HAND_TRACKING_PORT', '8888'))
+    print(f"Server in modalità '{SERVER_MODE}' sulla porta {port}.")
+    if SERVER_MODE == 'dev':
+        # `debug=True` attiva la modalità di debug, che ricarica automaticamente il server ad ogni modifica
+        # del codice e mostra errori dettagliati nel browser. Da non usare in produzione!
+        # Il ricaricamento esegue questo file due volte (nel processo che osserva i file e in quello
+        # che serve le richieste): con il pool di inferenza avremmo due pool, uno mai usato, con il
+        # doppio dei processi e della memoria condivisa. In quel caso il ricaricamento è disattivato.
+        socketio.run(app, host='0.0.0.0', port=port, debug=True, use_reloader=not INFERENCE_WORKERS)
+    else:
+        # In produzione: niente debug né ricaricamento (che avvierebbe un secondo processo
+        # con una seconda webcam e un secondo modello). Con eventlet/gevent `socketio.run`
+        # usa il loro server WSGI asincrono al posto di quello di Werkzeug.
+        socketio.run(app, host='0.0.0.0', port=port)
@@ -5,13 +5,28 @@ Salva le immagini in cartelle con il nome del file PDF (senza caratteri speciali
 """
 
 import argparse
+import contextlib
+import fnmatch
+import hashlib
+import io
+import json
+import os
 import re
 import sys
+import math
+import time
+import threading
 import shutil
 import signal
+import queue
+import random
+import tempfile
+import multiprocessing
+import zlib
 from pathlib import Path
+from collections import OrderedDict
 from datetime import datetime
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
 from pdf2image import convert_from_path
 from pdf2image.exceptions import PDFInfoNotInstalledError, PDFPageCountError
 from alive_progress import alive_bar
@@ -22,13 +37,62 @@ interrupted = False
 # Flag per verbose logging
 VERBOSE = False
 
+# Numero massimo di pagine renderizzate da una singola invocazione di pdftoppm.
+# Intervalli più lunghi riducono il re-parsing del PDF ma occupano più spazio
+# temporaneo su disco (le pagine vengono scritte come PPM non compressi).
+POPPLER_RANGE_PAGES = 16
+
+# Manifest della modalità --incremental, salvato nella cartella di ogni PDF
+MANIFEST_NAME = '.manifest.json'
+MANIFEST_VERSION = 1
+# Intervallo minimo (secondi) tra due salvataggi del manifest durante la conversione
+MANIFEST_SAVE_INTERVAL = 2.0
+
+# Cache persistente dei metadati dei PDF (impostata in main, None = disabilitata)
+PDF_INFO_CACHE = None
+PDF_INFO_CACHE_VERSION = 1
+
+# Documenti fitz tenuti aperti contemporaneamente da ogni processo worker PyMuPDF
+WORKER_OPEN_DOCUMENTS = 4
+
+# Task in volo per worker nella coda globale (--global-queue)
+GLOBAL_QUEUE_DEPTH = 2
+
+# Thread usati per scansionare le sottocartelle con --recursive
+DISCOVERY_THREADS = 8
+
+# --threads auto: pagine campione per la calibrazione, intervallo (secondi) tra due
+# aggiustamenti, frazione della memoria disponibile usata come tetto senza --max-memory
+# e frazione della memoria totale da lasciare sempre libera
+AUTOTUNE_SAMPLE_PAGES = 2
+AUTOTUNE_INTERVAL = 2.0
+AUTOTUNE_MEMORY_FRACTION = 0.5
+AUTOTUNE_MEMORY_RESERVE = 0.1
+# Memoria stimata di un processo worker PyMuPDF senza pagine (interprete + fitz) e
+# lavoro minimo (secondi) per cui conviene avviare un processo in più
+PYMUPDF_PROCESS_BYTES = 80 * 2**20
+PYMUPDF_PROCESS_MIN_SECONDS = 0.5
+
+# Tempi per fase della conversione (impostato in main con --timings, None = disabilitato)
+STAGE_TIMINGS = None
+_NO_TIMING = contextlib.nullcontext()
+
+# Qualità JPEG predefinita del backend PyMuPDF (quella di pix.save), senza --quality
+PYMUPDF_JPEG_QUALITY = 95
+
 # Flag per verificare disponibilità PyMuPDF
 PYMUPDF_AVAILABLE = False
 try:
-    import fitz  # PyMuPDF
+    # Le versioni recenti stampano un avviso su stdout importando `fitz`: si usa il
+    # nome nuovo del modulo, con lo stesso alias, e `fitz` solo per le versioni vecchie
+    import pymupdf as fitz  # PyMuPDF
     PYMUPDF_AVAILABLE = True
 except ImportError:
-    pass
+    try:
+        import fitz  # PyMuPDF < 1.24.3
+        PYMUPDF_AVAILABLE = True
+    except ImportError:
+        pass
 
 
 def vprint(*args, **kwargs):
@@ -195,541 +259,3250 @@ def parse_pages(pages_str, total_pages=None):
     return sorted(pages)
 
 
-def convert_single_page(pdf_path, page_num, output_path, dpi, image_format):
+def split_page_ranges(pages_list, max_range_pages):
     """
-    Converte una singola pagina del PDF in immagine.
+    Raggruppa una lista ordinata di pagine in intervalli contigui.
+    
+    Ogni intervallo contiene al massimo max_range_pages pagine, così da poter
+    essere renderizzato con una sola invocazione di pdftoppm.
     
     Args:
-        pdf_path: Percorso del file PDF
-        page_num: Numero della pagina (1-based)
-        output_path: Percorso dove salvare l'immagine
-        dpi: Risoluzione
-        image_format: Formato immagine (jpg, png)
+        pages_list: Lista ordinata di numeri di pagina (1-based)
+        max_range_pages: Numero massimo di pagine per intervallo
         
     Returns:
-        Numero della pagina se successo, None altrimenti
+        Lista di tuple (prima_pagina, ultima_pagina), estremi inclusi
     """
-    global interrupted
+    ranges = []
+    for page_num in pages_list:
+        if ranges:
+            first, last = ranges[-1]
+            if page_num == last + 1 and last - first + 1 < max_range_pages:
+                ranges[-1] = (first, page_num)
+                continue
+        ranges.append((page_num, page_num))
+    return ranges
+
+
+class StageTimings:
+    """
+    Tempi per fase e per pagina della conversione (--timings).
     
-    if interrupted:
-        return None
+    Le fasi sono open (lettura del PDF), render (rasterizzazione), convert
+    (decodifica, conversione di colore e ridimensionamento), encode (compressione
+    JPEG/PNG) e write (scrittura su disco). Gli eventi vengono raccolti per
+    cartella di output e riportati alla fine di ogni file come tabella o come
+    righe JSON.
+    """
     
-    try:
-        vprint(f"[VERBOSE] Thread: Conversione pagina {page_num} da {pdf_path.name}")
-        
-        # Converti SOLO questa pagina
-        pages = convert_from_path(
-            str(pdf_path),
-            dpi=dpi,
-            first_page=page_num,
-            last_page=page_num,
-            thread_count=1
-        )
-        
-        if not pages:
-            vprint(f"[VERBOSE] Thread: ERRORE - Nessuna pagina restituita per pagina {page_num}")
-            return None
-        
-        page = pages[0]
-        vprint(f"[VERBOSE] Thread: Pagina {page_num} caricata, dimensioni: {page.size}")
-        
-        # Determina il formato di salvataggio
-        if image_format.lower() in ['jpg', 'jpeg']:
-            save_format = 'JPEG'
-            # Converti in RGB se necessario (JPEG non supporta alpha channel)
-            if page.mode in ('RGBA', 'LA', 'P'):
-                vprint(f"[VERBOSE] Thread: Conversione pagina {page_num} da {page.mode} a RGB")
-                page = page.convert('RGB')
-        else:
-            save_format = 'PNG'
+    STAGES = ('open', 'render', 'convert', 'encode', 'write')
+    
+    def __init__(self, mode='table', jsonl_path=None):
+        """
+        Args:
+            mode: 'table' (riepilogo a fine file) o 'jsonl' (una riga JSON per evento)
+            jsonl_path: File a cui aggiungere le righe JSON, None = stdout
+        """
+        self.mode = mode
+        self.jsonl_path = jsonl_path
+        self.events = {}
+        self._lock = threading.Lock()
+    
+    def record(self, output_dir, stage, page, seconds, pages=1):
+        """Registra la durata di una fase (page None per le fasi dell'intero file)."""
+        with self._lock:
+            self.events.setdefault(str(output_dir), []).append((stage, page, pages, seconds))
+    
+    @contextlib.contextmanager
+    def measure(self, output_dir, stage, page=None, pages=1):
+        """Context manager che registra la durata del blocco."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(output_dir, stage, page, time.perf_counter() - start, pages)
+    
+    def take(self, output_dir):
+        """Rimuove e restituisce gli eventi registrati per una cartella di output."""
+        with self._lock:
+            return self.events.pop(str(output_dir), [])
+    
+    def add(self, output_dir, events):
+        """Aggiunge gli eventi ricevuti da un processo worker."""
+        with self._lock:
+            self.events.setdefault(str(output_dir), []).extend(events)
+    
+    def report(self, output_dir, pdf_path):
+        """
+        Riporta gli eventi di un file come tabella o righe JSON e li rimuove.
         
-        vprint(f"[VERBOSE] Thread: Salvataggio pagina {page_num} come {save_format} in {output_path}")
-        page.save(output_path, save_format)
-        vprint(f"[VERBOSE] Thread: Pagina {page_num} salvata con successo")
+        Args:
+            output_dir: Cartella di output del PDF
+            pdf_path: Percorso del file PDF
+        """
+        events = self.take(output_dir)
+        if not events:
+            return
         
-        return page_num
+        if self.mode == 'jsonl':
+            lines = [json.dumps({'file': str(pdf_path), 'stage': stage, 'page': page,
+                                 'pages': pages, 'ms': round(seconds * 1000, 3)})
+                     for stage, page, pages, seconds in events]
+            if self.jsonl_path is None:
+                print('\n'.join(lines))
+            else:
+                with open(self.jsonl_path, 'a', encoding='utf-8') as f:
+                    f.write('\n'.join(lines) + '\n')
+            return
         
-    except Exception as e:
-        vprint(f"[VERBOSE] Thread: ERRORE nella conversione pagina {page_num}: {e}")
-        return None
+        print(f"[TEMPI] {pdf_path.name} (tempo sommato su tutti i thread/processi)")
+        print(f"  {'FASE':<8} {'PAGINE':>6} {'TOTALE s':>9} {'MEDIA ms':>9} "
+              f"{'P50 ms':>8} {'P95 ms':>8}")
+        for stage in self.STAGES:
+            stage_events = [e for e in events if e[0] == stage]
+            if not stage_events:
+                continue
+            total = sum(seconds for _, _, _, seconds in stage_events)
+            per_page = []
+            for _, page, pages, seconds in stage_events:
+                if page is not None:
+                    per_page.extend([seconds * 1000 / pages] * pages)
+            if per_page:
+                print(f"  {stage:<8} {len(per_page):>6} {total:>9.3f} "
+                      f"{sum(per_page) / len(per_page):>9.1f} "
+                      f"{percentile(per_page, 50):>8.1f} {percentile(per_page, 95):>8.1f}")
+            else:
+                print(f"  {stage:<8} {'-':>6} {total:>9.3f}")
+        print()
 
 
-def convert_pdf_with_pymupdf(pdf_path, output_dir, dpi=300, max_workers=8, 
-                             image_format='jpg', no_annotations=False,
-                             pages_to_convert=None):
+def timed(output_dir, stage, page=None, pages=1):
     """
-    Converte PDF in immagini usando PyMuPDF (con controllo annotazioni).
+    Misura una fase della conversione se --timings è attivo.
+    
+    Senza --timings restituisce un contesto nullo condiviso, così il costo per
+    pagina è una chiamata di funzione.
     
     Args:
-        pdf_path: Percorso del file PDF
-        output_dir: Directory dove salvare le immagini
-        dpi: Risoluzione delle immagini
-        max_workers: Numero massimo di thread
-        image_format: Formato immagine (jpg, png)
-        no_annotations: Se True, rimuove le annotazioni
-        pages_to_convert: Lista di numeri di pagina (1-based) da convertire, o None per tutte
+        output_dir: Cartella di output del PDF
+        stage: Nome della fase (vedi StageTimings.STAGES)
+        page: Numero della pagina, None per le fasi dell'intero file
+        pages: Pagine coperte dalla misura (intervalli renderizzati da pdftoppm)
+    """
+    if STAGE_TIMINGS is None:
+        return _NO_TIMING
+    return STAGE_TIMINGS.measure(output_dir, stage, page, pages)
+
+
+def percentile(values, q):
+    """
+    Percentile q (0-100) con interpolazione lineare.
+    
+    Args:
+        values: Lista di valori
+        q: Percentile richiesto
         
     Returns:
-        True se la conversione è riuscita, False altrimenti
+        Valore del percentile, None se values è vuota
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100.0
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+class EncodeOptions:
+    """
+    Parametri degli encoder di immagini (--quality, --optimize, --compress-level,
+    --grayscale), condivisi da entrambi i backend.
     """
-    global interrupted
-    
-    if interrupted:
-        return False
-    
-    # Normalizza il formato
-    file_extension = image_format.lower()
-    if file_extension == 'jpeg':
-        file_extension = 'jpg'
     
-    vprint(f"[VERBOSE] Apertura PDF con PyMuPDF: {pdf_path}")
+    def __init__(self, quality=None, optimize=False, compress_level=None, grayscale='never'):
+        """
+        Args:
+            quality: Qualità JPEG/WebP (1-100), None = default dell'encoder
+            optimize: Se True, tabelle di Huffman ottimizzate (JPEG), compressione
+                      massima (PNG) e metodo più lento ma più compatto (WebP)
+            compress_level: Livello zlib per PNG (0-9), None = default di Pillow (6)
+            grayscale: 'never', 'always' (tutte le pagine in scala di grigi) o
+                       'auto' (solo le pagine senza colore, es. solo testo)
+        """
+        self.quality = quality
+        self.optimize = optimize
+        self.compress_level = compress_level
+        self.grayscale = grayscale
     
-    try:
-        # Apri il PDF
-        doc = fitz.open(pdf_path)
-        total_pages = len(doc)
-        vprint(f"[VERBOSE] PDF aperto, totale pagine: {total_pages}")
-        
-        if total_pages == 0:
-            print("  [ERRORE] Nessuna pagina trovata nel PDF.")
-            doc.close()
-            return False
-        
-        # Calcola il fattore di zoom per ottenere il DPI desiderato
-        # PyMuPDF usa 72 DPI di default
-        zoom = dpi / 72.0
-        mat = fitz.Matrix(zoom, zoom)
-        vprint(f"[VERBOSE] Fattore di zoom calcolato: {zoom} (per {dpi} DPI)")
-        
-        # Determina le pagine da convertire
-        if pages_to_convert is not None:
-            pages_list = [p for p in pages_to_convert if 1 <= p <= total_pages]
-            out_of_range = [p for p in pages_to_convert if p < 1 or p > total_pages]
-            if out_of_range:
-                print(f"  [AVVISO] Pagine fuori range (1-{total_pages}) ignorate: {out_of_range}")
-            vprint(f"[VERBOSE] PyMuPDF: Pagine da convertire: {pages_list}")
-        else:
-            pages_list = list(range(1, total_pages + 1))
+    def as_dict(self):
+        """Parametri diversi dal default, registrati nel manifest di --incremental."""
+        defaults = EncodeOptions()
+        return {key: value for key, value in vars(self).items()
+                if value != getattr(defaults, key)}
 
-        n_to_convert = len(pages_list)
-        if n_to_convert == 0:
-            print("  [ERRORE] Nessuna pagina valida da convertire.")
-            doc.close()
-            return False
 
-        print(f"[SALVATAGGIO] {n_to_convert} pagine in corso (totale PDF: {total_pages})...")
-        
-        saved_pages = 0
-        
-        with alive_bar(n_to_convert, title='  Progresso', bar='smooth') as bar:
-            for page_num_1based in pages_list:
-                page_num = page_num_1based - 1  # PyMuPDF usa indici 0-based
-                if interrupted:
-                    print("\n[INTERRUZIONE] Salvataggio interrotto")
-                    break
-                
-                try:
-                    vprint(f"[VERBOSE] PyMuPDF: Processamento pagina {page_num + 1}/{total_pages}")
-                    page = doc[page_num]
-                    
-                    # Se no_annotations è True, rimuovi le annotazioni prima del rendering
-                    if no_annotations:
-                        vprint(f"[VERBOSE] PyMuPDF: Rimozione annotazioni dalla pagina {page_num + 1}")
-                        # Ottieni tutte le annotazioni della pagina
-                        annot = page.first_annot
-                        annot_count = 0
-                        while annot:
-                            next_annot = annot.next
-                            page.delete_annot(annot)
-                            annot = next_annot
-                            annot_count += 1
-                        if annot_count > 0:
-                            vprint(f"[VERBOSE] PyMuPDF: Rimosse {annot_count} annotazioni dalla pagina {page_num + 1}")
-                    
-                    # Renderizza la pagina
-                    vprint(f"[VERBOSE] PyMuPDF: Rendering pagina {page_num + 1}")
-                    pix = page.get_pixmap(matrix=mat, alpha=False)
-                    vprint(f"[VERBOSE] PyMuPDF: Pixmap creato, dimensioni: {pix.width}x{pix.height}")
-                    
-                    # Salva l'immagine
-                    output_path = output_dir / f"page_{page_num + 1:04d}.{file_extension}"
-                    
-                    if file_extension == 'png':
-                        vprint(f"[VERBOSE] PyMuPDF: Salvataggio come PNG: {output_path}")
-                        pix.save(str(output_path))
-                    else:  # jpg/jpeg
-                        # Per JPG, converti in RGB se necessario
-                        if pix.n > 3:  # CMYK o altro
-                            vprint(f"[VERBOSE] PyMuPDF: Conversione colorspace da n={pix.n} a RGB")
-                            pix = fitz.Pixmap(fitz.csRGB, pix)
-                        vprint(f"[VERBOSE] PyMuPDF: Salvataggio come JPEG: {output_path}")
-                        pix.save(str(output_path), output='jpeg')
-                    
-                    saved_pages += 1
-                    bar()
-                    
-                except Exception as e:
-                    print(f"\n  [ERRORE] Pagina {page_num_1based}: {e}")
-                    vprint(f"[VERBOSE] PyMuPDF: Traceback completo: {e}")
-                    bar()
-        
-        doc.close()
-        vprint(f"[VERBOSE] PyMuPDF: Documento chiuso")
-        
-        if interrupted:
-            print(f"[PARZIALE] {saved_pages}/{n_to_convert} pagine salvate prima dell'interruzione\n")
-            return False
+# Parametri degli encoder (impostati in main, passati ai processi worker PyMuPDF)
+ENCODE_OPTIONS = EncodeOptions()
+
+
+def is_grayscale(image):
+    """
+    Verifica se un'immagine RGB non contiene colore (R = G = B in ogni pixel).
+    
+    Il controllo avviene su tutti i pixel, senza ridurre l'immagine: la media di un
+    blocco può essere grigia anche se il blocco contiene colore (retini, dithering,
+    un pixel colorato tenue tra pixel bianchi). Le differenze tra i canali sono
+    calcolate in C da Pillow, quindi restano veloci anche sulle pagine grandi.
+    
+    Args:
+        image: Immagine PIL
         
-        print(f"[COMPLETATO] {saved_pages}/{n_to_convert} immagini salvate\n")
+    Returns:
+        True se l'immagine può essere salvata in scala di grigi senza perdite
+    """
+    from PIL import ImageChops
+    
+    if image.mode in ('1', 'L'):
         return True
-        
-    except Exception as e:
-        print(f"  [ERRORE] Errore durante la conversione con PyMuPDF: {e}")
-        vprint(f"[VERBOSE] PyMuPDF: Traceback completo: {e}")
-        # Tenta di chiudere il documento se è stato aperto
-        try:
-            doc.close()
-            vprint(f"[VERBOSE] PyMuPDF: Documento chiuso nel gestore eccezioni")
-        except Exception:
-            pass
+    if image.mode != 'RGB':
         return False
+    red, green, blue = image.split()
+    return (ImageChops.difference(red, green).getbbox() is None
+            and ImageChops.difference(green, blue).getbbox() is None)
 
 
-def get_pdf_page_count(pdf_path):
+def pixmap_to_image(pix):
     """
-    Ottiene il numero di pagine del PDF usando pdfinfo.
+    Espone i campioni di un pixmap PyMuPDF come immagine PIL.
+    
+    Il buffer del pixmap viene passato a Pillow come memoryview (samples_mv), senza
+    la copia di pix.samples. Pillow lo condivide direttamente per i pixmap in
+    scala di grigi; per RGB lo decomprime una sola volta nel proprio formato.
+    Il pixmap deve restare in vita finché l'immagine viene usata.
     
     Args:
-        pdf_path: Percorso del file PDF
+        pix: Pixmap fitz senza canale alpha (1 o 3 componenti)
         
     Returns:
-        Numero di pagine o None se errore
+        Immagine PIL in modo L o RGB
     """
-    vprint(f"[VERBOSE] Ottenimento numero pagine con pdfinfo per: {pdf_path}")
-    try:
-        import subprocess
-        result = subprocess.run(
-            ['pdfinfo', str(pdf_path)],
-            capture_output=True,
-            text=True,
-            check=True,
-            timeout=30
-        )
-        vprint(f"[VERBOSE] Output pdfinfo ricevuto")
-        
-        for line in result.stdout.split('\n'):
-            if line.startswith('Pages:'):
-                try:
-                    page_count = int(line.split(':')[1].strip())
-                except (ValueError, IndexError):
-                    vprint(f"[VERBOSE] ERRORE: Impossibile convertire il valore Pages in intero: '{line}'")
-                    return None
-                vprint(f"[VERBOSE] Numero pagine rilevato: {page_count}")
-                return page_count
-        
-        vprint(f"[VERBOSE] ERRORE: Campo 'Pages:' non trovato nell'output di pdfinfo")
-        return None
-        
-    except subprocess.TimeoutExpired:
-        vprint(f"[VERBOSE] ERRORE: Timeout durante l'esecuzione di pdfinfo")
-        return None
-    except subprocess.CalledProcessError as e:
-        vprint(f"[VERBOSE] ERRORE: pdfinfo terminato con codice {e.returncode}")
-        return None
-    except Exception as e:
-        vprint(f"[VERBOSE] ERRORE: Eccezione durante pdfinfo: {e}")
-        return None
+    from PIL import Image
+    
+    mode = 'L' if pix.n == 1 else 'RGB'
+    samples = pix.samples_mv if hasattr(pix, 'samples_mv') else pix.samples
+    return Image.frombuffer(mode, (pix.width, pix.height), samples, 'raw', mode, pix.stride, 1)
 
 
-def convert_pdf_to_images(pdf_path, output_base_dir, dpi=300, max_workers=8, 
-                          image_format='jpg', no_annotations=False,
-                          pages_to_convert=None, override=False):
+def prepare_page_mode(page, image_format):
     """
-    Converte tutte le pagine (o un sottoinsieme) di un PDF in immagini usando threading ottimizzato.
+    Converte l'immagine nel modo richiesto dal formato e da --grayscale.
     
     Args:
-        pdf_path: Percorso del file PDF
-        output_base_dir: Directory base dove salvare le immagini
-        dpi: Risoluzione delle immagini (default: 300)
-        max_workers: Numero massimo di thread (default: 8)
-        image_format: Formato immagine (jpg, jpeg, png) (default: jpg)
-        no_annotations: Se True, rimuove le annotazioni (richiede PyMuPDF)
-        pages_to_convert: Lista di numeri pagina (1-based) da convertire, None = tutte
-        override: Se True, la cartella col nome del PDF viene eliminata e ricreata
+        page: Immagine PIL
+        image_format: Formato immagine (jpg, jpeg, png, webp)
         
     Returns:
-        True se la conversione è riuscita, False altrimenti
+        Immagine PIL pronta per la codifica (la stessa se non serve conversione)
     """
-    global interrupted
-    
-    if interrupted:
-        print(f"[SALTATO] File '{pdf_path.name}' - operazione interrotta\n")
-        return False
+    grayscale = ENCODE_OPTIONS.grayscale
+    if grayscale == 'always' or (grayscale == 'auto' and is_grayscale(page)):
+        if page.mode != 'L':
+            vprint(f"[VERBOSE] Thread: Conversione da {page.mode} a scala di grigi")
+            page = page.convert('L')
+    elif image_format.lower() in ('jpg', 'jpeg') and page.mode in ('RGBA', 'LA', 'P'):
+        # Converti in RGB se necessario (JPEG non supporta alpha channel)
+        vprint(f"[VERBOSE] Thread: Conversione da {page.mode} a RGB")
+        page = page.convert('RGB')
+    return page
+
+
+def encode_page_image(page, image_format, default_quality=None):
+    """
+    Comprime un'immagine PIL in memoria con i parametri di ENCODE_OPTIONS.
     
-    pdf_path = Path(pdf_path)
+    Args:
+        page: Immagine PIL (vedi prepare_page_mode)
+        image_format: Formato immagine (jpg, jpeg, png, webp)
+        default_quality: Qualità JPEG usata se --quality non è specificato
+        
+    Returns:
+        memoryview con il file immagine compresso
+    """
+    options = ENCODE_OPTIONS
+    image_format = image_format.lower()
+    params = {}
     
-    vprint(f"[VERBOSE] Inizio conversione PDF: {pdf_path}")
+    if image_format in ('jpg', 'jpeg'):
+        save_format = 'JPEG'
+        quality = options.quality if options.quality is not None else default_quality
+        if quality is not None:
+            params['quality'] = quality
+        if options.optimize:
+            params['optimize'] = True
+    elif image_format == 'webp':
+        save_format = 'WEBP'
+        if options.quality is not None:
+            params['quality'] = options.quality
+        params['method'] = 6 if options.optimize else 4
+    else:
+        save_format = 'PNG'
+        if options.compress_level is not None:
+            params['compress_level'] = options.compress_level
+        if options.optimize:
+            params['optimize'] = True
     
-    if not pdf_path.exists():
-        print(f"  [ERRORE] Il file '{pdf_path}' non esiste.")
-        return False
+    buffer = io.BytesIO()
+    page.save(buffer, save_format, **params)
+    return buffer.getbuffer()
+
+
+def save_page_image(page, output_path, image_format, output_dir=None, page_num=None,
+                    default_quality=None):
+    """
+    Salva un'immagine PIL nel formato richiesto.
     
-    if not pdf_path.is_file():
-        print(f"  [ERRORE] '{pdf_path}' non è un file.")
-        return False
+    L'immagine viene compressa in memoria e poi scritta su disco, così --timings
+    può distinguere il tempo di codifica da quello di scrittura.
     
-    vprint(f"[VERBOSE] File PDF verificato e accessibile")
+    Args:
+        page: Immagine PIL da salvare
+        output_path: Percorso dove salvare l'immagine
+        image_format: Formato immagine (jpg, jpeg, png, webp)
+        output_dir: Cartella di output del PDF (per --timings)
+        page_num: Numero della pagina (per --timings)
+        default_quality: Qualità JPEG se --quality non è specificato
+    """
+    with timed(output_dir, 'convert', page_num):
+        page = prepare_page_mode(page, image_format)
     
-    # Crea il nome della cartella sanitizzato
-    folder_name = sanitize_filename(pdf_path.name)
-    output_dir = output_base_dir / folder_name
+    vprint(f"[VERBOSE] Thread: Salvataggio come {image_format.upper()} in {output_path}")
+    with timed(output_dir, 'encode', page_num):
+        data = encode_page_image(page, image_format, default_quality)
+    with timed(output_dir, 'write', page_num):
+        with open(output_path, 'wb') as f:
+            f.write(data)
 
-    if override:
-        if output_dir.exists():
-            vprint(f"[VERBOSE] --override: Eliminazione cartella esistente: {output_dir}")
-            print(f"[OVERRIDE] Cartella esistente eliminata: {output_dir}")
-            shutil.rmtree(output_dir)
-        output_dir.mkdir(parents=True, exist_ok=True)
-        vprint(f"[VERBOSE] --override: Cartella ricreata: {output_dir}")
-    else:
-        output_dir.mkdir(parents=True, exist_ok=True)
-        vprint(f"[VERBOSE] Directory di output creata: {output_dir}")
+
+class OutputProfile:
+    """
+    Profilo di output di --profile.
     
-    # Normalizza il formato (jpg -> jpg, jpeg -> jpg per consistenza nel nome file)
-    file_extension = image_format.lower()
-    if file_extension == 'jpeg':
-        file_extension = 'jpg'
+    Le immagini di ogni profilo vengono salvate nella sottocartella col suo nome,
+    alla sua risoluzione e nel suo formato.
+    """
     
-    vprint(f"[VERBOSE] Estensione file normalizzata: {file_extension}")
+    def __init__(self, name, dpi, image_format):
+        """
+        Args:
+            name: Nome del profilo, usato come nome della sottocartella
+            dpi: Risoluzione delle immagini del profilo
+            image_format: Formato immagine (jpg, jpeg, png, webp)
+        """
+        self.name = name
+        self.dpi = dpi
+        self.image_format = image_format
+        self.file_extension = 'jpg' if image_format == 'jpeg' else image_format
     
-    print(f"\n[FILE] {pdf_path.name}")
-    print(f"[OUTPUT] {output_dir}")
-    print(f"[DPI] {dpi}")
-    print(f"[THREADS] {max_workers}")
-    print(f"[FORMATO] {file_extension.upper()}")
-    if no_annotations:
-        print(f"[ANNOTAZIONI] Disabilitate (solo contenuto originale)")
-    else:
-        print(f"[ANNOTAZIONI] Abilitate (include note e markup)")
+    def __repr__(self):
+        return f"{self.name}:{self.dpi}:{self.image_format}"
+
+
+def parse_profile(profile_str):
+    """
+    Interpreta la specifica di un profilo di output nel formato NOME:DPI:FORMATO.
     
-    # Se richiesto no_annotations e PyMuPDF è disponibile, usa PyMuPDF
-    if no_annotations and PYMUPDF_AVAILABLE:
-        vprint(f"[VERBOSE] Utilizzo PyMuPDF per conversione (no_annotations richiesto)")
-        return convert_pdf_with_pymupdf(
-            pdf_path, output_dir, dpi, max_workers, image_format, no_annotations,
-            pages_to_convert=pages_to_convert
+    Esempi: "ocr:300:png", "anteprima:150:jpg", "miniature:72:jpg".
+    
+    Args:
+        profile_str: Stringa con la specifica del profilo
+        
+    Returns:
+        OutputProfile
+        
+    Raises:
+        ValueError se la sintassi non è valida
+    """
+    parts = [part.strip() for part in profile_str.split(':')]
+    if len(parts) != 3:
+        raise ValueError(f"Profilo non valido: '{profile_str}' (formato: NOME:DPI:FORMATO)")
+    name, dpi_str, image_format = parts
+    if not re.fullmatch(r'[\w.-]+', name):
+        raise ValueError(f"Nome profilo non valido: '{name}' (usa lettere, numeri, '_', '.', '-')")
+    if not dpi_str.isdigit() or int(dpi_str) <= 0:
+        raise ValueError(f"DPI non valido nel profilo '{profile_str}' (deve essere > 0)")
+    image_format = image_format.lower()
+    if image_format not in ('jpg', 'jpeg', 'png', 'webp'):
+        raise ValueError(f"Formato non valido nel profilo '{profile_str}' "
+                         f"(usa jpg, jpeg, png, webp)")
+    return OutputProfile(name, int(dpi_str), image_format)
+
+
+def save_page_outputs(page, page_num, output_dir, image_format, profiles=None):
+    """
+    Salva una pagina renderizzata nel formato richiesto o in tutti i profili di output.
+    
+    Con profiles la pagina è renderizzata una sola volta al DPI del profilo più
+    alto: ogni profilo successivo, dal DPI più alto al più basso, viene ottenuto
+    ridimensionando in memoria l'immagine del profilo precedente.
+    
+    Args:
+        page: Immagine PIL renderizzata
+        page_num: Numero della pagina (1-based)
+        output_dir: Directory di output del PDF
+        image_format: Formato immagine (jpg, jpeg, png, webp), usato senza profili
+        profiles: Lista di OutputProfile, o None
+    """
+    if not profiles:
+        file_extension = 'jpg' if image_format.lower() == 'jpeg' else image_format.lower()
+        save_page_image(page, output_dir / f"page_{page_num:04d}.{file_extension}", image_format,
+                        output_dir, page_num)
+        return
+    
+    from PIL import Image
+    
+    render_dpi = max(profile.dpi for profile in profiles)
+    image = page
+    for profile in sorted(profiles, key=lambda p: p.dpi, reverse=True):
+        size = (max(1, round(page.width * profile.dpi / render_dpi)),
+                max(1, round(page.height * profile.dpi / render_dpi)))
+        if size != image.size:
+            vprint(f"[VERBOSE] Thread: Ridimensionamento pagina {page_num} a {size} "
+                   f"per il profilo {profile.name}")
+            with timed(output_dir, 'convert', page_num):
+                image = image.resize(size, Image.LANCZOS, reducing_gap=3.0)
+        output_path = output_dir / profile.name / f"page_{page_num:04d}.{profile.file_extension}"
+        save_page_image(image, output_path, profile.image_format, output_dir, page_num)
+
+
+def parse_size(size_str):
+    """
+    Interpreta una dimensione in byte con suffisso opzionale (K, M, G, T).
+    
+    I suffissi sono in base 1024: "4G" = 4 * 1024^3 byte. Sono accettati anche
+    valori decimali ("1.5G") e la forma con "B" finale ("512MB").
+    
+    Args:
+        size_str: Stringa con la dimensione
+        
+    Returns:
+        Numero di byte (int)
+        
+    Raises:
+        ValueError se la sintassi non è valida
+    """
+    match = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*([KMGT]?)B?\s*', size_str, re.IGNORECASE)
+    if not match:
+        raise ValueError(f"Dimensione non valida: '{size_str}' (esempi: 512M, 4G)")
+    value = float(match.group(1))
+    exponent = ' KMGT'.index(match.group(2).upper() or ' ')
+    size = int(value * 1024 ** exponent)
+    if size <= 0:
+        raise ValueError(f"Dimensione non valida: '{size_str}' (deve essere > 0)")
+    return size
+
+
+def estimate_page_bytes(page_size, dpi):
+    """
+    Stima la memoria di una pagina renderizzata in RGB (3 byte per pixel).
+    
+    Args:
+        page_size: Tupla (larghezza, altezza) in punti, o None se sconosciuta
+        dpi: Risoluzione
+        
+    Returns:
+        Numero di byte stimato
+    """
+    # Formato Letter se la dimensione della pagina non è nota
+    width, height = page_size or (612.0, 792.0)
+    scale = dpi / 72.0
+    return math.ceil(width * scale) * math.ceil(height * scale) * 3
+
+
+class MemoryBudget:
+    """
+    Budget di memoria condiviso tra i thread della pipeline (--max-memory).
+    
+    Lo stadio di rendering prenota i byte stimati delle pagine prima di
+    renderizzarle e lo stadio di codifica li restituisce dopo il salvataggio:
+    se i thread di codifica restano indietro, il rendering si ferma finché
+    non si libera memoria. Una richiesta più grande dell'intero budget viene
+    accettata solo quando non c'è nient'altro in volo, per evitare stalli.
+    """
+    
+    def __init__(self, limit_bytes=None):
+        """
+        Args:
+            limit_bytes: Limite in byte, o None per nessun limite
+        """
+        self.limit = limit_bytes
+        self.used = 0
+        self._cond = threading.Condition()
+    
+    def acquire(self, n_bytes):
+        """Prenota n_bytes, attendendo finché il budget lo consente."""
+        if self.limit is None:
+            return
+        with self._cond:
+            while self.used > 0 and self.used + n_bytes > self.limit:
+                self._cond.wait(timeout=0.5)
+            self.used += n_bytes
+    
+    def release(self, n_bytes):
+        """Restituisce n_bytes prenotati in precedenza."""
+        if self.limit is None:
+            return
+        with self._cond:
+            self.used = max(0, self.used - n_bytes)
+            self._cond.notify_all()
+
+
+def limit_workers_by_memory(n_workers, page_size, dpi, max_memory):
+    """
+    Riduce il numero di worker in modo che una pagina per worker stia nel budget.
+    
+    Usato dove rendering e codifica avvengono nello stesso processo (PyMuPDF), così
+    il budget di --max-memory non può essere applicato pagina per pagina.
+    
+    Args:
+        n_workers: Numero di worker richiesto
+        page_size: Tupla (larghezza, altezza) in punti, o None se sconosciuta
+        dpi: Risoluzione
+        max_memory: Budget di memoria in byte
+        
+    Returns:
+        Numero di worker (almeno 1)
+    """
+    page_bytes = estimate_page_bytes(page_size, dpi)
+    limited = max(1, min(n_workers, max_memory // page_bytes))
+    if limited < n_workers:
+        print(f"  [MEMORIA] Worker ridotti da {n_workers} a {limited} per rispettare "
+              f"--max-memory ({page_bytes / 2**20:.0f} MiB stimati per pagina)")
+    return limited
+
+
+def available_cpus():
+    """Numero di CPU utilizzabili dal processo (rispetta l'affinità, es. nei container)."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def system_memory():
+    """
+    Memoria totale e disponibile del sistema.
+    
+    Returns:
+        Tupla (totale, disponibile) in byte, (None, None) se non rilevabile
+    """
+    try:
+        values = {}
+        with open('/proc/meminfo', encoding='ascii') as f:
+            for line in f:
+                key, _, rest = line.partition(':')
+                values[key] = int(rest.split()[0]) * 1024
+        return values['MemTotal'], values.get('MemAvailable', values.get('MemFree'))
+    except (OSError, KeyError, ValueError, IndexError):
+        pass
+    try:
+        page = os.sysconf('SC_PAGE_SIZE')
+        return os.sysconf('SC_PHYS_PAGES') * page, os.sysconf('SC_AVPHYS_PAGES') * page
+    except (AttributeError, ValueError, OSError):
+        return None, None
+
+
+def autotune_memory_limit(max_memory):
+    """
+    Tetto di memoria per --threads auto: --max-memory se specificato, altrimenti
+    AUTOTUNE_MEMORY_FRACTION della memoria disponibile all'avvio.
+    
+    Returns:
+        Byte, o None se la memoria del sistema non è rilevabile
+    """
+    if max_memory is not None:
+        return max_memory
+    _, available = system_memory()
+    return int(available * AUTOTUNE_MEMORY_FRACTION) if available else None
+
+
+class ConcurrencyLimit:
+    """
+    Numero massimo di task attivi contemporaneamente, modificabile durante
+    l'esecuzione (usato da AutoTuner).
+    """
+    
+    def __init__(self, limit):
+        self.limit = limit
+        self.active = 0
+        self._cond = threading.Condition()
+    
+    def acquire(self):
+        """Attende che ci sia un posto libero e lo occupa."""
+        with self._cond:
+            while self.active >= self.limit:
+                self._cond.wait(timeout=0.5)
+            self.active += 1
+    
+    def release(self):
+        """Libera un posto occupato con acquire."""
+        with self._cond:
+            self.active -= 1
+            self._cond.notify_all()
+    
+    def set_limit(self, limit):
+        """Cambia il limite; i task già attivi non vengono interrotti."""
+        with self._cond:
+            self.limit = limit
+            self._cond.notify_all()
+
+
+class AutoTuner:
+    """
+    Regola il numero di worker attivi durante la conversione (--threads auto).
+    
+    Ogni AUTOTUNE_INTERVAL secondi confronta le pagine/s con quelle della finestra
+    precedente. Finché aggiungere un worker migliora il throughput di almeno il 5%
+    ne aggiunge un altro (fino a max_limit); un aumento che non porta benefici
+    viene annullato e la crescita si ferma. Se la memoria disponibile del sistema
+    scende sotto la riserva, i worker vengono ridotti di uno per finestra.
+    """
+    
+    def __init__(self, limit, max_limit):
+        """
+        Args:
+            limit: Worker attivi all'inizio (dalla calibrazione)
+            max_limit: Massimo consentito da CPU e tetto di memoria
+        """
+        self.limit = ConcurrencyLimit(max(1, min(limit, max_limit)))
+        self.max_limit = max(1, max_limit)
+        total, _ = system_memory()
+        self.reserve_bytes = total * AUTOTUNE_MEMORY_RESERVE if total else None
+        self._climb = self.limit.limit < self.max_limit
+        self._last_step = 0
+        self._last_rate = 0.0
+        self._window_start = time.monotonic()
+        self._window_pages = 0
+    
+    def update(self, pages_done):
+        """
+        Aggiorna il limite in base all'avanzamento; da chiamare periodicamente.
+        
+        Args:
+            pages_done: Pagine completate dall'inizio della conversione
+        """
+        now = time.monotonic()
+        if now - self._window_start < AUTOTUNE_INTERVAL:
+            return
+        rate = (pages_done - self._window_pages) / (now - self._window_start)
+        self._window_start, self._window_pages = now, pages_done
+        
+        current = self.limit.limit
+        new_limit = current
+        _, available = system_memory()
+        if self.reserve_bytes is not None and available is not None \
+                and available < self.reserve_bytes:
+            new_limit = max(1, current - 1)
+            self._climb = False
+            reason = f"memoria disponibile {available / 2**20:.0f} MiB"
+        elif self._last_step > 0 and rate < self._last_rate * 1.05:
+            new_limit = max(1, current - 1)
+            self._climb = False
+            reason = f"nessun guadagno ({rate:.1f} pag/s)"
+        elif self._climb and current < self.max_limit:
+            new_limit = current + 1
+            reason = f"{rate:.1f} pag/s"
+        
+        self._last_step = new_limit - current
+        self._last_rate = rate
+        if new_limit != current:
+            vprint(f"[VERBOSE] --threads auto: worker attivi {current} -> {new_limit} ({reason})")
+            self.limit.set_limit(new_limit)
+
+
+def calibrate_poppler(pdf_path, pages, output_dir, dpi, image_format, profiles=None):
+    """
+    Converte le pagine campione di --threads auto misurando rendering e codifica.
+    
+    Le pagine vengono convertite una alla volta e salvate normalmente, così il
+    campione non è lavoro sprecato.
+    
+    Args:
+        pdf_path: Percorso del file PDF
+        pages: Pagine campione (1-based)
+        output_dir: Directory dove salvare le immagini
+        dpi: Risoluzione
+        image_format: Formato immagine
+        profiles: Lista di OutputProfile, o None
+        
+    Returns:
+        Tupla (misure, pagine_salvate) dove misure contiene i secondi per pagina
+        di 'render' e 'encode' e 'child_rss', il picco di memoria di pdftoppm in
+        byte (None se non misurabile)
+    """
+    render_seconds = encode_seconds = 0.0
+    saved = []
+    _, rss_before = _peak_rss_mb()
+    with tempfile.TemporaryDirectory(prefix='.render_', dir=output_dir) as tmp_dir:
+        for page_num in pages:
+            start = time.perf_counter()
+            try:
+                rendered = render_page_range(pdf_path, page_num, page_num, tmp_dir, dpi)
+            except Exception as e:
+                vprint(f"[VERBOSE] Calibrazione: ERRORE nel rendering pagina {page_num}: {e}")
+                rendered = []
+            rendered_at = time.perf_counter()
+            for rendered_page, path in rendered:
+                if path is not None and encode_rendered_page(rendered_page, path, output_dir,
+                                                             image_format, profiles):
+                    saved.append(rendered_page)
+            render_seconds += rendered_at - start
+            encode_seconds += time.perf_counter() - rendered_at
+    _, rss_after = _peak_rss_mb()
+    
+    # ru_maxrss dei figli è il massimo storico: cresce solo se pdftoppm ha superato
+    # il picco dei processi figli precedenti
+    child_rss = None
+    if rss_after is not None and rss_after > (rss_before or 0):
+        child_rss = int(rss_after * 2**20)
+    measures = {
+        'render': render_seconds / max(1, len(pages)),
+        'encode': encode_seconds / max(1, len(pages)),
+        'child_rss': child_rss,
+    }
+    return measures, saved
+
+
+def plan_poppler_workers(measures, ceiling, page_bytes, memory_limit):
+    """
+    Sceglie i thread di rendering e di codifica per --threads auto.
+    
+    Le CPU vengono divise tra i due stadi in proporzione al tempo misurato per
+    pagina; il tetto di memoria limita i processi pdftoppm attivi (picco misurato)
+    e le pagine decodificate in attesa di codifica.
+    
+    Returns:
+        Tupla (thread_rendering, thread_codifica, massimo_thread_rendering)
+    """
+    total = measures['render'] + measures['encode']
+    render_share = measures['render'] / total if total > 0 else 0.5
+    render_workers = min(ceiling, max(1, round(ceiling * render_share)))
+    encode_workers = min(ceiling, max(1, ceiling - render_workers))
+    max_render = ceiling
+    
+    if memory_limit is not None:
+        # Al massimo metà del tetto per le pagine decodificate nei thread di codifica
+        encode_workers = max(1, min(encode_workers, memory_limit // (4 * page_bytes)))
+        render_cost = max(measures['child_rss'] or 0, page_bytes)
+        free = memory_limit - encode_workers * 2 * page_bytes
+        max_render = max(1, min(ceiling, free // render_cost))
+    
+    return min(render_workers, max_render), encode_workers, max_render
+
+
+def plan_pymupdf_workers(seconds_per_page, pages, ceiling, page_bytes, memory_limit):
+    """
+    Sceglie il numero di processi PyMuPDF per --threads auto.
+    
+    Ogni processo deve ricevere almeno PYMUPDF_PROCESS_MIN_SECONDS di lavoro
+    (altrimenti l'avvio costa più di quanto fa risparmiare) e, con un tetto di
+    memoria, i processi con la loro pagina in volo devono starci dentro.
+    
+    Args:
+        seconds_per_page: Tempo medio misurato per pagina
+        pages: Pagine ancora da convertire
+        ceiling: Massimo di processi (CPU disponibili)
+        page_bytes: Memoria stimata per pagina decodificata
+        memory_limit: Tetto di memoria in byte, o None
+        
+    Returns:
+        Numero di processi (almeno 1)
+    """
+    n_workers = min(ceiling, pages)
+    n_workers = min(n_workers, int(pages * seconds_per_page / PYMUPDF_PROCESS_MIN_SECONDS))
+    if memory_limit is not None:
+        n_workers = min(n_workers, memory_limit // (PYMUPDF_PROCESS_BYTES + 2 * page_bytes))
+    return max(1, n_workers)
+
+
+def render_page_range(pdf_path, first_page, last_page, tmp_dir, dpi):
+    """
+    Renderizza un intervallo contiguo di pagine con una sola invocazione di pdftoppm.
+    
+    Il PDF viene aperto e analizzato una sola volta per tutto l'intervallo invece
+    che una volta per pagina. Le pagine vengono scritte come PPM in tmp_dir.
+    
+    Args:
+        pdf_path: Percorso del file PDF
+        first_page: Prima pagina dell'intervallo (1-based, inclusa)
+        last_page: Ultima pagina dell'intervallo (1-based, inclusa)
+        tmp_dir: Cartella temporanea dove pdftoppm scrive le pagine
+        dpi: Risoluzione
+        
+    Returns:
+        Lista di tuple (numero_pagina, percorso_ppm o None se la pagina manca)
+    """
+    page_nums = list(range(first_page, last_page + 1))
+    vprint(f"[VERBOSE] Thread: Rendering pagine {first_page}-{last_page} da {pdf_path.name}")
+    
+    paths = convert_from_path(
+        str(pdf_path),
+        dpi=dpi,
+        first_page=first_page,
+        last_page=last_page,
+        thread_count=1,
+        output_folder=tmp_dir,
+        fmt='ppm',
+        paths_only=True,
+        grayscale=ENCODE_OPTIONS.grayscale == 'always'
+    )
+    
+    if len(paths) != len(page_nums):
+        vprint(f"[VERBOSE] Thread: ATTENZIONE - Attese {len(page_nums)} pagine, "
+               f"restituite {len(paths)} per l'intervallo {first_page}-{last_page}")
+        # Con pagine mancanti non è possibile associare i file ai numeri di pagina
+        for path in paths:
+            Path(path).unlink(missing_ok=True)
+        return [(page_num, None) for page_num in page_nums]
+    
+    return list(zip(page_nums, paths))
+
+
+def encode_rendered_page(page_num, path, output_dir, image_format, profiles=None):
+    """
+    Carica una pagina renderizzata da pdftoppm, la salva nel formato finale e
+    elimina il file temporaneo.
+    
+    Args:
+        page_num: Numero della pagina (1-based)
+        path: Percorso del file PPM temporaneo
+        output_dir: Directory dove salvare l'immagine
+        image_format: Formato immagine (jpg, png)
+        profiles: Lista di OutputProfile da produrre invece di image_format, o None
+        
+    Returns:
+        True se la pagina è stata salvata, False altrimenti
+    """
+    from PIL import Image
+    
+    try:
+        with Image.open(path) as page:
+            # Decodifica del PPM renderizzato da pdftoppm
+            with timed(output_dir, 'convert', page_num):
+                page.load()
+            vprint(f"[VERBOSE] Thread: Pagina {page_num} caricata, dimensioni: {page.size}")
+            save_page_outputs(page, page_num, output_dir, image_format, profiles)
+        vprint(f"[VERBOSE] Thread: Pagina {page_num} salvata con successo")
+        return True
+    except Exception as e:
+        vprint(f"[VERBOSE] Thread: ERRORE nel salvataggio pagina {page_num}: {e}")
+        return False
+    finally:
+        # Libera subito lo spazio su disco della pagina temporanea
+        Path(path).unlink(missing_ok=True)
+
+
+def convert_page_range(pdf_path, first_page, last_page, output_dir, dpi, image_format,
+                       budget=None, page_bytes=0, profiles=None):
+    """
+    Converte un intervallo contiguo di pagine con una sola invocazione di pdftoppm.
+    
+    Rendering e salvataggio avvengono nello stesso thread: le pagine renderizzate
+    vengono caricate, salvate ed eliminate una alla volta, così la memoria occupata
+    resta quella di una singola pagina.
+    
+    Args:
+        pdf_path: Percorso del file PDF
+        first_page: Prima pagina dell'intervallo (1-based, inclusa)
+        last_page: Ultima pagina dell'intervallo (1-based, inclusa)
+        output_dir: Directory dove salvare le immagini
+        dpi: Risoluzione
+        image_format: Formato immagine (jpg, png)
+        budget: MemoryBudget condiviso, o None
+        page_bytes: Memoria stimata di una pagina, prenotata sul budget
+        profiles: Lista di OutputProfile da produrre invece di image_format, o None
+        
+    Returns:
+        Tupla (pagine_salvate, pagine_fallite) con liste di numeri di pagina
+    """
+    page_nums = list(range(first_page, last_page + 1))
+    
+    if interrupted:
+        return [], []
+    
+    saved = []
+    reserved = len(page_nums) * page_bytes
+    if budget is not None:
+        budget.acquire(reserved)
+    
+    try:
+        with tempfile.TemporaryDirectory(prefix='.render_', dir=output_dir) as tmp_dir:
+            with timed(output_dir, 'render', first_page, len(page_nums)):
+                rendered = render_page_range(pdf_path, first_page, last_page, tmp_dir, dpi)
+            for page_num, path in rendered:
+                if path is None or interrupted:
+                    continue
+                if encode_rendered_page(page_num, path, output_dir, image_format, profiles):
+                    saved.append(page_num)
+                if budget is not None:
+                    budget.release(page_bytes)
+                    reserved -= page_bytes
+        
+    except Exception as e:
+        vprint(f"[VERBOSE] Thread: ERRORE nella conversione pagine {first_page}-{last_page}: {e}")
+    
+    finally:
+        if budget is not None:
+            budget.release(reserved)
+    
+    if interrupted:
+        return saved, []
+    
+    saved_set = set(saved)
+    failed = [n for n in page_nums if n not in saved_set]
+    return saved, failed
+
+
+def render_pymupdf_page(doc, page_num_1based, mat, output_dir, file_extension, no_annotations,
+                        profiles=None):
+    """
+    Renderizza e salva una singola pagina di un documento PyMuPDF già aperto.
+    
+    Args:
+        doc: Documento fitz aperto
+        page_num_1based: Numero della pagina (1-based)
+        mat: Matrice di zoom fitz calcolata dal DPI
+        output_dir: Directory dove salvare l'immagine
+        file_extension: Estensione normalizzata (jpg, png)
+        no_annotations: Se True, rimuove le annotazioni prima del rendering
+        profiles: Lista di OutputProfile da produrre invece di file_extension, o None
+    """
+    page_num = page_num_1based - 1  # PyMuPDF usa indici 0-based
+    vprint(f"[VERBOSE] PyMuPDF: Processamento pagina {page_num + 1}/{len(doc)}")
+    
+    with timed(output_dir, 'render', page_num_1based):
+        page = doc[page_num]
+        
+        # Se no_annotations è True, rimuovi le annotazioni prima del rendering
+        if no_annotations:
+            vprint(f"[VERBOSE] PyMuPDF: Rimozione annotazioni dalla pagina {page_num + 1}")
+            # Ottieni tutte le annotazioni della pagina
+            annot = page.first_annot
+            annot_count = 0
+            while annot:
+                next_annot = annot.next
+                page.delete_annot(annot)
+                annot = next_annot
+                annot_count += 1
+            if annot_count > 0:
+                vprint(f"[VERBOSE] PyMuPDF: Rimosse {annot_count} annotazioni dalla pagina {page_num + 1}")
+        
+        # Renderizza la pagina direttamente nello spazio colore di output (RGB, o
+        # grigi con --grayscale always): nessuna conversione successiva del pixmap
+        vprint(f"[VERBOSE] PyMuPDF: Rendering pagina {page_num + 1}")
+        colorspace = fitz.csGRAY if ENCODE_OPTIONS.grayscale == 'always' else fitz.csRGB
+        pix = page.get_pixmap(matrix=mat, colorspace=colorspace, alpha=False)
+    vprint(f"[VERBOSE] PyMuPDF: Pixmap creato, dimensioni: {pix.width}x{pix.height}")
+    
+    with timed(output_dir, 'convert', page_num_1based):
+        image = pixmap_to_image(pix)
+    
+    if profiles:
+        # I profili vengono ricavati in memoria dal pixmap renderizzato al DPI più alto
+        save_page_outputs(image, page_num + 1, output_dir, file_extension, profiles)
+        return
+    
+    # Salva l'immagine
+    output_path = output_dir / f"page_{page_num + 1:04d}.{file_extension}"
+    save_page_image(image, output_path, file_extension, output_dir, page_num_1based,
+                    default_quality=PYMUPDF_JPEG_QUALITY)
+
+
+# Stato dei processi worker PyMuPDF, impostato da _pymupdf_worker_init
+_worker_progress = None
+_worker_stop = None
+# Documenti fitz aperti dal processo worker, riutilizzati dai task dello stesso PDF
+_worker_docs = OrderedDict()
+
+
+def _worker_document(pdf_path):
+    """
+    Restituisce il documento fitz del worker per pdf_path, aprendolo una sola volta.
+    
+    Vengono tenuti aperti al massimo WORKER_OPEN_DOCUMENTS documenti; oltre questo
+    limite viene chiuso quello usato meno di recente.
+    
+    Args:
+        pdf_path: Percorso del file PDF
+        
+    Returns:
+        Documento fitz aperto
+    """
+    key = str(pdf_path)
+    doc = _worker_docs.pop(key, None)
+    if doc is None:
+        vprint(f"[VERBOSE] PyMuPDF worker: Apertura documento {key}")
+        doc = fitz.open(pdf_path)
+        while len(_worker_docs) >= WORKER_OPEN_DOCUMENTS:
+            _, old_doc = _worker_docs.popitem(last=False)
+            old_doc.close()
+    _worker_docs[key] = doc
+    return doc
+
+
+def _pymupdf_worker_init(progress_queue, stop_event, verbose, timings=False,
+                         encode_options=None):
+    """
+    Inizializza un processo worker PyMuPDF.
+    
+    Args:
+        progress_queue: Coda su cui notificare al processo padre ogni pagina completata,
+                        o None se l'avanzamento viene ricavato dai risultati dei task
+        stop_event: Evento impostato dal processo padre in caso di interruzione
+        verbose: Valore di VERBOSE del processo padre
+        timings: True se --timings è attivo nel processo padre
+        encode_options: ENCODE_OPTIONS del processo padre
+    """
+    global _worker_progress, _worker_stop, VERBOSE, STAGE_TIMINGS, ENCODE_OPTIONS
+    # Ctrl+C viene gestito solo dal processo padre, che ferma i worker tramite stop_event
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _worker_progress = progress_queue
+    _worker_stop = stop_event
+    VERBOSE = verbose
+    # I tempi vengono restituiti al processo padre insieme ai risultati di ogni task
+    STAGE_TIMINGS = StageTimings() if timings else None
+    if encode_options is not None:
+        ENCODE_OPTIONS = encode_options
+
+
+def _pymupdf_render_shard(pdf_path, pages, output_dir, dpi, file_extension, no_annotations,
+                          profiles=None):
+    """
+    Renderizza un gruppo di pagine in un processo worker con un proprio documento fitz.
+    
+    Il documento resta aperto nel worker tra un task e l'altro (vedi _worker_document).
+    
+    Args:
+        pdf_path: Percorso del file PDF
+        pages: Lista di numeri di pagina (1-based) assegnati a questo worker
+        output_dir: Directory dove salvare le immagini
+        dpi: Risoluzione delle immagini
+        file_extension: Estensione normalizzata (jpg, png)
+        no_annotations: Se True, rimuove le annotazioni
+        profiles: Lista di OutputProfile, o None
+        
+    Returns:
+        Tupla (pagine_salvate, errori, tempi) dove errori è una lista di
+        (pagina, messaggio) e tempi gli eventi di --timings del task
+    """
+    saved = []
+    errors = []
+    zoom = dpi / 72.0
+    mat = fitz.Matrix(zoom, zoom)
+    
+    with timed(output_dir, 'open'):
+        doc = _worker_document(pdf_path)
+    vprint(f"[VERBOSE] PyMuPDF worker: {len(pages)} pagine assegnate")
+    for page_num_1based in pages:
+        if _worker_stop.is_set():
+            break
+        try:
+            render_pymupdf_page(doc, page_num_1based, mat, output_dir,
+                                file_extension, no_annotations, profiles)
+            saved.append(page_num_1based)
+            ok = True
+        except Exception as e:
+            errors.append((page_num_1based, str(e)))
+            ok = False
+        if _worker_progress is not None:
+            _worker_progress.put((page_num_1based, ok))
+    
+    events = STAGE_TIMINGS.take(output_dir) if STAGE_TIMINGS is not None else []
+    return saved, errors, events
+
+
+def _convert_pymupdf_parallel(pdf_path, output_dir, dpi, n_workers, file_extension,
+                              no_annotations, pages_list, bar, on_page_saved=None,
+                              profiles=None):
+    """
+    Distribuisce le pagine su un pool di processi, ognuno con il proprio documento fitz.
+    
+    Le pagine vengono assegnate a turno (pages_list[i::n_workers]) per bilanciare il
+    carico quando la complessità delle pagine varia lungo il documento.
+    
+    Args:
+        pdf_path: Percorso del file PDF
+        output_dir: Directory dove salvare le immagini
+        dpi: Risoluzione delle immagini
+        n_workers: Numero di processi worker
+        file_extension: Estensione normalizzata (jpg, png)
+        no_annotations: Se True, rimuove le annotazioni
+        pages_list: Lista di numeri di pagina (1-based) da convertire
+        bar: Barra di avanzamento alive_bar del processo padre
+        on_page_saved: Funzione chiamata con il numero di pagina dopo ogni salvataggio
+        profiles: Lista di OutputProfile, o None
+        
+    Returns:
+        Numero di pagine salvate
+    """
+    global interrupted
+    
+    ctx = multiprocessing.get_context()
+    progress_queue = ctx.Queue()
+    stop_event = ctx.Event()
+    shards = [pages_list[i::n_workers] for i in range(n_workers)]
+    vprint(f"[VERBOSE] PyMuPDF: Avvio di {n_workers} processi worker")
+    
+    saved_pages = 0
+    ticks = 0
+    notified = set()
+    with ProcessPoolExecutor(max_workers=n_workers, mp_context=ctx,
+                             initializer=_pymupdf_worker_init,
+                             initargs=(progress_queue, stop_event, VERBOSE,
+                                       STAGE_TIMINGS is not None,
+                                       ENCODE_OPTIONS)) as executor:
+        futures = [
+            executor.submit(_pymupdf_render_shard, pdf_path, shard, output_dir,
+                            dpi, file_extension, no_annotations, profiles)
+            for shard in shards
+        ]
+        
+        # Aggiorna la barra man mano che i worker completano le pagine
+        while ticks < len(pages_list):
+            if interrupted:
+                vprint("[VERBOSE] PyMuPDF: Interruzione rilevata, arresto dei worker")
+                stop_event.set()
+                print("\n[INTERRUZIONE] Salvataggio interrotto")
+                break
+            try:
+                page_num, ok = progress_queue.get(timeout=0.2)
+            except queue.Empty:
+                if all(f.done() for f in futures):
+                    break
+                continue
+            if ok and on_page_saved is not None:
+                on_page_saved(page_num)
+                notified.add(page_num)
+            ticks += 1
+            bar()
+        
+        # Il conteggio definitivo viene dai risultati dei worker, non dalla coda
+        for future in futures:
+            try:
+                saved, errors, events = future.result()
+            except Exception as e:
+                print(f"\n  [ERRORE] Worker PyMuPDF terminato con errore: {e}")
+                continue
+            if events:
+                STAGE_TIMINGS.add(output_dir, events)
+            saved_pages += len(saved)
+            if on_page_saved is not None:
+                for page_num in saved:
+                    if page_num not in notified:
+                        on_page_saved(page_num)
+            for page_num, message in errors:
+                print(f"\n  [ERRORE] Pagina {page_num}: {message}")
+    
+    if not interrupted and ticks < len(pages_list):
+        bar(len(pages_list) - ticks)
+    
+    return saved_pages
+
+
+def convert_pdf_with_pymupdf(pdf_path, output_dir, dpi=300, max_workers=8, 
+                             image_format='jpg', no_annotations=False,
+                             pages_to_convert=None, on_page_saved=None, max_memory=None,
+                             profiles=None, autotune=False):
+    """
+    Converte PDF in immagini usando PyMuPDF (con controllo annotazioni).
+    
+    Con max_workers > 1 le pagine vengono renderizzate in parallelo da un pool di
+    processi, ognuno con il proprio documento fitz aperto. Con max_memory il numero
+    di processi viene ridotto in modo che le pagine in volo stiano nel budget.
+    
+    Con autotune le prime pagine vengono convertite nel processo padre per misurare
+    il tempo per pagina, e il numero di processi viene scelto di conseguenza: le
+    pagine sono suddivise in anticipo tra i processi, quindi resta fisso per il
+    resto della conversione.
+    
+    Args:
+        pdf_path: Percorso del file PDF
+        output_dir: Directory dove salvare le immagini
+        dpi: Risoluzione delle immagini
+        max_workers: Numero massimo di processi worker
+        image_format: Formato immagine (jpg, png)
+        no_annotations: Se True, rimuove le annotazioni
+        pages_to_convert: Lista di numeri di pagina (1-based) da convertire, o None per tutte
+        on_page_saved: Funzione chiamata con il numero di pagina dopo ogni salvataggio
+        max_memory: Budget di memoria in byte per le pagine in volo, None = illimitato
+        profiles: Lista di OutputProfile, o None (dpi deve essere quello più alto)
+        autotune: Se True (--threads auto), max_workers è il massimo di processi
+        
+    Returns:
+        True se la conversione è riuscita, False altrimenti
+    """
+    global interrupted
+    
+    if interrupted:
+        return False
+    
+    # Normalizza il formato
+    file_extension = image_format.lower()
+    if file_extension == 'jpeg':
+        file_extension = 'jpg'
+    
+    vprint(f"[VERBOSE] Apertura PDF con PyMuPDF: {pdf_path}")
+    
+    try:
+        # Apri il PDF
+        with timed(output_dir, 'open'):
+            doc = fitz.open(pdf_path)
+        total_pages = len(doc)
+        vprint(f"[VERBOSE] PDF aperto, totale pagine: {total_pages}")
+        
+        if total_pages == 0:
+            print("  [ERRORE] Nessuna pagina trovata nel PDF.")
+            doc.close()
+            return False
+        
+        # Calcola il fattore di zoom per ottenere il DPI desiderato
+        # PyMuPDF usa 72 DPI di default
+        zoom = dpi / 72.0
+        mat = fitz.Matrix(zoom, zoom)
+        vprint(f"[VERBOSE] Fattore di zoom calcolato: {zoom} (per {dpi} DPI)")
+        
+        # Determina le pagine da convertire
+        if pages_to_convert is not None:
+            pages_list = [p for p in pages_to_convert if 1 <= p <= total_pages]
+            out_of_range = [p for p in pages_to_convert if p < 1 or p > total_pages]
+            if out_of_range:
+                print(f"  [AVVISO] Pagine fuori range (1-{total_pages}) ignorate: {out_of_range}")
+            vprint(f"[VERBOSE] PyMuPDF: Pagine da convertire: {pages_list}")
+        else:
+            pages_list = list(range(1, total_pages + 1))
+
+        n_to_convert = len(pages_list)
+        if n_to_convert == 0:
+            print("  [ERRORE] Nessuna pagina valida da convertire.")
+            doc.close()
+            return False
+
+        saved_pages = 0
+        sampled = 0
+        
+        if autotune:
+            first_rect = doc[pages_list[0] - 1].rect
+            page_bytes = estimate_page_bytes((first_rect.width, first_rect.height), dpi)
+            sample = pages_list[:AUTOTUNE_SAMPLE_PAGES]
+            print(f"[AUTO] Calibrazione su {len(sample)} pagine...")
+            start = time.perf_counter()
+            for page_num_1based in sample:
+                try:
+                    render_pymupdf_page(doc, page_num_1based, mat, output_dir,
+                                        file_extension, no_annotations, profiles)
+                    saved_pages += 1
+                    if on_page_saved is not None:
+                        on_page_saved(page_num_1based)
+                except Exception as e:
+                    print(f"\n  [ERRORE] Pagina {page_num_1based}: {e}")
+            seconds_per_page = (time.perf_counter() - start) / len(sample)
+            sampled = len(sample)
+            pages_list = pages_list[sampled:]
+            
+            memory_limit = autotune_memory_limit(max_memory)
+            n_workers = plan_pymupdf_workers(seconds_per_page, len(pages_list), max_workers,
+                                             page_bytes, memory_limit)
+            print(f"[AUTO] {seconds_per_page * 1000:.0f} ms/pagina -> {n_workers} processi "
+                  f"per {len(pages_list)} pagine rimanenti")
+        else:
+            n_workers = min(max_workers, n_to_convert)
+            if max_memory is not None:
+                first_rect = doc[pages_list[0] - 1].rect
+                n_workers = limit_workers_by_memory(
+                    n_workers, (first_rect.width, first_rect.height), dpi, max_memory
+                )
+        
+        if n_workers > 1:
+            # Ogni worker apre il proprio documento: quello del processo padre non serve più
+            doc.close()
+            print(f"[SALVATAGGIO] {n_to_convert} pagine in corso su {n_workers} processi "
+                  f"(totale PDF: {total_pages})...")
+            with alive_bar(n_to_convert, title='  Progresso', bar='smooth') as bar:
+                if sampled:
+                    bar(sampled)
+                saved_pages += _convert_pymupdf_parallel(
+                    pdf_path, output_dir, dpi, n_workers, file_extension,
+                    no_annotations, pages_list, bar, on_page_saved, profiles
+                )
+        else:
+            print(f"[SALVATAGGIO] {n_to_convert} pagine in corso (totale PDF: {total_pages})...")
+            with alive_bar(n_to_convert, title='  Progresso', bar='smooth') as bar:
+                if sampled:
+                    bar(sampled)
+                for page_num_1based in pages_list:
+                    if interrupted:
+                        print("\n[INTERRUZIONE] Salvataggio interrotto")
+                        break
+                    
+                    try:
+                        render_pymupdf_page(doc, page_num_1based, mat, output_dir,
+                                            file_extension, no_annotations, profiles)
+                        saved_pages += 1
+                        if on_page_saved is not None:
+                            on_page_saved(page_num_1based)
+                        bar()
+                        
+                    except Exception as e:
+                        print(f"\n  [ERRORE] Pagina {page_num_1based}: {e}")
+                        vprint(f"[VERBOSE] PyMuPDF: Traceback completo: {e}")
+                        bar()
+            
+            doc.close()
+            vprint(f"[VERBOSE] PyMuPDF: Documento chiuso")
+        
+        if interrupted:
+            print(f"[PARZIALE] {saved_pages}/{n_to_convert} pagine salvate prima dell'interruzione\n")
+            return False
+        
+        print(f"[COMPLETATO] {saved_pages}/{n_to_convert} immagini salvate\n")
+        return True
+        
+    except Exception as e:
+        print(f"  [ERRORE] Errore durante la conversione con PyMuPDF: {e}")
+        vprint(f"[VERBOSE] PyMuPDF: Traceback completo: {e}")
+        # Tenta di chiudere il documento se è stato aperto
+        try:
+            doc.close()
+            vprint(f"[VERBOSE] PyMuPDF: Documento chiuso nel gestore eccezioni")
+        except Exception:
+            pass
+        return False
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    """
+    Calcola l'hash SHA-256 di un file leggendolo a blocchi.
+    
+    Args:
+        path: Percorso del file
+        chunk_size: Dimensione dei blocchi letti (byte)
+        
+    Returns:
+        Hash esadecimale del contenuto del file
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ConversionManifest:
+    """
+    Manifest di una conversione incrementale (--incremental).
+    
+    Registra nella cartella di output l'hash del PDF sorgente, i parametri di
+    conversione e l'hash di ogni immagine prodotta. Un'esecuzione successiva
+    salta le pagine la cui immagine corrisponde ancora al manifest, e dopo
+    un'interruzione riprende dalle pagine mancanti.
+    """
+    
+    def __init__(self, output_dir, pdf_path, page_count, dpi, file_extension, no_annotations,
+                 profiles=None):
+        """
+        Args:
+            output_dir: Cartella di output del PDF, dove risiede il manifest
+            pdf_path: Percorso del file PDF sorgente
+            page_count: Numero di pagine del PDF
+            dpi: Risoluzione delle immagini
+            file_extension: Estensione normalizzata (jpg, png)
+            no_annotations: True se le annotazioni vengono effettivamente rimosse
+            profiles: Lista di OutputProfile (un'immagine per profilo), o None
+        """
+        self.path = output_dir / MANIFEST_NAME
+        self.output_dir = output_dir
+        self.file_extension = file_extension
+        self.profiles = profiles
+        self.page_count = page_count
+        self.params = {
+            'dpi': dpi,
+            'format': file_extension,
+            'no_annotations': no_annotations,
+        }
+        if profiles:
+            self.params['profiles'] = [repr(profile) for profile in profiles]
+        if ENCODE_OPTIONS.as_dict():
+            self.params['encode'] = ENCODE_OPTIONS.as_dict()
+        vprint(f"[VERBOSE] --incremental: Calcolo hash di {pdf_path.name}...")
+        self.source = {
+            'name': pdf_path.name,
+            'size': pdf_path.stat().st_size,
+            'sha256': file_sha256(pdf_path),
+        }
+        self.pages = {}
+        self._last_save = 0.0
+        self._load()
+    
+    def _load(self):
+        """Carica le pagine registrate se il manifest esistente è ancora valido."""
+        try:
+            data = json.loads(self.path.read_text(encoding='utf-8'))
+        except FileNotFoundError:
+            vprint(f"[VERBOSE] --incremental: Nessun manifest in {self.output_dir}")
+            return
+        except (OSError, ValueError) as e:
+            print(f"  [AVVISO] Manifest non leggibile, verrà ricreato: {e}")
+            return
+        
+        if (data.get('version') != MANIFEST_VERSION
+                or data.get('source', {}).get('sha256') != self.source['sha256']
+                or data.get('page_count') != self.page_count
+                or data.get('params') != self.params):
+            print("  [INCREMENTALE] PDF o parametri cambiati: le pagine verranno riconvertite")
+            return
+        
+        self.pages = {int(page): digest for page, digest in data.get('pages', {}).items()}
+        vprint(f"[VERBOSE] --incremental: {len(self.pages)} pagine registrate nel manifest")
+    
+    def output_paths(self, page_num):
+        """Restituisce i percorsi delle immagini di una pagina (una per profilo)."""
+        if self.profiles:
+            return [self.output_dir / profile.name / f"page_{page_num:04d}.{profile.file_extension}"
+                    for profile in self.profiles]
+        return [self.output_dir / f"page_{page_num:04d}.{self.file_extension}"]
+    
+    def _page_digest(self, page_num):
+        """Hash delle immagini di una pagina, None se ne manca qualcuna."""
+        paths = self.output_paths(page_num)
+        if not all(path.is_file() for path in paths):
+            return None
+        return ','.join(file_sha256(path) for path in paths)
+    
+    def pending_pages(self, pages_list):
+        """
+        Filtra le pagine che devono essere (ri)convertite.
+        
+        Args:
+            pages_list: Lista di numeri di pagina (1-based) richiesti
+            
+        Returns:
+            Lista delle pagine senza un'immagine corrispondente al manifest
+        """
+        pending = []
+        for page_num in pages_list:
+            recorded = self.pages.get(page_num)
+            if recorded is not None and self._page_digest(page_num) == recorded:
+                continue
+            self.pages.pop(page_num, None)
+            pending.append(page_num)
+        return pending
+    
+    def record(self, page_num):
+        """
+        Registra una pagina appena salvata.
+        
+        Il manifest viene scritto su disco al massimo ogni MANIFEST_SAVE_INTERVAL
+        secondi, così un'interruzione perde solo le ultime pagine.
+        """
+        self.pages[page_num] = self._page_digest(page_num)
+        if time.monotonic() - self._last_save >= MANIFEST_SAVE_INTERVAL:
+            self.save()
+    
+    def save(self):
+        """Scrive il manifest su disco in modo atomico."""
+        data = {
+            'version': MANIFEST_VERSION,
+            'source': self.source,
+            'page_count': self.page_count,
+            'params': self.params,
+            'pages': {str(page): self.pages[page] for page in sorted(self.pages)},
+        }
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        tmp_path.write_text(json.dumps(data, indent=2), encoding='utf-8')
+        os.replace(tmp_path, self.path)
+        self._last_save = time.monotonic()
+
+
+class PdfInfoCache:
+    """
+    Cache persistente dei metadati dei PDF (numero di pagine e dimensione pagina).
+    
+    Le voci sono indicizzate per percorso assoluto e restano valide finché
+    dimensione e data di modifica del file non cambiano, così le esecuzioni
+    successive sullo stesso albero di cartelle non rileggono i PDF invariati.
+    """
+    
+    def __init__(self, path):
+        """
+        Args:
+            path: Percorso del file JSON della cache
+        """
+        self.path = Path(path)
+        self.entries = {}
+        self.dirty = False
+        self._lock = threading.Lock()
+        try:
+            data = json.loads(self.path.read_text(encoding='utf-8'))
+            if data.get('version') == PDF_INFO_CACHE_VERSION:
+                self.entries = data.get('entries', {})
+            vprint(f"[VERBOSE] Cache metadati: {len(self.entries)} voci da {self.path}")
+        except FileNotFoundError:
+            vprint(f"[VERBOSE] Cache metadati non presente: {self.path}")
+        except (OSError, ValueError) as e:
+            print(f"[AVVISO] Cache metadati non leggibile, verrà ricreata: {e}")
+    
+    @staticmethod
+    def _key(pdf_path):
+        return str(Path(pdf_path).resolve())
+    
+    def get(self, pdf_path, stat):
+        """Restituisce i metadati in cache se il file non è cambiato, altrimenti None."""
+        with self._lock:
+            entry = self.entries.get(self._key(pdf_path))
+        if (entry is None or entry['size'] != stat.st_size
+                or entry['mtime_ns'] != stat.st_mtime_ns):
+            return None
+        page_size = tuple(entry['page_size']) if entry['page_size'] else None
+        return {'pages': entry['pages'], 'page_size': page_size}
+    
+    def put(self, pdf_path, stat, info):
+        """Memorizza i metadati di un file."""
+        with self._lock:
+            self.entries[self._key(pdf_path)] = {
+                'size': stat.st_size,
+                'mtime_ns': stat.st_mtime_ns,
+                'pages': info['pages'],
+                'page_size': list(info['page_size']) if info['page_size'] else None,
+            }
+            self.dirty = True
+    
+    def save(self):
+        """Scrive la cache su disco in modo atomico, se è stata modificata."""
+        with self._lock:
+            if not self.dirty:
+                return
+            data = {'version': PDF_INFO_CACHE_VERSION, 'entries': self.entries}
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = self.path.with_name(self.path.name + '.tmp')
+                tmp_path.write_text(json.dumps(data), encoding='utf-8')
+                os.replace(tmp_path, self.path)
+                self.dirty = False
+                vprint(f"[VERBOSE] Cache metadati salvata: {len(self.entries)} voci in {self.path}")
+            except OSError as e:
+                print(f"[AVVISO] Impossibile salvare la cache dei metadati: {e}")
+
+
+def default_pdf_info_cache_path():
+    """Restituisce il percorso predefinito della cache dei metadati (XDG_CACHE_HOME)."""
+    cache_home = os.environ.get('XDG_CACHE_HOME') or Path.home() / '.cache'
+    return Path(cache_home) / 'pdf_to_images' / 'pdf_info.json'
+
+
+def read_pdf_info_pymupdf(pdf_path):
+    """
+    Legge numero di pagine e dimensione della prima pagina con PyMuPDF.
+    
+    Args:
+        pdf_path: Percorso del file PDF
+        
+    Returns:
+        Dizionario come get_pdf_info, oppure None se errore
+    """
+    try:
+        with fitz.open(pdf_path) as doc:
+            page_count = doc.page_count
+            page_size = None
+            if page_count > 0:
+                rect = doc.load_page(0).rect
+                page_size = (rect.width, rect.height)
+        return {'pages': page_count, 'page_size': page_size}
+    except Exception as e:
+        vprint(f"[VERBOSE] PyMuPDF: Impossibile leggere i metadati di {pdf_path}: {e}")
+        return None
+
+
+# Espressioni regolari del lettore xref/trailer (read_pdf_info_xref)
+_XREF_ENTRY_RE = re.compile(rb'(\d{10})\s(\d{5})\s([nf])')
+_REF_RE = {
+    key: re.compile(rb'/' + key.encode() + rb'\s+(\d+)\s+(\d+)\s+R')
+    for key in ('Root', 'Pages')
+}
+_KIDS_FIRST_RE = re.compile(rb'/Kids\s*\[\s*(\d+)\s+(\d+)\s+R')
+_COUNT_RE = re.compile(rb'/Count\s+(\d+)')
+_PREV_RE = re.compile(rb'/Prev\s+(\d+)')
+_MEDIABOX_RE = re.compile(rb'/MediaBox\s*\[\s*([-+\d.]+)\s+([-+\d.]+)\s+([-+\d.]+)\s+([-+\d.]+)\s*\]')
+
+
+def _read_xref_section(f, offset):
+    """
+    Legge una sezione xref classica e il relativo trailer.
+    
+    Args:
+        f: File PDF aperto in modalità binaria
+        offset: Posizione della parola chiave 'xref'
+        
+    Returns:
+        Tupla (offset_oggetti, trailer) oppure None se la sezione non è una
+        tabella xref classica (es. xref stream compresso, PDF 1.5+)
+    """
+    f.seek(offset)
+    if not f.read(4) == b'xref':
+        return None
+    
+    offsets = {}
+    f.readline()
+    while True:
+        line = f.readline()
+        if not line:
+            return None
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith(b'trailer'):
+            break
+        header = line.split()
+        if len(header) != 2:
+            return None
+        first_obj, count = int(header[0]), int(header[1])
+        # Ogni voce è lunga 20 byte (compreso il fine riga)
+        entries = _XREF_ENTRY_RE.findall(f.read(20 * count))
+        if len(entries) != count:
+            return None
+        for i, (obj_offset, _, kind) in enumerate(entries):
+            if kind == b'n':
+                offsets[first_obj + i] = int(obj_offset)
+    
+    trailer = line + f.read(4096)
+    end = trailer.find(b'startxref')
+    return offsets, trailer[:end] if end >= 0 else trailer
+
+
+def _read_pdf_object(f, offsets, ref):
+    """
+    Legge il dizionario di un oggetto indiretto a partire dalla tabella xref.
+    
+    Args:
+        f: File PDF aperto in modalità binaria
+        offsets: Dizionario numero_oggetto -> offset
+        ref: Tupla (numero_oggetto, generazione)
+        
+    Returns:
+        Byte dell'oggetto fino a 'stream'/'endobj', oppure None se non trovato
+    """
+    obj_num, generation = ref
+    offset = offsets.get(obj_num)
+    if offset is None:
+        return None
+    f.seek(offset)
+    data = f.read(8192)
+    if not re.match(rb'\s*%d\s+%d\s+obj' % (obj_num, generation), data):
+        return None
+    end = min(pos for pos in (data.find(b'endobj'), data.find(b'stream'), len(data)) if pos >= 0)
+    return data[:end]
+
+
+def read_pdf_info_xref(pdf_path):
+    """
+    Legge numero di pagine e dimensione pagina analizzando direttamente xref e trailer.
+    
+    Lettore minimale senza dipendenze: segue startxref (e le sezioni /Prev degli
+    aggiornamenti incrementali) fino al Catalog, poi legge /Count dal nodo radice
+    delle pagine e /MediaBox dalla radice o dalla prima pagina. Supporta solo le
+    tabelle xref classiche: con xref stream compressi o file danneggiati
+    restituisce None e si ricorre a pdfinfo.
+    
+    Args:
+        pdf_path: Percorso del file PDF
+        
+    Returns:
+        Dizionario come get_pdf_info, oppure None se il file non è supportato
+    """
+    try:
+        with open(pdf_path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            file_size = f.tell()
+            f.seek(max(0, file_size - 2048))
+            tail = f.read()
+            match = re.search(rb'startxref\s+(\d+)\s+%%EOF', tail[tail.rfind(b'startxref'):])
+            if not match:
+                return None
+            
+            # Le sezioni più recenti hanno la precedenza su quelle precedenti (/Prev)
+            offsets = {}
+            root_ref = None
+            section_offset = int(match.group(1))
+            visited = set()
+            while section_offset is not None and section_offset not in visited:
+                visited.add(section_offset)
+                section = _read_xref_section(f, section_offset)
+                if section is None:
+                    return None
+                section_offsets, trailer = section
+                for obj_num, obj_offset in section_offsets.items():
+                    offsets.setdefault(obj_num, obj_offset)
+                if root_ref is None:
+                    root_match = _REF_RE['Root'].search(trailer)
+                    if root_match:
+                        root_ref = (int(root_match.group(1)), int(root_match.group(2)))
+                prev_match = _PREV_RE.search(trailer)
+                section_offset = int(prev_match.group(1)) if prev_match else None
+            
+            if root_ref is None:
+                return None
+            catalog = _read_pdf_object(f, offsets, root_ref)
+            pages_match = _REF_RE['Pages'].search(catalog or b'')
+            if not pages_match:
+                return None
+            node = _read_pdf_object(f, offsets, (int(pages_match.group(1)), int(pages_match.group(2))))
+            count_match = _COUNT_RE.search(node or b'')
+            if not count_match:
+                return None
+            page_count = int(count_match.group(1))
+            
+            # /MediaBox è ereditabile: si scende lungo il primo figlio finché non compare
+            page_size = None
+            for _ in range(32):
+                box = _MEDIABOX_RE.search(node)
+                if box:
+                    x0, y0, x1, y1 = (float(v) for v in box.groups())
+                    page_size = (abs(x1 - x0), abs(y1 - y0))
+                    break
+                kid = _KIDS_FIRST_RE.search(node)
+                if not kid:
+                    break
+                node = _read_pdf_object(f, offsets, (int(kid.group(1)), int(kid.group(2))))
+                if node is None:
+                    break
+            
+            return {'pages': page_count, 'page_size': page_size}
+    except (OSError, ValueError) as e:
+        vprint(f"[VERBOSE] Lettura xref non riuscita per {pdf_path}: {e}")
+        return None
+
+
+def get_pdf_info(pdf_path):
+    """
+    Ottiene numero di pagine e dimensione della prima pagina del PDF.
+    
+    Consulta prima la cache persistente (PDF_INFO_CACHE), poi legge il file in-process
+    (PyMuPDF se disponibile, altrimenti il lettore xref/trailer) e solo in ultima
+    istanza avvia pdfinfo.
+    
+    Args:
+        pdf_path: Percorso del file PDF
+        
+    Returns:
+        Dizionario {'pages': int, 'page_size': (larghezza, altezza) in punti o None},
+        oppure None se errore
+    """
+    try:
+        stat = os.stat(pdf_path)
+    except OSError as e:
+        vprint(f"[VERBOSE] ERRORE: Impossibile accedere a {pdf_path}: {e}")
+        return None
+    
+    if PDF_INFO_CACHE is not None:
+        info = PDF_INFO_CACHE.get(pdf_path, stat)
+        if info is not None:
+            vprint(f"[VERBOSE] Metadati da cache per {pdf_path}: {info['pages']} pagine")
+            return info
+    
+    if PYMUPDF_AVAILABLE:
+        info = read_pdf_info_pymupdf(pdf_path)
+    else:
+        info = read_pdf_info_xref(pdf_path)
+    if info is not None:
+        vprint(f"[VERBOSE] Metadati letti in-process per {pdf_path}: {info['pages']} pagine")
+    else:
+        info = read_pdf_info_pdfinfo(pdf_path)
+    
+    if info is not None and PDF_INFO_CACHE is not None:
+        PDF_INFO_CACHE.put(pdf_path, stat, info)
+    return info
+
+
+def read_pdf_info_pdfinfo(pdf_path):
+    """
+    Ottiene numero di pagine e dimensione pagina del PDF usando pdfinfo.
+    
+    È il metodo più lento (un sottoprocesso per file): viene usato solo quando
+    la lettura in-process non riesce.
+    
+    Args:
+        pdf_path: Percorso del file PDF
+        
+    Returns:
+        Dizionario {'pages': int, 'page_size': (larghezza, altezza) in punti o None},
+        oppure None se errore
+    """
+    vprint(f"[VERBOSE] Ottenimento informazioni con pdfinfo per: {pdf_path}")
+    try:
+        import subprocess
+        result = subprocess.run(
+            ['pdfinfo', str(pdf_path)],
+            capture_output=True,
+            text=True,
+            check=True,
+            timeout=30
+        )
+        vprint(f"[VERBOSE] Output pdfinfo ricevuto")
+        
+        page_count = None
+        page_size = None
+        for line in result.stdout.split('\n'):
+            if line.startswith('Pages:'):
+                try:
+                    page_count = int(line.split(':')[1].strip())
+                except (ValueError, IndexError):
+                    vprint(f"[VERBOSE] ERRORE: Impossibile convertire il valore Pages in intero: '{line}'")
+                    return None
+                vprint(f"[VERBOSE] Numero pagine rilevato: {page_count}")
+            elif line.startswith('Page size:'):
+                # Formato: "Page size:      595.276 x 841.89 pts (A4)"
+                match = re.search(r'([\d.]+)\s*x\s*([\d.]+)', line)
+                if match:
+                    page_size = (float(match.group(1)), float(match.group(2)))
+                    vprint(f"[VERBOSE] Dimensione pagina rilevata: {page_size[0]}x{page_size[1]} pt")
+        
+        if page_count is None:
+            vprint(f"[VERBOSE] ERRORE: Campo 'Pages:' non trovato nell'output di pdfinfo")
+            return None
+        return {'pages': page_count, 'page_size': page_size}
+        
+    except subprocess.TimeoutExpired:
+        vprint(f"[VERBOSE] ERRORE: Timeout durante l'esecuzione di pdfinfo")
+        return None
+    except subprocess.CalledProcessError as e:
+        vprint(f"[VERBOSE] ERRORE: pdfinfo terminato con codice {e.returncode}")
+        return None
+    except Exception as e:
+        vprint(f"[VERBOSE] ERRORE: Eccezione durante pdfinfo: {e}")
+        return None
+
+
+def get_pdf_page_count(pdf_path):
+    """
+    Ottiene il numero di pagine del PDF (vedi get_pdf_info).
+    
+    Args:
+        pdf_path: Percorso del file PDF
+        
+    Returns:
+        Numero di pagine o None se errore
+    """
+    info = get_pdf_info(pdf_path)
+    return info['pages'] if info is not None else None
+
+
+def convert_pdf_with_pdf2image(pdf_path, output_dir, dpi=300, max_workers=8,
+                               image_format='jpg', pages_to_convert=None,
+                               pdf_info=None, on_page_saved=None, max_memory=None,
+                               profiles=None, autotune=False):
+    """
+    Converte PDF in immagini usando pdf2image/poppler con una pipeline a due stadi.
+    
+    Lo stadio di rendering (max_workers thread, ognuno con un processo pdftoppm per
+    intervallo di pagine) passa le pagine renderizzate allo stadio di codifica
+    (max_workers thread che caricano, convertono e salvano le immagini) tramite
+    una coda limitata. Con max_memory il rendering prenota la memoria stimata di
+    ogni pagina e si ferma quando la codifica resta indietro.
+    
+    Args:
+        pdf_path: Percorso del file PDF
+        output_dir: Directory dove salvare le immagini
+        dpi: Risoluzione delle immagini
+        max_workers: Numero di thread per ciascuno stadio
+        image_format: Formato immagine (jpg, jpeg, png)
+        pages_to_convert: Lista di numeri pagina (1-based) da convertire, None = tutte
+        pdf_info: Risultato di get_pdf_info se già disponibile, None per rilevarlo
+        on_page_saved: Funzione chiamata con il numero di pagina dopo ogni salvataggio
+        max_memory: Budget di memoria in byte per le pagine in volo, None = illimitato
+        profiles: Lista di OutputProfile, o None (dpi deve essere quello più alto)
+        autotune: Se True (--threads auto), max_workers è il massimo di thread per
+                  stadio: le prime pagine vengono convertite per misurare i tempi e
+                  i thread di rendering attivi vengono regolati durante la conversione
+        
+    Returns:
+        True se la conversione è riuscita, False altrimenti
+    """
+    global interrupted
+    
+    vprint(f"[VERBOSE] Utilizzo pdf2image per conversione")
+    
+    # Aumenta il limite PIL per immagini grandi
+    vprint(f"[VERBOSE] Rimozione limite PIL MAX_IMAGE_PIXELS")
+    from PIL import Image
+    Image.MAX_IMAGE_PIXELS = None
+    
+    # Ottieni il numero di pagine senza caricare il PDF
+    if pdf_info is None:
+        vprint(f"[VERBOSE] Rilevamento numero pagine del PDF...")
+        with timed(output_dir, 'open'):
+            pdf_info = get_pdf_info(pdf_path)
+    
+    if pdf_info is None:
+        print("  [ERRORE] Impossibile determinare il numero di pagine del PDF")
+        return False
+    
+    total_pages = pdf_info['pages']
+    if total_pages == 0:
+        print("  [ERRORE] Nessuna pagina trovata nel PDF.")
+        return False
+    
+    # Determina le pagine effettive da convertire
+    if pages_to_convert is not None:
+        pages_list = [p for p in pages_to_convert if p <= total_pages]
+        out_of_range = [p for p in pages_to_convert if p > total_pages]
+        if out_of_range:
+            print(f"  [AVVISO] Pagine fuori range ignorate: {out_of_range}")
+        if not pages_list:
+            print(f"  [ERRORE] Nessuna pagina valida da convertire.")
+            return False
+        print(f"  [PAGINE] Conversione pagine selezionate: {pages_list}")
+    else:
+        pages_list = list(range(1, total_pages + 1))
+    
+    pages_count = len(pages_list)
+    page_bytes = estimate_page_bytes(pdf_info['page_size'], dpi)
+    render_workers = encode_workers = render_pool = max_workers
+    tuner = None
+    sampled_pages = []
+    failed_pages = []
+    
+    if autotune:
+        # Calibrazione: le prime pagine vengono convertite una alla volta
+        memory_limit = autotune_memory_limit(max_memory)
+        sample = pages_list[:AUTOTUNE_SAMPLE_PAGES]
+        print(f"[AUTO] Calibrazione su {len(sample)} pagine...")
+        measures, sampled_pages = calibrate_poppler(pdf_path, sample, output_dir, dpi,
+                                                    image_format, profiles)
+        failed_pages.extend(p for p in sample if p not in sampled_pages)
+        if on_page_saved is not None:
+            for page_num in sampled_pages:
+                on_page_saved(page_num)
+        pages_list = pages_list[len(sample):]
+        
+        render_workers, encode_workers, render_pool = plan_poppler_workers(
+            measures, max_workers, page_bytes, memory_limit
         )
-    elif no_annotations and not PYMUPDF_AVAILABLE:
+        tuner = AutoTuner(render_workers, render_pool)
+        max_memory = memory_limit
+        print(f"[AUTO] Rendering {measures['render'] * 1000:.0f} ms/pagina, codifica "
+              f"{measures['encode'] * 1000:.0f} ms/pagina -> {render_workers} thread di "
+              f"rendering (max {render_pool}) + {encode_workers} di codifica"
+              + (f", tetto memoria {memory_limit / 2**20:.0f} MiB" if memory_limit else ""))
+    
+    budget = MemoryBudget(max_memory)
+    
+    # Suddivide le pagine in intervalli contigui: ogni intervallo è renderizzato da
+    # un solo processo pdftoppm, che apre e analizza il PDF una volta sola.
+    # La lunghezza è limitata in modo da distribuire il lavoro su tutti i thread
+    # e, con --max-memory, da far stare un intervallo per thread nel budget.
+    range_pages = max(1, min(POPPLER_RANGE_PAGES, -(-len(pages_list) // render_workers)))
+    if max_memory is not None:
+        range_pages = max(1, min(range_pages, max_memory // (page_bytes * render_workers)))
+        vprint(f"[VERBOSE] Budget memoria {max_memory / 2**20:.0f} MiB, "
+               f"{page_bytes / 2**20:.1f} MiB stimati per pagina")
+    page_ranges = split_page_ranges(pages_list, range_pages)
+    vprint(f"[VERBOSE] {len(page_ranges)} intervalli di al massimo {range_pages} pagine")
+    
+    print(f"[SALVATAGGIO] {pages_count} pagine in corso "
+          f"({len(page_ranges)} intervalli, {render_workers} thread di rendering "
+          f"+ {encode_workers} di codifica)...")
+    
+    # Coda limitata tra i due stadi: se la codifica resta indietro il rendering si blocca
+    handoff = queue.Queue(maxsize=encode_workers * 2)
+    results = queue.Queue()
+    
+    def render_stage(first_page, last_page):
+        page_nums = range(first_page, last_page + 1)
+        if interrupted:
+            return
+        # Con --threads auto il numero di pdftoppm attivi è regolato da AutoTuner
+        if tuner is not None:
+            tuner.limit.acquire()
+        budget.acquire(len(page_nums) * page_bytes)
+        try:
+            with timed(output_dir, 'render', first_page, len(page_nums)):
+                rendered = render_page_range(pdf_path, first_page, last_page, tmp_dir, dpi)
+        except Exception as e:
+            vprint(f"[VERBOSE] Thread: ERRORE nel rendering pagine {first_page}-{last_page}: {e}")
+            rendered = [(page_num, None) for page_num in page_nums]
+        finally:
+            if tuner is not None:
+                tuner.limit.release()
+        # Ogni pagina prenotata passa dalla coda: lo stadio di codifica la rilascia
+        for item in rendered:
+            handoff.put(item)
+    
+    def encode_stage():
+        while True:
+            item = handoff.get()
+            if item is None:
+                return
+            page_num, path = item
+            ok = False
+            if path is not None:
+                if interrupted:
+                    Path(path).unlink(missing_ok=True)
+                else:
+                    ok = encode_rendered_page(page_num, path, output_dir, image_format, profiles)
+            budget.release(page_bytes)
+            # Dopo un'interruzione le pagine scartate non vengono conteggiate come fallite
+            if ok or not interrupted:
+                results.put((page_num, ok))
+    
+    saved_pages = len(sampled_pages)
+    stop_requested = False
+    
+    try:
+        with tempfile.TemporaryDirectory(prefix='.render_', dir=output_dir) as tmp_dir, \
+                alive_bar(pages_count, title='  Progresso', bar='smooth') as bar, \
+                ThreadPoolExecutor(max_workers=render_pool) as renderers, \
+                ThreadPoolExecutor(max_workers=encode_workers) as encoders:
+            vprint(f"[VERBOSE] Invio {len(page_ranges)} task di rendering")
+            if autotune:
+                # Le pagine di calibrazione sono già state convertite
+                bar(saved_pages + len(failed_pages))
+            
+            render_futures = [renderers.submit(render_stage, first_page, last_page)
+                              for first_page, last_page in page_ranges]
+            encode_futures = [encoders.submit(encode_stage) for _ in range(encode_workers)]
+            
+            def close_handoff():
+                # Terminato il rendering, un segnale di fine per ogni thread di codifica
+                wait(render_futures)
+                for _ in encode_futures:
+                    handoff.put(None)
+            
+            threading.Thread(target=close_handoff, daemon=True).start()
+            
+            def handle_result(page_num, ok):
+                nonlocal saved_pages
+                if ok:
+                    saved_pages += 1
+                    if on_page_saved is not None:
+                        on_page_saved(page_num)
+                else:
+                    failed_pages.append(page_num)
+                    vprint(f"[VERBOSE] Pagina {page_num} FALLITA")
+                bar()
+            
+            # Processa i risultati man mano che arrivano
+            while True:
+                if interrupted and not stop_requested:
+                    vprint(f"[VERBOSE] Interruzione rilevata, cancellazione task rimanenti")
+                    # I task di rendering non ancora avviati vengono cancellati; le
+                    # pagine già renderizzate vengono scartate dallo stadio di codifica
+                    for f in render_futures:
+                        f.cancel()
+                    stop_requested = True
+                    print("\n[INTERRUZIONE] Salvataggio interrotto")
+                if tuner is not None and not stop_requested:
+                    tuner.update(saved_pages + len(failed_pages))
+                try:
+                    page_num, ok = results.get(timeout=0.2)
+                except queue.Empty:
+                    if all(f.done() for f in encode_futures):
+                        break
+                    continue
+                handle_result(page_num, ok)
+            
+            # Risultati arrivati tra l'ultimo controllo e la fine della codifica
+            while not results.empty():
+                handle_result(*results.get_nowait())
+                        
+    except KeyboardInterrupt:
+        print("\n[INTERRUZIONE] Conversione interrotta dall'utente")
+        interrupted = True
+        return False
+    
+    if interrupted:
+        print(f"[PARZIALE] {saved_pages}/{pages_count} pagine salvate prima dell'interruzione\n")
+        return False
+    
+    if failed_pages:
+        failed_pages.sort()
+        print(f"[AVVISO] {len(failed_pages)} pagine non convertite: {failed_pages}")
+    
+    print(f"[COMPLETATO] {saved_pages}/{pages_count} immagini salvate\n")
+    return saved_pages == pages_count
+
+
+def prepare_output_dir(pdf_path, output_base_dir, override=False, incremental=False,
+                       profiles=None):
+    """
+    Crea (o ricrea con --override) la cartella di output di un PDF.
+    
+    Args:
+        pdf_path: Percorso del file PDF
+        output_base_dir: Directory base dove salvare le immagini
+        override: Se True, la cartella col nome del PDF viene eliminata e ricreata
+        incremental: Se True, la cartella esistente viene riutilizzata
+        profiles: Lista di OutputProfile, per ognuno viene creata una sottocartella
+        
+    Returns:
+        Path della cartella di output
+    """
+    # Crea il nome della cartella sanitizzato
+    folder_name = sanitize_filename(pdf_path.name)
+    output_dir = output_base_dir / folder_name
+
+    if override:
+        if output_dir.exists():
+            vprint(f"[VERBOSE] --override: Eliminazione cartella esistente: {output_dir}")
+            print(f"[OVERRIDE] Cartella esistente eliminata: {output_dir}")
+            shutil.rmtree(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        vprint(f"[VERBOSE] --override: Cartella ricreata: {output_dir}")
+    elif incremental:
+        output_dir.mkdir(parents=True, exist_ok=True)
+        vprint(f"[VERBOSE] --incremental: Cartella esistente riutilizzata: {output_dir}")
+    else:
+        output_dir.mkdir(parents=True, exist_ok=True)
+        vprint(f"[VERBOSE] Directory di output creata: {output_dir}")
+    
+    for profile in profiles or []:
+        (output_dir / profile.name).mkdir(exist_ok=True)
+    
+    return output_dir
+
+
+def open_incremental_manifest(pdf_path, output_dir, total_pages, dpi, file_extension,
+                              no_annotations, pages_to_convert=None, profiles=None):
+    """
+    Apre il manifest di --incremental e determina le pagine ancora da convertire.
+    
+    Args:
+        pdf_path: Percorso del file PDF
+        output_dir: Cartella di output del PDF
+        total_pages: Numero di pagine del PDF
+        dpi: Risoluzione delle immagini
+        file_extension: Estensione normalizzata (jpg, png)
+        no_annotations: True se le annotazioni vengono effettivamente rimosse
+        pages_to_convert: Lista di numeri pagina (1-based) richiesti, None = tutte
+        profiles: Lista di OutputProfile, o None
+        
+    Returns:
+        Tupla (manifest, pagine_richieste, pagine_da_convertire)
+    """
+    # Rimuove le cartelle temporanee lasciate da un'esecuzione terminata bruscamente
+    for stale_dir in output_dir.glob('.render_*'):
+        vprint(f"[VERBOSE] --incremental: Rimozione cartella temporanea residua: {stale_dir}")
+        shutil.rmtree(stale_dir, ignore_errors=True)
+    
+    manifest = ConversionManifest(output_dir, pdf_path, total_pages, dpi,
+                                  file_extension, no_annotations, profiles)
+    if pages_to_convert is not None:
+        requested = [p for p in pages_to_convert if p <= total_pages]
+    else:
+        requested = list(range(1, total_pages + 1))
+    pending = manifest.pending_pages(requested)
+    
+    if len(pending) < len(requested):
+        print(f"[INCREMENTALE] {len(requested) - len(pending)}/{len(requested)} pagine "
+              f"già aggiornate, saltate")
+    return manifest, requested, pending
+
+
+def convert_pdf_to_images(pdf_path, output_base_dir, dpi=300, max_workers=8, 
+                          image_format='jpg', no_annotations=False,
+                          pages_to_convert=None, override=False, incremental=False,
+                          max_memory=None, profiles=None, autotune=False):
+    """
+    Converte tutte le pagine (o un sottoinsieme) di un PDF in immagini usando threading ottimizzato.
+    
+    Con profiles ogni pagina viene renderizzata una sola volta al DPI più alto tra
+    i profili e salvata in tutti i profili (dpi e image_format vengono ignorati).
+    
+    Args:
+        pdf_path: Percorso del file PDF
+        output_base_dir: Directory base dove salvare le immagini
+        dpi: Risoluzione delle immagini (default: 300)
+        max_workers: Numero massimo di thread (default: 8)
+        image_format: Formato immagine (jpg, jpeg, png) (default: jpg)
+        no_annotations: Se True, rimuove le annotazioni (richiede PyMuPDF)
+        pages_to_convert: Lista di numeri pagina (1-based) da convertire, None = tutte
+        override: Se True, la cartella col nome del PDF viene eliminata e ricreata
+        incremental: Se True, salta le pagine già convertite registrate nel manifest
+        max_memory: Budget di memoria in byte per le pagine in volo, None = illimitato
+        profiles: Lista di OutputProfile (--profile), o None
+        autotune: Se True (--threads auto), max_workers è un massimo e il numero di
+                  worker viene scelto misurando le prime pagine
+        
+    Returns:
+        True se la conversione è riuscita, False altrimenti
+    """
+    global interrupted
+    
+    if interrupted:
+        print(f"[SALTATO] File '{pdf_path.name}' - operazione interrotta\n")
+        return False
+    
+    pdf_path = Path(pdf_path)
+    
+    vprint(f"[VERBOSE] Inizio conversione PDF: {pdf_path}")
+    
+    if not pdf_path.exists():
+        print(f"  [ERRORE] Il file '{pdf_path}' non esiste.")
+        return False
+    
+    if not pdf_path.is_file():
+        print(f"  [ERRORE] '{pdf_path}' non è un file.")
+        return False
+    
+    vprint(f"[VERBOSE] File PDF verificato e accessibile")
+    
+    output_dir = prepare_output_dir(pdf_path, output_base_dir, override, incremental, profiles)
+    if profiles:
+        dpi = max(profile.dpi for profile in profiles)
+    
+    # Normalizza il formato (jpg -> jpg, jpeg -> jpg per consistenza nel nome file)
+    file_extension = image_format.lower()
+    if file_extension == 'jpeg':
+        file_extension = 'jpg'
+    
+    vprint(f"[VERBOSE] Estensione file normalizzata: {file_extension}")
+    
+    print(f"\n[FILE] {pdf_path.name}")
+    print(f"[OUTPUT] {output_dir}")
+    if profiles:
+        print(f"[DPI] {dpi} (rendering unico per {len(profiles)} profili)")
+        print(f"[PROFILI] {', '.join(repr(profile) for profile in profiles)}")
+    else:
+        print(f"[DPI] {dpi}")
+    print(f"[THREADS] {f'auto (max {max_workers})' if autotune else max_workers}")
+    if not profiles:
+        print(f"[FORMATO] {file_extension.upper()}")
+    if no_annotations:
+        print(f"[ANNOTAZIONI] Disabilitate (solo contenuto originale)")
+    else:
+        print(f"[ANNOTAZIONI] Abilitate (include note e markup)")
+    
+    # Se richiesto no_annotations e PyMuPDF è disponibile, usa PyMuPDF
+    use_pymupdf = no_annotations and PYMUPDF_AVAILABLE
+    if no_annotations and not PYMUPDF_AVAILABLE:
         print("  [AVVISO] PyMuPDF non disponibile, converto con annotazioni")
         print("  [INFO] Installa PyMuPDF per usare --no-annotations: pip install PyMuPDF\n")
     
-    # Altrimenti usa pdf2image con threading ottimizzato
-    vprint(f"[VERBOSE] Utilizzo pdf2image per conversione")
+    pdf_info = None
+    manifest = None
+    if incremental:
+        vprint(f"[VERBOSE] --incremental: Rilevamento numero pagine del PDF...")
+        with timed(output_dir, 'open'):
+            pdf_info = get_pdf_info(pdf_path)
+        if pdf_info is None:
+            print("  [ERRORE] Impossibile determinare il numero di pagine del PDF")
+            return False
+        total_pages = pdf_info['pages']
+        if total_pages == 0:
+            print("  [ERRORE] Nessuna pagina trovata nel PDF.")
+            return False
+        
+        manifest, requested, pending = open_incremental_manifest(
+            pdf_path, output_dir, total_pages, dpi, file_extension, use_pymupdf,
+            pages_to_convert, profiles
+        )
+        if requested and not pending:
+            manifest.save()
+            print(f"[COMPLETATO] Nessuna pagina da riconvertire\n")
+            return True
+        if pending:
+            pages_to_convert = pending
     
-    # Aumenta il limite PIL per immagini grandi
-    vprint(f"[VERBOSE] Rimozione limite PIL MAX_IMAGE_PIXELS")
-    from PIL import Image
-    Image.MAX_IMAGE_PIXELS = None
+    on_page_saved = manifest.record if manifest is not None else None
+    try:
+        if use_pymupdf:
+            vprint(f"[VERBOSE] Utilizzo PyMuPDF per conversione (no_annotations richiesto)")
+            return convert_pdf_with_pymupdf(
+                pdf_path, output_dir, dpi, max_workers, image_format, no_annotations,
+                pages_to_convert=pages_to_convert, on_page_saved=on_page_saved,
+                max_memory=max_memory, profiles=profiles, autotune=autotune
+            )
+        
+        # Altrimenti usa pdf2image con la pipeline rendering/codifica
+        return convert_pdf_with_pdf2image(
+            pdf_path, output_dir, dpi, max_workers, image_format,
+            pages_to_convert=pages_to_convert, pdf_info=pdf_info,
+            on_page_saved=on_page_saved, max_memory=max_memory, profiles=profiles,
+            autotune=autotune
+        )
+    finally:
+        # Lo stato della conversione resta nel manifest anche in caso di interruzione
+        if manifest is not None:
+            manifest.save()
+            vprint(f"[VERBOSE] Manifest salvato: {manifest.path}")
+        if STAGE_TIMINGS is not None:
+            STAGE_TIMINGS.report(output_dir, pdf_path)
+
+
+def convert_pdf_batch(pdf_files, output_base_dir, dpi=300, max_workers=8,
+                      image_format='jpg', no_annotations=False,
+                      pages_to_convert=None, override=False, incremental=False,
+                      max_memory=None, profiles=None, autotune=False):
+    """
+    Converte più PDF con un'unica coda di lavoro condivisa (--global-queue).
+    
+    Le pagine di tutti i file vengono suddivise in task (intervalli contigui di
+    pagine dello stesso PDF) e messe in un'unica coda ordinata per costo stimato
+    decrescente: pagine × area della pagina × DPI², cioè i pixel da renderizzare.
+    Eseguire prima i task più costosi evita che un PDF grande finisca da solo in
+    coda mentre gli altri worker restano inattivi. Al pool vengono inviati al
+    massimo GLOBAL_QUEUE_DEPTH task per worker alla volta.
+    
+    Con autotune il pool ha max_workers worker ma i task in esecuzione sono
+    limitati da un AutoTuner, che parte da una stima compatibile con la memoria
+    e aggiunge o toglie worker in base alle pagine/s misurate.
+    
+    Args:
+        pdf_files: Lista di Path dei file PDF
+        output_base_dir: Directory base dove salvare le immagini
+        dpi: Risoluzione delle immagini
+        max_workers: Numero di worker (thread per pdf2image, processi per PyMuPDF)
+        image_format: Formato immagine (jpg, jpeg, png)
+        no_annotations: Se True, rimuove le annotazioni (richiede PyMuPDF)
+        pages_to_convert: Lista di numeri pagina (1-based) da convertire, None = tutte
+        override: Se True, le cartelle dei PDF vengono eliminate e ricreate
+        incremental: Se True, salta le pagine già convertite registrate nel manifest
+        max_memory: Budget di memoria in byte per le pagine in volo, None = illimitato
+        profiles: Lista di OutputProfile (--profile), o None
+        autotune: Se True (--threads auto), max_workers è il massimo di worker attivi
+        
+    Returns:
+        Tupla (riuscite, fallite, saltate) con il numero di file
+    """
+    global interrupted
+    
+    if profiles:
+        dpi = max(profile.dpi for profile in profiles)
+    if autotune:
+        max_memory = autotune_memory_limit(max_memory)
+    file_extension = 'jpg' if image_format.lower() == 'jpeg' else image_format.lower()
+    use_pymupdf = no_annotations and PYMUPDF_AVAILABLE
+    if no_annotations and not PYMUPDF_AVAILABLE:
+        print("  [AVVISO] PyMuPDF non disponibile, converto con annotazioni\n")
+    
+    if not use_pymupdf:
+        # Aumenta il limite PIL per immagini grandi
+        from PIL import Image
+        Image.MAX_IMAGE_PIXELS = None
+    
+    successful = 0
+    failed = 0
+    
+    # --- 1. PIANIFICAZIONE: un job per file, un task per intervallo di pagine ---
+    print(f"[CODA GLOBALE] Analisi di {len(pdf_files)} file...")
+    jobs = []
+    tasks = []
+    for pdf_path in pdf_files:
+        pdf_path = Path(pdf_path)
+        if not pdf_path.is_file():
+            print(f"  [ERRORE] '{pdf_path}' non è un file.")
+            failed += 1
+            continue
+        
+        open_start = time.perf_counter()
+        info = get_pdf_info(pdf_path)
+        open_seconds = time.perf_counter() - open_start
+        if info is None or info['pages'] == 0:
+            print(f"  [ERRORE] {pdf_path.name}: impossibile determinare le pagine del PDF")
+            failed += 1
+            continue
+        total_pages = info['pages']
+        output_dir = prepare_output_dir(pdf_path, output_base_dir, override, incremental,
+                                        profiles)
+        if STAGE_TIMINGS is not None:
+            STAGE_TIMINGS.record(output_dir, 'open', None, open_seconds)
+        
+        if pages_to_convert is not None:
+            pages_list = [p for p in pages_to_convert if p <= total_pages]
+        else:
+            pages_list = list(range(1, total_pages + 1))
+        if not pages_list:
+            print(f"  [ERRORE] {pdf_path.name}: nessuna pagina valida da convertire.")
+            failed += 1
+            continue
+        
+        manifest = None
+        if incremental:
+            manifest, _, pages_list = open_incremental_manifest(
+                pdf_path, output_dir, total_pages, dpi, file_extension, use_pymupdf,
+                pages_list, profiles
+            )
+            if not pages_list:
+                manifest.save()
+                print(f"[COMPLETATO] {pdf_path.name}: nessuna pagina da riconvertire")
+                successful += 1
+                continue
+        
+        job = {
+            'pdf_path': pdf_path,
+            'output_dir': output_dir,
+            'manifest': manifest,
+            'page_size': info['page_size'],
+            'pages': len(pages_list),
+            'saved': 0,
+            'failed': [],
+            'remaining': 0,
+        }
+        # Formato Letter se pdfinfo non riporta la dimensione della pagina
+        width, height = info['page_size'] or (612.0, 792.0)
+        page_pixels = width * height * (dpi / 72.0) ** 2
+        range_pages = POPPLER_RANGE_PAGES
+        if max_memory is not None:
+            # Un intervallo per worker deve stare nel budget di memoria
+            page_bytes = estimate_page_bytes(info['page_size'], dpi)
+            range_pages = max(1, min(range_pages, max_memory // (page_bytes * max_workers)))
+        for first_page, last_page in split_page_ranges(pages_list, range_pages):
+            cost = (last_page - first_page + 1) * page_pixels
+            tasks.append((cost, len(jobs), first_page, last_page))
+            job['remaining'] += 1
+        jobs.append(job)
+        vprint(f"[VERBOSE] {pdf_path.name}: {job['pages']} pagine in {job['remaining']} task, "
+               f"{page_pixels / 1e6:.1f} Mpx per pagina")
+    
+    # Task più costosi per primi (longest processing time first)
+    tasks.sort(key=lambda task: task[0], reverse=True)
+    total_pages_to_convert = sum(job['pages'] for job in jobs)
+    if not tasks:
+        return successful, failed, 0
+    
+    print(f"[CODA GLOBALE] {total_pages_to_convert} pagine da {len(jobs)} file in "
+          f"{len(tasks)} task su {'al massimo ' if autotune else ''}{max_workers} "
+          f"{'processi' if use_pymupdf else 'thread'}")
+    
+    tuner = None
+    if autotune:
+        # Si parte da metà dei worker, ridotti se le pagine più grandi non stanno nel tetto
+        largest_bytes = max(estimate_page_bytes(job['page_size'], dpi) for job in jobs)
+        worker_bytes = (PYMUPDF_PROCESS_BYTES + 2 * largest_bytes if use_pymupdf
+                        else POPPLER_RANGE_PAGES * largest_bytes)
+        start = max(1, max_workers // 2)
+        if max_memory is not None:
+            start = min(start, max_memory // worker_bytes)
+        tuner = AutoTuner(start, max_workers)
+        print(f"[AUTO] {tuner.limit.limit} worker attivi all'avvio, regolati durante la conversione"
+              + (f", tetto memoria {max_memory / 2**20:.0f} MiB" if max_memory else ""))
+    print()
+    
+    # --- 2. ESECUZIONE ---
+    budget = MemoryBudget(max_memory)
+    stop_event = None
+    if use_pymupdf:
+        if max_memory is not None and not autotune:
+            largest_page = max((job['page_size'] for job in jobs if job['page_size']),
+                               key=lambda size: size[0] * size[1], default=None)
+            max_workers = limit_workers_by_memory(max_workers, largest_page, dpi, max_memory)
+        ctx = multiprocessing.get_context()
+        stop_event = ctx.Event()
+        executor = ProcessPoolExecutor(max_workers=max_workers, mp_context=ctx,
+                                       initializer=_pymupdf_worker_init,
+                                       initargs=(None, stop_event, VERBOSE,
+                                                 STAGE_TIMINGS is not None,
+                                                 ENCODE_OPTIONS))
+    else:
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+    
+    def submit(job, first_page, last_page):
+        if use_pymupdf:
+            return executor.submit(_pymupdf_render_shard, job['pdf_path'],
+                                   list(range(first_page, last_page + 1)),
+                                   job['output_dir'], dpi, file_extension, no_annotations,
+                                   profiles)
+        return executor.submit(convert_page_range, job['pdf_path'], first_page, last_page,
+                               job['output_dir'], dpi, image_format, budget,
+                               estimate_page_bytes(job['page_size'], dpi), profiles)
+    
+    def finish_job(job):
+        nonlocal successful, failed
+        if job['manifest'] is not None:
+            job['manifest'].save()
+        name = job['pdf_path'].name
+        if job['failed']:
+            print(f"[AVVISO] {name}: {len(job['failed'])} pagine non convertite: "
+                  f"{sorted(job['failed'])}")
+        print(f"[COMPLETATO] {name}: {job['saved']}/{job['pages']} immagini salvate")
+        if STAGE_TIMINGS is not None:
+            STAGE_TIMINGS.report(job['output_dir'], job['pdf_path'])
+        if job['saved'] == job['pages']:
+            successful += 1
+        else:
+            failed += 1
+    
+    max_pending = max_workers * GLOBAL_QUEUE_DEPTH
+    task_iter = iter(tasks)
+    pending = {}
+    stop_requested = False
+    
+    def fill_pending():
+        # Con --threads auto i task inviati coincidono con i worker attivi
+        limit = tuner.limit.limit if tuner is not None else max_pending
+        while len(pending) < limit and not interrupted:
+            task = next(task_iter, None)
+            if task is None:
+                return
+            _, job_index, first_page, last_page = task
+            pending[submit(jobs[job_index], first_page, last_page)] = task
+    
+    try:
+        with alive_bar(total_pages_to_convert, title='  Progresso', bar='smooth') as bar:
+            with executor:
+                fill_pending()
+                while pending:
+                    done, _ = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+                    
+                    if interrupted and not stop_requested:
+                        vprint("[VERBOSE] Interruzione rilevata, cancellazione task rimanenti")
+                        stop_requested = True
+                        if stop_event is not None:
+                            stop_event.set()
+                        for future in pending:
+                            future.cancel()
+                        print("\n[INTERRUZIONE] Salvataggio interrotto")
+                    
+                    for future in done:
+                        _, job_index, first_page, last_page = pending.pop(future)
+                        if future.cancelled():
+                            continue
+                        job = jobs[job_index]
+                        task_pages = range(first_page, last_page + 1)
+                        events = []
+                        try:
+                            if use_pymupdf:
+                                saved, errors, events = future.result()
+                            else:
+                                saved, errors = future.result()
+                        except Exception as e:
+                            print(f"\n  [ERRORE] {job['pdf_path'].name} pagine "
+                                  f"{first_page}-{last_page}: {e}")
+                            saved, errors = [], []
+                        if events:
+                            STAGE_TIMINGS.add(job['output_dir'], events)
+                        if use_pymupdf:
+                            for page_num, message in errors:
+                                print(f"\n  [ERRORE] {job['pdf_path'].name} pagina {page_num}: {message}")
+                        
+                        if job['manifest'] is not None:
+                            for page_num in saved:
+                                job['manifest'].record(page_num)
+                        job['saved'] += len(saved)
+                        if not interrupted:
+                            saved_set = set(saved)
+                            job['failed'].extend(p for p in task_pages if p not in saved_set)
+                        bar(len(task_pages))
+                        
+                        job['remaining'] -= 1
+                        if job['remaining'] == 0:
+                            finish_job(job)
+                    
+                    if tuner is not None:
+                        tuner.update(sum(job['saved'] + len(job['failed']) for job in jobs))
+                    fill_pending()
+    
+    except KeyboardInterrupt:
+        print("\n[INTERRUZIONE] Conversione interrotta dall'utente")
+        interrupted = True
+    
+    finally:
+        # I file non completati conservano nel manifest le pagine già salvate
+        for job in jobs:
+            if job['remaining'] > 0 and job['manifest'] is not None:
+                job['manifest'].save()
+            if job['remaining'] > 0 and STAGE_TIMINGS is not None:
+                STAGE_TIMINGS.report(job['output_dir'], job['pdf_path'])
+    
+    skipped = sum(1 for job in jobs if job['remaining'] > 0)
+    if skipped:
+        print(f"[PARZIALE] {skipped} file non completati prima dell'interruzione")
+    print()
+    return successful, failed, skipped
+
+
+def resolve_search_pattern(pattern):
+    """
+    Separa un pattern di ricerca nella directory base e nel pattern del nome file.
+    
+    Se il pattern indica una directory esistente vengono selezionati tutti i PDF
+    al suo interno (file_pattern None).
+    
+    Args:
+        pattern: Pattern per la ricerca (glob, regex o directory)
+        
+    Returns:
+        Tupla (base_dir, file_pattern)
+    """
+    pattern_path = Path(pattern)
+    
+    if pattern_path.is_dir():
+        base_dir = pattern_path if pattern_path.is_absolute() else Path.cwd() / pattern_path
+        vprint(f"[VERBOSE] Pattern directory - base_dir: {base_dir}, tutti i PDF")
+        return base_dir, None
+    
+    if pattern_path.is_absolute():
+        base_dir = pattern_path.parent
+        file_pattern = pattern_path.name
+        vprint(f"[VERBOSE] Pattern assoluto - base_dir: {base_dir}, file_pattern: {file_pattern}")
+    else:
+        # Gestisce percorsi relativi
+        if '/' in str(pattern) or '\\' in str(pattern):
+            base_dir = Path.cwd() / pattern_path.parent
+            file_pattern = pattern_path.name
+            vprint(f"[VERBOSE] Pattern relativo con path - base_dir: {base_dir}, file_pattern: {file_pattern}")
+        else:
+            base_dir = Path.cwd()
+            file_pattern = pattern
+            vprint(f"[VERBOSE] Pattern semplice - base_dir: {base_dir}, file_pattern: {file_pattern}")
+    
+    return base_dir, file_pattern
+
+
+def _matches_any(name, rel_path, patterns):
+    """Verifica se il nome o il percorso relativo corrispondono a uno dei pattern glob."""
+    return any(fnmatch.fnmatchcase(name, p) or fnmatch.fnmatchcase(rel_path, p)
+               for p in patterns)
+
+
+def _scan_directory(dir_path, rel_dir, match_name, include, exclude, recursive):
+    """
+    Scansiona una singola directory con os.scandir.
+    
+    Il tipo di ogni voce viene letto dalla scansione stessa (nessuna stat
+    aggiuntiva per i file scartati): prima il controllo sull'estensione, poi il
+    pattern del nome, i filtri --include/--exclude e solo alla fine is_file().
+    I collegamenti simbolici a directory non vengono seguiti.
+    
+    Args:
+        dir_path: Directory da scansionare
+        rel_dir: Percorso relativo della directory rispetto alla base ('' per la base)
+        match_name: Funzione che verifica il nome del file
+        include: Lista di pattern glob da includere (None = tutti)
+        exclude: Lista di pattern glob da escludere (None = nessuno)
+        recursive: Se True, restituisce anche le sottocartelle da visitare
+        
+    Returns:
+        Tupla (pdf_files, subdirs) con i Path dei PDF trovati e le sottocartelle
+        come tuple (percorso, percorso_relativo)
+    """
+    pdf_files = []
+    subdirs = []
+    
+    try:
+        with os.scandir(dir_path) as entries:
+            for entry in entries:
+                name = entry.name
+                rel_path = f"{rel_dir}/{name}" if rel_dir else name
+                try:
+                    if recursive and entry.is_dir(follow_symlinks=False):
+                        if exclude and _matches_any(name, rel_path, exclude):
+                            vprint(f"[VERBOSE] Directory esclusa: {rel_path}")
+                        else:
+                            subdirs.append((entry.path, rel_path))
+                        continue
+                    
+                    if name[-4:].lower() != '.pdf' or not match_name(name):
+                        continue
+                    if include and not _matches_any(name, rel_path, include):
+                        continue
+                    if exclude and _matches_any(name, rel_path, exclude):
+                        vprint(f"[VERBOSE] File escluso: {rel_path}")
+                        continue
+                    if entry.is_file():
+                        pdf_files.append(Path(entry.path))
+                except OSError as e:
+                    vprint(f"[VERBOSE] Impossibile leggere '{entry.path}': {e}")
+    except OSError as e:
+        print(f"[AVVISO] Impossibile accedere alla directory '{dir_path}': {e}")
+    
+    return pdf_files, subdirs
+
+
+def _walk_directory_tree(base_dir, match_name, include, exclude):
+    """
+    Visita ricorsivamente base_dir scansionando le sottocartelle in parallelo.
+    
+    Un thread produttore distribuisce le directory su DISCOVERY_THREADS thread
+    e inserisce i PDF trovati in una coda, così il chiamante li riceve mentre
+    la scansione prosegue. L'ordine dei risultati non è deterministico.
+    
+    Yields:
+        Path dei file PDF trovati
+    """
+    found = queue.Queue()
+    stop_event = threading.Event()
+    
+    def walk():
+        scanned = 0
+        try:
+            with ThreadPoolExecutor(max_workers=DISCOVERY_THREADS) as executor:
+                pending = {executor.submit(_scan_directory, base_dir, '', match_name,
+                                           include, exclude, True)}
+                while pending and not interrupted and not stop_event.is_set():
+                    done, pending = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        pdf_files, subdirs = future.result()
+                        scanned += 1
+                        for pdf in pdf_files:
+                            found.put(pdf)
+                        for path, rel_path in subdirs:
+                            pending.add(executor.submit(_scan_directory, path, rel_path,
+                                                        match_name, include, exclude, True))
+                for future in pending:
+                    future.cancel()
+        finally:
+            vprint(f"[VERBOSE] Scansionate {scanned} directory sotto {base_dir}")
+            found.put(None)
+    
+    walker = threading.Thread(target=walk, daemon=True)
+    walker.start()
+    try:
+        while True:
+            pdf = found.get()
+            if pdf is None:
+                break
+            yield pdf
+    finally:
+        # Ferma la scansione se il chiamante smette di consumare i risultati
+        stop_event.set()
+
+
+def iter_pdf_files(pattern, use_regex=False, recursive=False, include=None, exclude=None):
+    """
+    Genera i file PDF che corrispondono al pattern man mano che vengono trovati.
+    
+    Args:
+        pattern: Pattern per la ricerca (glob, regex o directory)
+        use_regex: Se True, usa regex invece di glob per il nome del file
+        recursive: Se True, cerca anche in tutte le sottocartelle
+        include: Lista di pattern glob che i file devono soddisfare (nome o
+                 percorso relativo alla directory base)
+        exclude: Lista di pattern glob per file e cartelle da saltare
+        
+    Yields:
+        Path dei file PDF trovati (in ordine di scansione, non ordinati)
+    """
+    vprint(f"[VERBOSE] Ricerca file PDF con pattern: '{pattern}', regex={use_regex}, "
+           f"ricorsiva={recursive}")
+    
+    base_dir, file_pattern = resolve_search_pattern(pattern)
+    
+    # Verifica che la directory esista
+    if not base_dir.is_dir():
+        print(f"[ERRORE] La directory '{base_dir}' non esiste.")
+        vprint(f"[VERBOSE] Directory non trovata: {base_dir}")
+        return
+    
+    vprint(f"[VERBOSE] Directory base verificata: {base_dir}")
+    
+    if file_pattern is None:
+        match_name = lambda name: True
+    elif use_regex:
+        vprint(f"[VERBOSE] Utilizzo regex per pattern matching")
+        try:
+            match_name = re.compile(file_pattern).search
+            vprint(f"[VERBOSE] Pattern regex compilato con successo")
+        except re.error as e:
+            print(f"[ERRORE] Pattern regex non valido: {e}")
+            vprint(f"[VERBOSE] Errore compilazione regex: {e}")
+            return
+    elif not recursive and not any(c in file_pattern for c in '*?['):
+        # Se è un singolo file non serve scansionare la directory
+        single_file = base_dir / file_pattern
+        vprint(f"[VERBOSE] Pattern singolo file: {single_file}")
+        if (single_file.suffix.lower() == '.pdf' and single_file.is_file()
+                and not (exclude and _matches_any(single_file.name, single_file.name, exclude))):
+            vprint(f"[VERBOSE] File singolo trovato")
+            yield single_file
+        else:
+            vprint(f"[VERBOSE] File singolo NON trovato")
+        return
+    else:
+        vprint(f"[VERBOSE] Utilizzo glob per pattern matching")
+        match_name = lambda name: fnmatch.fnmatchcase(name, file_pattern)
+    
+    if recursive:
+        yield from _walk_directory_tree(base_dir, match_name, include, exclude)
+    else:
+        pdf_files, _ = _scan_directory(base_dir, '', match_name, include, exclude, False)
+        yield from pdf_files
+
+
+def find_pdf_files(pattern, use_regex=False, recursive=False, include=None, exclude=None):
+    """
+    Trova i file PDF che corrispondono al pattern.
+    
+    Args:
+        pattern: Pattern per la ricerca (glob, regex o directory)
+        use_regex: Se True, usa regex invece di glob
+        recursive: Se True, cerca anche nelle sottocartelle
+        include: Lista di pattern glob da includere (None = tutti)
+        exclude: Lista di pattern glob da escludere (None = nessuno)
+        
+    Returns:
+        Lista di Path dei file PDF trovati, ordinata alfabeticamente
+    """
+    sorted_files = sorted(iter_pdf_files(pattern, use_regex=use_regex, recursive=recursive,
+                                         include=include, exclude=exclude))
+    vprint(f"[VERBOSE] Trovati {len(sorted_files)} file PDF, ordinati alfabeticamente")
+    
+    return sorted_files
+
+
+def collect_pdf_files(patterns, use_regex=False, recursive=False, include=None,
+                      exclude=None, stream=False):
+    """
+    Raccoglie i file PDF da tutti i pattern forniti, senza duplicati.
+    
+    I file PDF esistenti passati direttamente (es. espansi dalla shell) vengono
+    accettati così come sono; gli altri argomenti sono trattati come pattern.
+    
+    Args:
+        patterns: Lista di file, pattern o directory
+        use_regex: Se True, usa regex invece di glob
+        recursive: Se True, cerca anche nelle sottocartelle
+        include: Lista di pattern glob da includere (None = tutti)
+        exclude: Lista di pattern glob da escludere (None = nessuno)
+        stream: Se True, restituisce i file appena trovati invece di ordinare
+                i risultati di ogni pattern
+        
+    Yields:
+        Path dei file PDF unici, nell'ordine dei pattern
+    """
+    seen = set()
+    
+    for idx, pattern in enumerate(patterns, 1):
+        vprint(f"[VERBOSE] Processing pattern {idx}/{len(patterns)}: {pattern}")
+        p = Path(pattern)
+        if len(patterns) > 1 and p.suffix.lower() == '.pdf' and p.is_file():
+            vprint(f"[VERBOSE] Pattern è un file esistente: {p}")
+            pdf_files = [p]
+        elif stream:
+            pdf_files = iter_pdf_files(pattern, use_regex=use_regex, recursive=recursive,
+                                       include=include, exclude=exclude)
+        else:
+            pdf_files = find_pdf_files(pattern, use_regex=use_regex, recursive=recursive,
+                                       include=include, exclude=exclude)
+        
+        for pdf in pdf_files:
+            key = os.path.abspath(pdf)
+            if key in seen:
+                vprint(f"[VERBOSE] Duplicato rimosso: {pdf}")
+                continue
+            seen.add(key)
+            yield pdf
+
+
+# Parole usate per il testo dei PDF sintetici del benchmark
+BENCHMARK_WORDS = (
+    'lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor '
+    'incididunt ut labore et dolore magna aliqua enim ad minim veniam quis nostrud '
+    'exercitation ullamco laboris nisi aliquip ex ea commodo consequat'
+).split()
+
+
+def _pdf_stream(data, extra=b''):
+    """Restituisce un oggetto stream PDF compresso con FlateDecode."""
+    compressed = zlib.compress(data)
+    return (b'<< /Length %d /Filter /FlateDecode %s>>\nstream\n' % (len(compressed), extra)
+            + compressed + b'\nendstream')
+
+
+def _synthetic_text_content(rng, font_size=9):
+    """Contenuto di una pagina A4 piena di testo (circa 80 righe)."""
+    lines = [b'BT /F1 %d Tf 40 800 Td %d TL' % (font_size, font_size + 1)]
+    for _ in range(80):
+        words = ' '.join(rng.choice(BENCHMARK_WORDS) for _ in range(rng.randint(12, 16)))
+        lines.append(b'(%s) Tj T*' % words.encode('ascii'))
+    lines.append(b'ET')
+    return b'\n'.join(lines)
+
+
+def _synthetic_vector_content(rng):
+    """Contenuto di una pagina con molti tracciati vettoriali (curve e rettangoli)."""
+    ops = []
+    for _ in range(300):
+        ops.append(b'%.3f %.3f %.3f rg %d %d %d %d re f' % (
+            rng.random(), rng.random(), rng.random(),
+            rng.randint(0, 560), rng.randint(0, 800), rng.randint(5, 80), rng.randint(5, 80)))
+    for _ in range(1500):
+        points = [rng.randint(0, 595) if i % 2 == 0 else rng.randint(0, 842) for i in range(8)]
+        ops.append(b'%.3f %.3f %.3f RG %.1f w %d %d m %d %d %d %d %d %d c S' % (
+            rng.random(), rng.random(), rng.random(), rng.uniform(0.2, 2.0), *points))
+    return b'\n'.join(ops)
+
+
+def write_synthetic_pdf(path, kind, pages, seed=0):
+    """
+    Scrive un PDF sintetico per il benchmark, senza dipendenze esterne.
     
-    # Ottieni il numero di pagine senza caricare il PDF
-    vprint(f"[VERBOSE] Rilevamento numero pagine del PDF...")
-    total_pages = get_pdf_page_count(pdf_path)
+    Tipi disponibili:
+      - text: pagine piene di testo (Helvetica)
+      - image: una foto RGB 800x1000 a pagina (rumore, poco comprimibile)
+      - vector: migliaia di curve e rettangoli colorati a pagina
+      - annotated: pagine di testo con note, rettangoli, evidenziazioni e
+        caselle di testo come annotazioni
     
-    if total_pages is None:
-        print("  [ERRORE] Impossibile determinare il numero di pagine del PDF")
-        return False
+    Args:
+        path: Percorso del PDF da scrivere
+        kind: Tipo di contenuto (text, image, vector, annotated)
+        pages: Numero di pagine
+        seed: Seme del generatore casuale (stesso seme = stesso PDF)
+    """
+    rng = random.Random(seed)
+    objects = [None, None]  # 1 = Catalog, 2 = Pages, compilati alla fine
     
-    if total_pages == 0:
-        print("  [ERRORE] Nessuna pagina trovata nel PDF.")
-        return False
+    def add(obj):
+        objects.append(obj)
+        return len(objects)
     
-    # Determina le pagine effettive da convertire
-    if pages_to_convert is not None:
-        pages_list = [p for p in pages_to_convert if p <= total_pages]
-        out_of_range = [p for p in pages_to_convert if p > total_pages]
-        if out_of_range:
-            print(f"  [AVVISO] Pagine fuori range ignorate: {out_of_range}")
-        if not pages_list:
-            print(f"  [ERRORE] Nessuna pagina valida da convertire.")
-            return False
-        print(f"  [PAGINE] Conversione pagine selezionate: {pages_list}")
-    else:
-        pages_list = list(range(1, total_pages + 1))
+    font = add(b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>')
+    images = []
+    if kind == 'image':
+        width, height = 800, 1000
+        for _ in range(3):
+            images.append(add(_pdf_stream(
+                rng.randbytes(width * height * 3),
+                b'/Type /XObject /Subtype /Image /Width %d /Height %d '
+                b'/ColorSpace /DeviceRGB /BitsPerComponent 8 ' % (width, height))))
     
-    pages_count = len(pages_list)
+    kids = []
+    for page_index in range(pages):
+        resources = b'<< /Font << /F1 %d 0 R >> >>' % font
+        annots = b''
+        if kind == 'image':
+            image = images[page_index % len(images)]
+            resources = b'<< /XObject << /Im1 %d 0 R >> >>' % image
+            content = b'q 515 0 0 644 40 100 cm /Im1 Do Q'
+        elif kind == 'vector':
+            content = _synthetic_vector_content(rng)
+        else:
+            content = _synthetic_text_content(rng)
+        
+        if kind == 'annotated':
+            refs = []
+            for _ in range(3):
+                x, y = rng.randint(40, 450), rng.randint(60, 740)
+                refs.append(add(b'<< /Type /Annot /Subtype /Square /Rect [%d %d %d %d] '
+                                b'/C [1 0 0] /BS << /W 2 >> >>' % (x, y, x + 100, y + 50)))
+                refs.append(add(b'<< /Type /Annot /Subtype /Text /Rect [%d %d %d %d] '
+                                b'/Contents (Nota %d) /C [1 1 0] >>'
+                                % (x + 110, y, x + 130, y + 20, page_index + 1)))
+                ly = rng.randint(100, 780)
+                refs.append(add(b'<< /Type /Annot /Subtype /Highlight /Rect [40 %d 400 %d] '
+                                b'/QuadPoints [40 %d 400 %d 40 %d 400 %d] /C [1 1 0] >>'
+                                % (ly, ly + 10, ly + 10, ly + 10, ly, ly)))
+            refs.append(add(b'<< /Type /Annot /Subtype /FreeText /Rect [300 20 560 60] '
+                            b'/Contents (Commento di revisione) /DA (/Helv 12 Tf 0 0 1 rg) >>'))
+            annots = b' /Annots [%s]' % b' '.join(b'%d 0 R' % ref for ref in refs)
+        
+        contents = add(_pdf_stream(content))
+        kids.append(add(b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] '
+                        b'/Resources %s /Contents %d 0 R%s >>' % (resources, contents, annots)))
     
-    print(f"[SALVATAGGIO] {pages_count} pagine in corso (threading ottimizzato)...")
-    vprint(f"[VERBOSE] Creazione ThreadPoolExecutor con max_workers={max_workers}")
+    objects[0] = b'<< /Type /Catalog /Pages 2 0 R >>'
+    objects[1] = b'<< /Type /Pages /Kids [%s] /Count %d >>' % (
+        b' '.join(b'%d 0 R' % kid for kid in kids), len(kids))
     
-    saved_pages = 0
-    failed_pages = []
+    # Tabella xref classica, leggibile anche da read_pdf_info_xref
+    out = bytearray(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+    offsets = []
+    for number, obj in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b'%d 0 obj\n' % number + obj + b'\nendobj\n'
+    xref_offset = len(out)
+    out += b'xref\n0 %d\n0000000000 65535 f\r\n' % (len(objects) + 1)
+    for offset in offsets:
+        out += b'%010d 00000 n\r\n' % offset
+    out += (b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n'
+            % (len(objects) + 1, xref_offset))
+    Path(path).write_bytes(out)
+
+
+def _peak_rss_mb():
+    """
+    Picco di memoria residente del processo corrente e del suo figlio più grande.
     
+    Returns:
+        Tupla (MB processo, MB figlio più grande), (None, None) se il modulo
+        resource non è disponibile (Windows)
+    """
     try:
-        with alive_bar(pages_count, title='  Progresso', bar='smooth') as bar:
-            with ThreadPoolExecutor(max_workers=max_workers) as executor:
-                vprint(f"[VERBOSE] Invio {pages_count} task al pool di thread")
-                
-                # Crea un task per ogni pagina selezionata
-                futures = {}
-                for page_num in pages_list:
-                    output_path = output_dir / f"page_{page_num:04d}.{file_extension}"
-                    future = executor.submit(
-                        convert_single_page,
-                        pdf_path,
-                        page_num,
-                        output_path,
-                        dpi,
-                        image_format
-                    )
-                    futures[future] = page_num
-                
-                vprint(f"[VERBOSE] Tutti i task inviati, attesa completamento...")
-                
-                # Processa i risultati man mano che arrivano
-                for future in as_completed(futures):
-                    if interrupted:
-                        vprint(f"[VERBOSE] Interruzione rilevata, cancellazione task rimanenti")
-                        # Cancella tutti i task rimanenti
-                        for f in futures:
-                            f.cancel()
-                        print("\n[INTERRUZIONE] Salvataggio interrotto")
-                        break
-                    
-                    page_num = futures[future]
-                    try:
-                        result = future.result()
-                        if result is not None:
-                            saved_pages += 1
-                            vprint(f"[VERBOSE] Pagina {page_num} completata con successo")
-                        else:
-                            failed_pages.append(page_num)
-                            vprint(f"[VERBOSE] Pagina {page_num} FALLITA")
-                        bar()
-                    except Exception as e:
-                        failed_pages.append(page_num)
-                        print(f"\n  [ERRORE] Pagina {page_num}: {e}")
-                        vprint(f"[VERBOSE] Eccezione durante il processing della pagina {page_num}: {e}")
-                        bar()
-                        
-    except KeyboardInterrupt:
-        print("\n[INTERRUZIONE] Conversione interrotta dall'utente")
-        interrupted = True
-        return False
+        import resource
+    except ImportError:
+        return None, None
+    # ru_maxrss è in KB su Linux e in byte su macOS
+    unit = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    self_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / unit
+    children_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / unit
+    return round(self_rss, 1), round(children_rss, 1)
+
+
+def _run_benchmark_case(case, results):
+    """
+    Esegue un caso del benchmark in un processo dedicato.
     
-    if interrupted:
-        print(f"[PARZIALE] {saved_pages}/{pages_count} pagine salvate prima dell'interruzione\n")
-        return False
+    Ogni caso gira in un processo nuovo così il picco di memoria misurato
+    (ru_maxrss) appartiene solo a quel caso. La latenza di ogni pagina è la somma
+    dei tempi delle sue fasi (render, convert, encode, write), raccolti con
+    StageTimings anche nei processi worker: a differenza dell'intervallo tra due
+    completamenti, non si accorcia quando più pagine vengono convertite in
+    parallelo. Il render di un intervallo di pagine (pdftoppm) viene diviso in
+    parti uguali tra le sue pagine.
     
-    if failed_pages:
-        print(f"[AVVISO] {len(failed_pages)} pagine non convertite: {failed_pages}")
+    Args:
+        case: Dizionario con backend, pdf, kind, pages, dpi, threads, format
+        results: Coda su cui inviare il dizionario dei risultati
+    """
+    global STAGE_TIMINGS
+    # Processo dedicato: i tempi per fase si possono attivare senza toccare altri casi
+    STAGE_TIMINGS = StageTimings()
+    saved_pages = []
     
-    print(f"[COMPLETATO] {saved_pages}/{pages_count} immagini salvate\n")
-    return saved_pages == pages_count
+    with tempfile.TemporaryDirectory(prefix='pdf_bench_') as out_dir, \
+            open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        # L'output della conversione (barre di avanzamento) non serve al benchmark
+        out_dir = Path(out_dir)
+        start = time.perf_counter()
+        if case['backend'] == 'pymupdf':
+            ok = convert_pdf_with_pymupdf(Path(case['pdf']), out_dir, case['dpi'],
+                                          case['threads'], case['format'],
+                                          on_page_saved=saved_pages.append)
+        else:
+            ok = convert_pdf_with_pdf2image(Path(case['pdf']), out_dir, case['dpi'],
+                                            case['threads'], case['format'],
+                                            on_page_saved=saved_pages.append)
+        elapsed = time.perf_counter() - start
+        output_bytes = sum(f.stat().st_size for f in out_dir.iterdir() if f.is_file())
+        events = STAGE_TIMINGS.take(out_dir)
+    
+    page_ms = {}
+    for stage, page, pages, seconds in events:
+        if page is None:
+            continue  # Fasi dell'intero file (open)
+        for page_num in range(page, page + pages):
+            page_ms[page_num] = page_ms.get(page_num, 0.0) + seconds * 1000 / pages
+    latencies = [page_ms[page_num] for page_num in saved_pages if page_num in page_ms]
+    p50, p95 = percentile(latencies, 50), percentile(latencies, 95)
+    peak_rss, peak_rss_children = _peak_rss_mb()
+    results.put({
+        'backend': case['backend'],
+        'kind': case['kind'],
+        'pages': case['pages'],
+        'dpi': case['dpi'],
+        'threads': case['threads'],
+        'format': case['format'],
+        'ok': bool(ok) and len(saved_pages) == case['pages'],
+        'seconds': round(elapsed, 3),
+        'pages_per_sec': round(len(saved_pages) / elapsed, 2) if elapsed > 0 else None,
+        'latency_p50_ms': round(p50, 1) if p50 is not None else None,
+        'latency_p95_ms': round(p95, 1) if p95 is not None else None,
+        'peak_rss_mb': peak_rss,
+        'peak_rss_children_mb': peak_rss_children,
+        'output_mb': round(output_bytes / 2**20, 2),
+    })
 
 
-def find_pdf_files(pattern, use_regex=False):
+def run_benchmark(backends, kinds, pages, dpis, threads_list, formats, work_dir):
     """
-    Trova i file PDF che corrispondono al pattern.
+    Esegue il benchmark su tutte le combinazioni di parametri.
     
     Args:
-        pattern: Pattern per la ricerca (glob o regex)
-        use_regex: Se True, usa regex invece di glob
+        backends: Lista di backend (pdf2image, pymupdf)
+        kinds: Lista di tipi di PDF sintetici
+        pages: Pagine di ogni PDF sintetico
+        dpis: Lista di risoluzioni
+        threads_list: Lista di valori di --threads
+        formats: Lista di formati immagine
+        work_dir: Cartella dove scrivere i PDF sintetici
         
     Returns:
-        Lista di Path dei file PDF trovati
+        Lista di dizionari con i risultati (vedi _run_benchmark_case)
     """
-    vprint(f"[VERBOSE] Ricerca file PDF con pattern: '{pattern}', regex={use_regex}")
+    documents = {}
+    for kind in kinds:
+        documents[kind] = work_dir / f"synthetic_{kind}.pdf"
+        write_synthetic_pdf(documents[kind], kind, pages)
+        vprint(f"[VERBOSE] PDF sintetico creato: {documents[kind]} "
+               f"({documents[kind].stat().st_size / 2**20:.1f} MB)")
     
-    # Estrai il percorso della directory e il pattern del file
-    pattern_path = Path(pattern)
+    cases = [
+        {'backend': backend, 'pdf': str(documents[kind]), 'kind': kind, 'pages': pages,
+         'dpi': dpi, 'threads': threads, 'format': image_format}
+        for backend in backends for kind in kinds for dpi in dpis
+        for threads in threads_list for image_format in formats
+    ]
     
-    if pattern_path.is_absolute():
-        base_dir = pattern_path.parent
-        file_pattern = pattern_path.name
-        vprint(f"[VERBOSE] Pattern assoluto - base_dir: {base_dir}, file_pattern: {file_pattern}")
-    else:
-        # Gestisce percorsi relativi
-        if '/' in str(pattern) or '\\' in str(pattern):
-            base_dir = Path.cwd() / pattern_path.parent
-            file_pattern = pattern_path.name
-            vprint(f"[VERBOSE] Pattern relativo con path - base_dir: {base_dir}, file_pattern: {file_pattern}")
-        else:
-            base_dir = Path.cwd()
-            file_pattern = pattern
-            vprint(f"[VERBOSE] Pattern semplice - base_dir: {base_dir}, file_pattern: {file_pattern}")
+    # spawn: ogni caso parte da un processo pulito, senza la memoria del padre
+    ctx = multiprocessing.get_context('spawn')
+    results = []
+    for index, case in enumerate(cases, 1):
+        if interrupted:
+            print(f"[INTERRUZIONE] Benchmark interrotto, {len(cases) - index + 1} casi saltati")
+            break
+        label = (f"{case['backend']:<9} {case['kind']:<9} {case['dpi']:>4} DPI "
+                 f"{case['threads']:>2} thread {case['format']:<4}")
+        print(f"[{index}/{len(cases)}] {label}", end=' ', flush=True)
+        
+        result_queue = ctx.Queue()
+        process = ctx.Process(target=_run_benchmark_case, args=(case, result_queue))
+        process.start()
+        result = None
+        while result is None:
+            try:
+                result = result_queue.get(timeout=0.5)
+            except queue.Empty:
+                if not process.is_alive():
+                    break
+        process.join()
+        
+        if result is None:
+            print(f"ERRORE (processo terminato con codice {process.exitcode})")
+            continue
+        results.append(result)
+        print(f"{result['pages_per_sec']} pag/s, p95 {result['latency_p95_ms']} ms, "
+              f"RSS {result['peak_rss_mb']} MB" + ('' if result['ok'] else ' [INCOMPLETO]'))
     
-    # Verifica che la directory esista
-    if not base_dir.exists():
-        print(f"[ERRORE] La directory '{base_dir}' non esiste.")
-        vprint(f"[VERBOSE] Directory non trovata: {base_dir}")
-        return []
+    return results
+
+
+def print_benchmark_table(results):
+    """Stampa i risultati del benchmark come tabella."""
+    header = (f"{'BACKEND':<9} {'PDF':<9} {'DPI':>4} {'THR':>3} {'FMT':<4} "
+              f"{'PAG/S':>7} {'P50 ms':>8} {'P95 ms':>8} {'RSS MB':>7} {'FIGLI MB':>8}")
+    print(f"{'='*len(header)}")
+    print(header)
+    print(f"{'='*len(header)}")
+    for r in results:
+        print(f"{r['backend']:<9} {r['kind']:<9} {r['dpi']:>4} {r['threads']:>3} "
+              f"{r['format']:<4} {r['pages_per_sec'] or 0:>7.2f} "
+              f"{r['latency_p50_ms'] or 0:>8.1f} {r['latency_p95_ms'] or 0:>8.1f} "
+              f"{r['peak_rss_mb'] or 0:>7.1f} {r['peak_rss_children_mb'] or 0:>8.1f}"
+              + ('' if r['ok'] else '  INCOMPLETO'))
+    print(f"{'='*len(header)}\n")
+
+
+def benchmark_main(argv):
+    """
+    Sottocomando "benchmark": confronta i backend su PDF sintetici.
     
-    vprint(f"[VERBOSE] Directory base verificata: {base_dir}")
+    Args:
+        argv: Argomenti della riga di comando dopo "benchmark"
+    """
+    global VERBOSE
     
-    pdf_files = []
+    parser = argparse.ArgumentParser(
+        prog='pdf_to_images benchmark',
+        description='Benchmark dei backend di conversione (pdf2image/poppler e PyMuPDF) '
+                    'su PDF sintetici generati localmente: testo, immagini, grafica '
+                    'vettoriale e annotazioni. Per ogni combinazione di backend, tipo di '
+                    'PDF, DPI, thread e formato riporta pagine/s, latenza per pagina '
+                    '(p50/p95) e picco di memoria residente.',
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('--backends', nargs='+', default=['pdf2image', 'pymupdf'],
+                        choices=['pdf2image', 'pymupdf'], metavar='NOME',
+                        help='Backend da misurare: pdf2image, pymupdf. Default: entrambi')
+    parser.add_argument('--kinds', nargs='+', default=['text', 'image', 'vector', 'annotated'],
+                        choices=['text', 'image', 'vector', 'annotated'], metavar='TIPO',
+                        help='Tipi di PDF sintetici: text, image, vector, annotated. '
+                             'Default: tutti')
+    parser.add_argument('--pages', type=int, default=20, metavar='N',
+                        help='Pagine di ogni PDF sintetico. Default: 20')
+    parser.add_argument('--dpi', type=int, nargs='+', default=[150, 300], metavar='N',
+                        help='Risoluzioni da misurare. Default: 150 300')
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 4, 8], metavar='N',
+                        help='Valori di --threads da misurare. Default: 1 4 8')
+    parser.add_argument('--formats', nargs='+', default=['jpg', 'png'],
+                        choices=['jpg', 'png', 'webp'], metavar='FORMATO',
+                        help='Formati immagine da misurare: jpg, png, webp. Default: jpg png')
+    parser.add_argument('--json', type=str, default=None, metavar='PATH',
+                        help='Salva i risultati in formato JSON nel file indicato '
+                             '("-" per stamparli su stdout)')
+    parser.add_argument('--keep', type=str, default=None, metavar='DIR',
+                        help='Scrive i PDF sintetici in DIR e non li elimina al termine')
+    parser.add_argument('-v', '--verbose', action='store_true',
+                        help='Abilita output verbose')
+    args = parser.parse_args(argv)
+    VERBOSE = args.verbose
     
-    if use_regex:
-        # Usa regex per filtrare i file
-        vprint(f"[VERBOSE] Utilizzo regex per pattern matching")
-        try:
-            regex_pattern = re.compile(file_pattern)
-            vprint(f"[VERBOSE] Pattern regex compilato con successo")
-        except re.error as e:
-            print(f"[ERRORE] Pattern regex non valido: {e}")
-            vprint(f"[VERBOSE] Errore compilazione regex: {e}")
-            return []
-        
-        file_count = 0
-        try:
-            dir_iter = list(base_dir.iterdir())
-        except PermissionError:
-            print(f"[ERRORE] Permesso negato per accedere alla directory '{base_dir}'.")
-            vprint(f"[VERBOSE] PermissionError su iterdir: {base_dir}")
-            return []
-        for file in dir_iter:
-            file_count += 1
-            if file.is_file() and file.suffix.lower() == '.pdf':
-                if regex_pattern.search(file.name):
-                    pdf_files.append(file)
-                    vprint(f"[VERBOSE] Match regex: {file.name}")
-        
-        vprint(f"[VERBOSE] Scansionati {file_count} file nella directory")
-    else:
-        # Usa glob per filtrare i file
-        vprint(f"[VERBOSE] Utilizzo glob per pattern matching")
-        if '*' in file_pattern or '?' in file_pattern:
-            pdf_files = list(base_dir.glob(file_pattern))
-            vprint(f"[VERBOSE] Glob ha trovato {len(pdf_files)} match")
-        else:
-            # Se è un singolo file
-            single_file = base_dir / file_pattern
-            vprint(f"[VERBOSE] Pattern singolo file: {single_file}")
-            if single_file.exists():
-                pdf_files = [single_file]
-                vprint(f"[VERBOSE] File singolo trovato")
+    # Con --json - lo stdout contiene solo il documento JSON (es. per passarlo a jq):
+    # intestazione, avanzamento e tabella vanno su stderr
+    human_output = (contextlib.redirect_stdout(sys.stderr) if args.json == '-'
+                    else contextlib.nullcontext())
+    with human_output:
+        if args.pages <= 0 or any(dpi <= 0 for dpi in args.dpi):
+            print("[ERRORE] --pages e --dpi devono essere valori positivi.")
+            sys.exit(1)
+        if any(threads <= 0 or threads > 32 for threads in args.threads):
+            print("[ERRORE] Il numero di thread deve essere tra 1 e 32.")
+            sys.exit(1)
+    
+        backends = []
+        for backend in dict.fromkeys(args.backends):
+            if backend == 'pdf2image' and not check_poppler():
+                print("[AVVISO] Poppler non installato: backend pdf2image saltato")
+            elif backend == 'pymupdf' and not PYMUPDF_AVAILABLE:
+                print("[AVVISO] PyMuPDF non installato: backend pymupdf saltato")
             else:
-                vprint(f"[VERBOSE] File singolo NON trovato")
+                backends.append(backend)
+        if not backends:
+            print("[ERRORE] Nessun backend disponibile da misurare.")
+            sys.exit(1)
     
-    # Filtra solo i file PDF
-    before_filter = len(pdf_files)
-    pdf_files = [f for f in pdf_files if f.is_file() and f.suffix.lower() == '.pdf']
-    vprint(f"[VERBOSE] Filtro PDF: {before_filter} -> {len(pdf_files)} file")
+        print(f"[BENCHMARK] Backend: {', '.join(backends)} | PDF: {', '.join(args.kinds)} "
+              f"({args.pages} pagine) | DPI: {args.dpi} | Thread: {args.threads} | "
+              f"Formati: {args.formats}\n")
     
-    sorted_files = sorted(pdf_files)
-    vprint(f"[VERBOSE] File PDF ordinati alfabeticamente")
+        if args.keep:
+            work_dir = Path(args.keep)
+            work_dir.mkdir(parents=True, exist_ok=True)
+            results = run_benchmark(backends, args.kinds, args.pages, args.dpi,
+                                    args.threads, args.formats, work_dir)
+        else:
+            with tempfile.TemporaryDirectory(prefix='pdf_bench_') as tmp_dir:
+                results = run_benchmark(backends, args.kinds, args.pages, args.dpi,
+                                        args.threads, args.formats, Path(tmp_dir))
     
-    return sorted_files
+        print()
+        print_benchmark_table(results)
+    
+    if args.json:
+        report = {
+            'version': 1,
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'host': {
+                'platform': sys.platform,
+                'python': sys.version.split()[0],
+                'cpu_count': os.cpu_count(),
+                'pymupdf': fitz.version[0] if PYMUPDF_AVAILABLE else None,
+            },
+            'results': results,
+        }
+        text = json.dumps(report, indent=2)
+        if args.json == '-':
+            print(text)
+        else:
+            Path(args.json).write_text(text, encoding='utf-8')
+            print(f"[JSON] Risultati salvati in {args.json}")
+    
+    if interrupted:
+        sys.exit(130)
 
 
 def main():
-    global interrupted, VERBOSE
+    global interrupted, VERBOSE, PDF_INFO_CACHE, STAGE_TIMINGS, ENCODE_OPTIONS
     
     # Registra il gestore del segnale per Ctrl+C
     signal.signal(signal.SIGINT, signal_handler)
     
+    # Sottocomando benchmark: pdf_to_images benchmark [opzioni]
+    if len(sys.argv) > 1 and sys.argv[1] == 'benchmark':
+        benchmark_main(sys.argv[2:])
+        return
+    
     # Descrizione dettagliata del programma
     description = """
-PDF to Images Converter - Converte file PDF in immagini (JPG, JPEG, PNG)
+PDF to Images Converter - Converte file PDF in immagini (JPG, JPEG, PNG, WEBP)
 
 Questo programma consente di convertire uno o più file PDF in immagini
 ad alta risoluzione. Ogni PDF viene convertito in una serie di immagini
@@ -739,12 +3512,20 @@ Il programma supporta:
   - Conversione di singoli file PDF
   - Batch processing con pattern glob (es. *.pdf)
   - Selezione tramite regex
+  - Ricerca ricorsiva parallela con filtri include/exclude (--recursive)
   - Selezione di un range o lista di pagine (--pages)
-  - Conversione multi-thread per prestazioni ottimali (una pagina per thread)
+  - Conversione incrementale e ripresa dopo interruzione (--incremental)
+  - Coda di lavoro unica per batch di molti PDF (--global-queue)
+  - Conversione multi-thread per prestazioni ottimali (un intervallo di pagine per thread,
+    il PDF viene analizzato una sola volta per intervallo)
   - Configurazione personalizzata della risoluzione (DPI)
-  - Formati di output: JPG, JPEG, PNG
+  - Formati di output: JPG, JPEG, PNG, WEBP, con qualità e compressione regolabili
+  - Scala di grigi automatica per le pagine senza colore (--grayscale auto)
+  - Più profili di output (DPI e formato) da un solo rendering per pagina (--profile)
   - Rimozione annotazioni/note (richiede PyMuPDF)
   - Modalità verbose per debugging dettagliato
+  - Benchmark dei backend su PDF sintetici (pdf_to_images benchmark --help)
+  - Tempi per fase e per pagina (--timings)
 """
 
     # Epilogo con esempi dettagliati
@@ -781,23 +3562,80 @@ ESEMPI DI UTILIZZO:
   10. Salvare come PNG senza annotazioni:
      %(prog)s "*.pdf" --format png --no-annotations
 
-  11. Combinare tutte le opzioni:
+  11. Riconvertire solo le pagine nuove o modificate (riprende dopo Ctrl+C):
+     %(prog)s "*.pdf" --incremental --output ./output
+
+  12. Convertire molti PDF di dimensioni diverse con un'unica coda di lavoro:
+     %(prog)s "archivio/*.pdf" --global-queue --threads 16
+
+  13. Limitare la memoria usata per disegni di grande formato ad alta risoluzione:
+     %(prog)s tavole.pdf --dpi 600 --max-memory 4G
+
+  14. Convertire tutti i PDF di un albero di cartelle, saltando le bozze,
+      iniziando la conversione mentre la ricerca è ancora in corso:
+     %(prog)s archivio -r --exclude "bozze" --exclude "*_old.pdf" --stream
+
+  15. Produrre PNG per OCR, anteprime e miniature con un solo rendering per pagina:
+     %(prog)s documento.pdf --profile ocr:300:png --profile anteprima:150:jpg --profile mini:72:jpg
+
+  16. Confrontare i backend su questa macchina e salvare i risultati in JSON:
+     %(prog)s benchmark --threads 1 4 8 --dpi 150 300 --json risultati.json
+
+  17. Vedere dove va il tempo (rendering, codifica, scrittura) per ogni file:
+     %(prog)s "*.pdf" --timings table
+     %(prog)s "*.pdf" --timings jsonl --timings-file tempi.jsonl
+
+  18. Archiviare scansioni di testo occupando meno spazio:
+     %(prog)s "*.pdf" --format webp --quality 80 --grayscale auto
+     %(prog)s "*.pdf" --format png --compress-level 1  # PNG più veloce da scrivere
+
+  19. Lasciare scegliere al programma il numero di thread per questa macchina:
+     %(prog)s "*.pdf" --threads auto
+     %(prog)s "archivio/*.pdf" --global-queue --threads auto --max-memory 8G
+
+  20. Combinare tutte le opzioni:
      %(prog)s "*.pdf" -v --format png --dpi 300 --threads 4 --output ./output --no-annotations --pages "{1-10}"
 
 NOTE:
-  - Formati supportati: jpg, jpeg, png
+  - Formati supportati: jpg, jpeg, png, webp
   - JPG: Più compresso, file più piccoli, ideale per documenti
   - PNG: Senza perdita, file più grandi, ideale per grafici e diagrammi
+  - WEBP: Più compatto del JPG a parità di qualità (richiede Pillow con supporto WebP)
   - Le immagini vengono salvate come page_0001.jpg, page_0002.jpg, ecc.
   - Con --pages i nomi file rispecchiano il numero pagina originale del PDF
+  - Con --profile: nome_file/NOME_PROFILO/page_0001.png per ogni profilo
   - Output standard: Exported/DDMMYYYYHHMMSS/nome_file/
   - Con --output: percorso_output/DDMMYYYYHHMMSS/nome_file/
   - Con --override: Exported/nome_file/ (senza timestamp; elimina e ricrea se esiste)
+  - Con --incremental: Exported/nome_file/ (senza timestamp; salta le pagine invariate
+    registrate in Exported/nome_file/.manifest.json)
   - Quando si usano pattern con *, racchiuderli tra virgolette
+  - Con --recursive il pattern del nome (es. "archivio/*.pdf") vale in tutte le
+    sottocartelle; --include/--exclude confrontano sia il nome sia il percorso
+    relativo alla cartella di partenza
   - Il programma richiede poppler-utils installato nel sistema
   - DPI più alti producono immagini di qualità superiore ma più grandi
   - L'opzione --no-annotations richiede PyMuPDF (pip install PyMuPDF)
-  - Threading ottimizzato: una pagina per thread, niente out-of-memory!
+  - Con --no-annotations, --threads indica il numero di processi PyMuPDF paralleli
+  - Numero e dimensione delle pagine vengono letti in-process (PyMuPDF o lettura
+    diretta della tabella xref) e memorizzati in ~/.cache/pdf_to_images/pdf_info.json;
+    pdfinfo viene usato solo per i PDF che il lettore interno non supporta
+  - Pipeline ottimizzata: un processo pdftoppm per intervallo di pagine (max 16),
+    thread di rendering e di codifica separati collegati da una coda limitata
+  - Il benchmark esegue ogni caso in un processo separato; la latenza per pagina è la
+    somma dei tempi delle sue fasi (render, convert, encode, write, come --timings),
+    anche con più thread o processi in parallelo; il render di un intervallo di pagine
+    (un processo pdftoppm) viene diviso in parti uguali tra le pagine dell'intervallo
+  - Con benchmark --json - lo stdout contiene solo il JSON; tabella e avanzamento
+    vanno su stderr
+  - Con --max-memory il rendering si ferma quando le pagine in attesa di essere
+    salvate superano il budget (stima: larghezza × altezza × 3 byte per pagina)
+  - Con --threads auto le prime 2 pagine di ogni file vengono convertite una alla
+    volta per misurare rendering e codifica; il tetto di memoria è --max-memory o,
+    se assente, metà della memoria disponibile all'avvio. Con pdf2image e con
+    --global-queue i worker attivi vengono poi regolati durante la conversione in
+    base alle pagine/s; con --no-annotations su un singolo file il numero di
+    processi PyMuPDF viene scelto una volta sola dopo la calibrazione
 
 REQUISITI:
   pip install pdf2image alive-progress
@@ -846,13 +3684,17 @@ VERSIONI TESTATE:
     
     parser.add_argument(
         '--threads',
-        type=int,
-        default=8,
-        metavar='N',
+        default='8',
+        metavar='N|auto',
         help='Numero massimo di thread da utilizzare per la conversione parallela. '
-             'Ogni thread processa una pagina alla volta (ottimizzato per memoria). '
+             'Con pdf2image vengono usati N thread di rendering (un processo pdftoppm per '
+             'intervallo contiguo di pagine) e N thread di codifica. '
+             'Con --no-annotations (PyMuPDF) indica il numero di processi worker, '
+             'ognuno con il proprio documento aperto. '
+             'Con "auto" il numero viene scelto misurando le prime pagine, entro le CPU '
+             'disponibili e un tetto di memoria, e regolato durante la conversione. '
              'Valori consigliati: 4-8 per la maggior parte dei sistemi. '
-             'Range valido: 1-32. Default: 8'
+             'Range valido: 1-32 o auto. Default: 8'
     )
     
     parser.add_argument(
@@ -863,6 +3705,42 @@ VERSIONI TESTATE:
              'Esempio: "^report_.*\\.pdf$" seleziona file che iniziano con "report_"'
     )
     
+    parser.add_argument(
+        '--recursive', '-r',
+        action='store_true',
+        help='Cerca i PDF anche in tutte le sottocartelle della directory del pattern. '
+             'Le sottocartelle vengono scansionate in parallelo; i collegamenti simbolici '
+             'a directory non vengono seguiti. Un argomento che indica una directory '
+             'seleziona tutti i PDF al suo interno.'
+    )
+    
+    parser.add_argument(
+        '--include',
+        action='append',
+        default=None,
+        metavar='GLOB',
+        help='Converte solo i PDF il cui nome o percorso relativo corrisponde al pattern glob '
+             '(es. "report_*", "2024/*"). Può essere ripetuto.'
+    )
+    
+    parser.add_argument(
+        '--exclude',
+        action='append',
+        default=None,
+        metavar='GLOB',
+        help='Salta i PDF e le cartelle il cui nome o percorso relativo corrisponde al pattern '
+             'glob (es. "bozze", "*_old.pdf"). Le cartelle escluse non vengono visitate. '
+             'Può essere ripetuto.'
+    )
+    
+    parser.add_argument(
+        '--stream',
+        action='store_true',
+        help='Inizia a convertire ogni PDF appena viene trovato, senza attendere la fine '
+             'della ricerca. I file vengono elaborati in ordine di scansione e il totale '
+             'è noto solo al termine. Non compatibile con --global-queue.'
+    )
+    
     parser.add_argument(
         '--output', '-o',
         type=str,
@@ -877,14 +3755,63 @@ VERSIONI TESTATE:
         '--format', '-f',
         type=str,
         default='jpg',
-        choices=['jpg', 'jpeg', 'png'],
+        choices=['jpg', 'jpeg', 'png', 'webp'],
         metavar='FORMAT',
-        help='Formato delle immagini di output: jpg, jpeg, o png. '
+        help='Formato delle immagini di output: jpg, jpeg, png o webp. '
              'JPG/JPEG: compresso, file più piccoli. '
              'PNG: senza perdita, file più grandi. '
+             'WEBP: compresso, file più piccoli del JPG a parità di qualità. '
              'Default: jpg'
     )
     
+    parser.add_argument(
+        '--quality',
+        type=int,
+        default=None,
+        metavar='N',
+        help='Qualità JPEG/WebP (1-100). Default JPEG: 75 con pdf2image, 95 con PyMuPDF '
+             '(--no-annotations). Default WebP: 80'
+    )
+    
+    parser.add_argument(
+        '--optimize',
+        action='store_true',
+        help='Riduce la dimensione dei file a costo di una codifica più lenta: tabelle '
+             'di Huffman ottimizzate per JPEG, compressione massima per PNG, metodo 6 per WebP'
+    )
+    
+    parser.add_argument(
+        '--compress-level',
+        type=int,
+        default=None,
+        metavar='N',
+        help='Livello di compressione PNG (0-9): 1 è molto più veloce con file poco più '
+             'grandi, 9 il più compatto. Default: 6'
+    )
+    
+    parser.add_argument(
+        '--grayscale',
+        type=str,
+        default='never',
+        choices=['never', 'auto', 'always'],
+        metavar='MODO',
+        help='Salvataggio in scala di grigi: "never" (default), "always" (tutte le pagine, '
+             'renderizzate direttamente in grigio) o "auto" (solo le pagine senza colore, '
+             'es. solo testo: file circa 3 volte più piccoli in PNG)'
+    )
+    
+    parser.add_argument(
+        '--profile',
+        action='append',
+        default=None,
+        metavar='NOME:DPI:FORMATO',
+        help='Profilo di output, ripetibile (es. --profile ocr:300:png '
+             '--profile anteprima:150:jpg). Ogni pagina viene renderizzata una sola volta '
+             'al DPI più alto e ridimensionata in memoria per gli altri profili; le immagini '
+             'di ogni profilo vengono salvate nella sottocartella NOME. '
+             'Sostituisce --dpi e --format.'
+    )
+    
     parser.add_argument(
         '--pages', '-p',
         type=str,
@@ -920,6 +3847,63 @@ VERSIONI TESTATE:
              '(senza sottocartella timestamp). Se la cartella esiste già, viene eliminata e ricreata.'
     )
     
+    parser.add_argument(
+        '--incremental',
+        action='store_true',
+        help='Modalità incrementale: come --override salva in una cartella col nome del PDF '
+             '(senza timestamp), ma non la elimina. Un manifest (.manifest.json) registra hash '
+             'del PDF, parametri e hash di ogni immagine: le pagine già convertite e invariate '
+             'vengono saltate e una conversione interrotta riprende dalle pagine mancanti.'
+    )
+    
+    parser.add_argument(
+        '--max-memory',
+        type=str,
+        default=None,
+        metavar='SIZE',
+        help='Budget di memoria per le pagine renderizzate in attesa di essere salvate '
+             '(es. 512M, 4G). Quando la codifica resta indietro il rendering si ferma '
+             'finché non si libera memoria. Con PyMuPDF riduce il numero di processi. '
+             'Default: nessun limite'
+    )
+    
+    parser.add_argument(
+        '--global-queue',
+        action='store_true',
+        help='Con più PDF, distribuisce le pagine di tutti i file su un\'unica coda di lavoro '
+             'condivisa invece di convertire un file alla volta. I task vengono ordinati per '
+             'costo stimato (pagine × area pagina × DPI²) per ridurre i tempi morti finali.'
+    )
+    
+    parser.add_argument(
+        '--timings',
+        type=str,
+        default=None,
+        choices=['table', 'jsonl'],
+        metavar='MODO',
+        help='Misura il tempo di ogni fase (open, render, convert, encode, write) per '
+             'ogni pagina. "table": riepilogo con totale, media, p50 e p95 alla fine di '
+             'ogni file. "jsonl": una riga JSON per evento nel file di --timings-file. '
+             'Senza questa opzione la misura è disattivata.'
+    )
+    
+    parser.add_argument(
+        '--timings-file',
+        type=str,
+        default=None,
+        metavar='PATH',
+        help='File a cui aggiungere gli eventi di --timings jsonl. '
+             'Default: timings.jsonl nella cartella di output'
+    )
+    
+    parser.add_argument(
+        '--no-info-cache',
+        action='store_true',
+        help='Disabilita la cache persistente dei metadati dei PDF (numero e dimensione '
+             'delle pagine), salvata in ~/.cache/pdf_to_images/pdf_info.json e indicizzata '
+             'per percorso, dimensione e data di modifica del file.'
+    )
+    
     parser.add_argument(
         '--version',
         action='version',
@@ -944,20 +3928,68 @@ VERSIONI TESTATE:
     
     vprint(f"[VERBOSE] DPI validato: {args.dpi}")
     
-    if args.threads <= 0 or args.threads > 32:
-        print("[ERRORE] Il numero di thread deve essere tra 1 e 32.")
+    autotune = args.threads.lower() == 'auto'
+    if autotune:
+        args.threads = min(32, available_cpus())
+    else:
+        try:
+            args.threads = int(args.threads)
+        except ValueError:
+            args.threads = 0
+        if args.threads <= 0 or args.threads > 32:
+            print("[ERRORE] Il numero di thread deve essere tra 1 e 32, oppure auto.")
+            sys.exit(1)
+    
+    vprint(f"[VERBOSE] Threads validati: {args.threads}{' (auto)' if autotune else ''}")
+    
+    max_memory = None
+    if args.max_memory is not None:
+        try:
+            max_memory = parse_size(args.max_memory)
+        except ValueError as e:
+            print(f"[ERRORE] Valore non valido per --max-memory: {e}")
+            sys.exit(1)
+        vprint(f"[VERBOSE] Budget di memoria: {max_memory} byte")
+    
+    if args.override and args.incremental:
+        print("[ERRORE] --override e --incremental non possono essere usati insieme.")
         sys.exit(1)
     
-    vprint(f"[VERBOSE] Threads validati: {args.threads}")
+    if args.stream and args.global_queue:
+        print("[ERRORE] --stream e --global-queue non possono essere usati insieme.")
+        sys.exit(1)
     
     # Normalizza il formato immagine
     image_format = args.format.lower()
-    if image_format not in ['jpg', 'jpeg', 'png']:
-        print("[ERRORE] Formato non valido. Usa: jpg, jpeg, o png")
+    if image_format not in ['jpg', 'jpeg', 'png', 'webp']:
+        print("[ERRORE] Formato non valido. Usa: jpg, jpeg, png o webp")
         sys.exit(1)
     
     vprint(f"[VERBOSE] Formato immagine validato: {image_format}")
     
+    if args.quality is not None and not 1 <= args.quality <= 100:
+        print("[ERRORE] --quality deve essere tra 1 e 100.")
+        sys.exit(1)
+    if args.compress_level is not None and not 0 <= args.compress_level <= 9:
+        print("[ERRORE] --compress-level deve essere tra 0 e 9.")
+        sys.exit(1)
+    ENCODE_OPTIONS = EncodeOptions(args.quality, args.optimize, args.compress_level,
+                                   args.grayscale)
+    vprint(f"[VERBOSE] Parametri encoder: {ENCODE_OPTIONS.as_dict() or 'default'}")
+    
+    profiles = None
+    if args.profile:
+        try:
+            profiles = [parse_profile(spec) for spec in args.profile]
+        except ValueError as e:
+            print(f"[ERRORE] Valore non valido per --profile: {e}")
+            sys.exit(1)
+        names = [profile.name for profile in profiles]
+        if len(set(names)) != len(names):
+            print("[ERRORE] I nomi dei profili di --profile devono essere diversi tra loro.")
+            sys.exit(1)
+        vprint(f"[VERBOSE] Profili di output: {profiles}")
+    
     # Parsing del flag --pages (se specificato)
     pages_to_convert = None
     if args.pages is not None:
@@ -981,6 +4013,9 @@ VERSIONI TESTATE:
     elif args.no_annotations and PYMUPDF_AVAILABLE:
         vprint("[VERBOSE] --no-annotations richiesto e PyMuPDF disponibile")
     
+    if not args.no_info_cache:
+        PDF_INFO_CACHE = PdfInfoCache(default_pdf_info_cache_path())
+    
     try:
         # Verifica che poppler sia installato
         print("[VERIFICA] Controllo installazione di Poppler...")
@@ -1018,6 +4053,13 @@ VERSIONI TESTATE:
             output_dir = base_output
             print(f"[OUTPUT BASE] {output_dir}")
             print(f"[MODALITÀ OUTPUT] Override (cartella per nome PDF, senza timestamp)")
+        elif args.incremental:
+            # Modalità incrementale: come --override ma le cartelle esistenti vengono riutilizzate
+            vprint("[VERBOSE] Modalità --incremental attiva: nessuna sottocartella timestamp")
+            base_output.mkdir(parents=True, exist_ok=True)
+            output_dir = base_output
+            print(f"[OUTPUT BASE] {output_dir}")
+            print(f"[MODALITÀ OUTPUT] Incrementale (salta le pagine già convertite)")
         else:
             # Comportamento standard: sottocartella con timestamp
             vprint("[VERBOSE] Creazione directory di output con timestamp...")
@@ -1036,7 +4078,20 @@ VERSIONI TESTATE:
 
             print(f"[OUTPUT BASE] {output_dir}")
             print(f"[TIMESTAMP] {timestamp} ({current_time.strftime('%d/%m/%Y %H:%M:%S')})")
-        print(f"[FORMATO IMMAGINI] {image_format.upper()}")
+        if profiles:
+            print(f"[PROFILI] {', '.join(repr(profile) for profile in profiles)} "
+                  f"(rendering unico a {max(p.dpi for p in profiles)} DPI)")
+        else:
+            print(f"[FORMATO IMMAGINI] {image_format.upper()}")
+        if args.timings:
+            timings_file = None
+            if args.timings == 'jsonl':
+                if args.timings_file:
+                    timings_file = Path(args.timings_file)
+                else:
+                    timings_file = output_dir / 'timings.jsonl'
+                print(f"[TEMPI] Eventi per fase in {timings_file}")
+            STAGE_TIMINGS = StageTimings(args.timings, timings_file)
         if args.no_annotations:
             if PYMUPDF_AVAILABLE:
                 print(f"[MODALITÀ] Senza annotazioni (PyMuPDF)")
@@ -1054,92 +4109,107 @@ VERSIONI TESTATE:
         
         # Raccogli tutti i file PDF da tutti i pattern forniti
         vprint("[VERBOSE] Inizio raccolta file PDF dai pattern...")
-        all_pdf_files = []
-        
-        # Se c'è un solo pattern, usa la funzione esistente
         if len(args.pattern) == 1:
             print(f"[RICERCA] Pattern: {args.pattern[0]}")
-            if args.regex:
-                print("[MODALITÀ] Regex abilitata")
-            
-            vprint(f"[VERBOSE] Pattern singolo rilevato: {args.pattern[0]}")
-            pdf_files = find_pdf_files(args.pattern[0], use_regex=args.regex)
-            all_pdf_files.extend(pdf_files)
-            vprint(f"[VERBOSE] Trovati {len(pdf_files)} file dal pattern")
         else:
             # Multipli argomenti: potrebbero essere file espansi dalla shell o pattern multipli
             print(f"[RICERCA] {len(args.pattern)} pattern/file specificati")
             vprint(f"[VERBOSE] Pattern multipli rilevati: {args.pattern}")
-            
-            for idx, pattern in enumerate(args.pattern, 1):
-                vprint(f"[VERBOSE] Processing pattern {idx}/{len(args.pattern)}: {pattern}")
-                # Controlla se è un file PDF esistente (espanso dalla shell)
-                p = Path(pattern)
-                if p.exists() and p.is_file() and p.suffix.lower() == '.pdf':
-                    all_pdf_files.append(p)
-                    vprint(f"[VERBOSE] Pattern è un file esistente: {p}")
-                else:
-                    # Altrimenti tratta come pattern
-                    vprint(f"[VERBOSE] Pattern non è un file, cerco match...")
-                    pdf_files = find_pdf_files(pattern, use_regex=args.regex)
-                    all_pdf_files.extend(pdf_files)
-                    vprint(f"[VERBOSE] Trovati {len(pdf_files)} file dal pattern")
-        
-        # Rimuovi duplicati mantenendo l'ordine
-        vprint("[VERBOSE] Rimozione duplicati...")
-        seen = set()
-        pdf_files = []
-        for pdf in all_pdf_files:
-            if pdf not in seen:
-                seen.add(pdf)
-                pdf_files.append(pdf)
-            else:
-                vprint(f"[VERBOSE] Duplicato rimosso: {pdf}")
+        if args.regex:
+            print("[MODALITÀ] Regex abilitata")
+        if args.recursive:
+            print("[MODALITÀ] Ricerca ricorsiva nelle sottocartelle")
+        if args.include:
+            print(f"[FILTRO] Includi: {', '.join(args.include)}")
+        if args.exclude:
+            print(f"[FILTRO] Escludi: {', '.join(args.exclude)}")
         
-        vprint(f"[VERBOSE] File PDF unici dopo deduplicazione: {len(pdf_files)}")
+        pdf_files = collect_pdf_files(args.pattern, use_regex=args.regex,
+                                      recursive=args.recursive, include=args.include,
+                                      exclude=args.exclude, stream=args.stream)
         
-        if not pdf_files:
+        def exit_no_files():
             print(f"[ERRORE] Nessun file PDF trovato")
             vprint(f"[VERBOSE] Terminazione programma: nessun file da processare")
-            # Elimina la cartella timestamp appena creata se è vuota (non in modalità --override)
-            if not args.override and output_dir.exists() and not any(output_dir.iterdir()):
+            # Elimina la cartella timestamp appena creata se è vuota
+            # (non in modalità --override/--incremental)
+            if (not args.override and not args.incremental
+                    and output_dir.exists() and not any(output_dir.iterdir())):
                 vprint(f"[VERBOSE] Eliminazione cartella vuota: {output_dir}")
                 output_dir.rmdir()
                 print(f"[PULIZIA] Cartella vuota eliminata: {output_dir}")
             sys.exit(1)
         
-        print(f"[TROVATI] {len(pdf_files)} file PDF:")
-        for pdf in pdf_files:
-            print(f"  - {pdf}")
-        print()
+        if args.stream:
+            # I file vengono convertiti man mano che la ricerca li trova
+            vprint("[VERBOSE] Modalità --stream: conversione durante la ricerca")
+            print("[MODALITÀ] Conversione durante la ricerca (--stream)")
+            print()
+            total_label = '?'
+        else:
+            pdf_files = list(pdf_files)
+            vprint(f"[VERBOSE] File PDF unici dopo deduplicazione: {len(pdf_files)}")
+            
+            if not pdf_files:
+                exit_no_files()
+            
+            print(f"[TROVATI] {len(pdf_files)} file PDF:")
+            for pdf in pdf_files:
+                print(f"  - {pdf}")
+            print()
+            total_label = len(pdf_files)
         
         # Converti tutti i file
-        vprint(f"[VERBOSE] Inizio conversione di {len(pdf_files)} file...")
+        vprint(f"[VERBOSE] Inizio conversione di {total_label} file...")
         successful = 0
         failed = 0
         skipped = 0
         
-        for i, pdf_file in enumerate(pdf_files, start=1):
-            if interrupted:
-                skipped = len(pdf_files) - i + 1
-                print(f"\n[INTERRUZIONE] Saltati {skipped} file rimanenti")
-                vprint(f"[VERBOSE] Interruzione rilevata, {skipped} file non processati")
-                break
-            
-            print(f"{'='*70}")
-            print(f"File {i}/{len(pdf_files)}")
-            print(f"{'='*70}")
-            vprint(f"[VERBOSE] === Inizio conversione file {i}/{len(pdf_files)}: {pdf_file.name} ===")
+        if args.global_queue and len(pdf_files) > 1:
+            vprint("[VERBOSE] Modalità --global-queue: coda di lavoro unica per tutti i file")
+            successful, failed, skipped = convert_pdf_batch(
+                pdf_files, output_dir, args.dpi, args.threads, image_format,
+                args.no_annotations, pages_to_convert=pages_to_convert,
+                override=args.override, incremental=args.incremental,
+                max_memory=max_memory, profiles=profiles, autotune=autotune
+            )
+            total = len(pdf_files)
+        else:
+            total = 0
+            for i, pdf_file in enumerate(pdf_files, start=1):
+                total = i
+                if interrupted:
+                    if args.stream:
+                        # I file non ancora trovati non sono conteggiati
+                        skipped = 1
+                        print(f"\n[INTERRUZIONE] Ricerca interrotta, file rimanenti saltati")
+                    else:
+                        skipped = len(pdf_files) - i + 1
+                        print(f"\n[INTERRUZIONE] Saltati {skipped} file rimanenti")
+                    vprint(f"[VERBOSE] Interruzione rilevata, {skipped} file non processati")
+                    break
+                
+                print(f"{'='*70}")
+                print(f"File {i}/{total_label}")
+                print(f"{'='*70}")
+                vprint(f"[VERBOSE] === Inizio conversione file {i}/{total_label}: {pdf_file.name} ===")
+                
+                if convert_pdf_to_images(pdf_file, output_dir, args.dpi, args.threads, 
+                                        image_format, args.no_annotations,
+                                        pages_to_convert=pages_to_convert,
+                                        override=args.override,
+                                        incremental=args.incremental,
+                                        max_memory=max_memory,
+                                        profiles=profiles,
+                                        autotune=autotune):
+                    successful += 1
+                    vprint(f"[VERBOSE] File {i} completato con SUCCESSO")
+                else:
+                    failed += 1
+                    vprint(f"[VERBOSE] File {i} FALLITO")
             
-            if convert_pdf_to_images(pdf_file, output_dir, args.dpi, args.threads, 
-                                    image_format, args.no_annotations,
-                                    pages_to_convert=pages_to_convert,
-                                    override=args.override):
-                successful += 1
-                vprint(f"[VERBOSE] File {i} completato con SUCCESSO")
-            else:
-                failed += 1
-                vprint(f"[VERBOSE] File {i} FALLITO")
+            if total == 0:
+                exit_no_files()
         
         # Riepilogo finale
         print(f"{'='*70}")
@@ -1150,14 +4220,14 @@ VERSIONI TESTATE:
             print(f"[FALLITE] {failed}")
         if skipped > 0:
             print(f"[SALTATE] {skipped}")
-        print(f"[TOTALE] {len(pdf_files)}")
+        print(f"[TOTALE] {total}")
         print(f"{'='*70}\n")
         
         vprint(f"[VERBOSE] === RIEPILOGO FINALE ===")
         vprint(f"[VERBOSE] Riuscite: {successful}")
         vprint(f"[VERBOSE] Fallite: {failed}")
         vprint(f"[VERBOSE] Saltate: {skipped}")
-        vprint(f"[VERBOSE] Totale: {len(pdf_files)}")
+        vprint(f"[VERBOSE] Totale: {total}")
         
         if interrupted:
             print("[INFO] Programma terminato dall'utente")
@@ -1173,6 +4243,10 @@ VERSIONI TESTATE:
         vprint("[VERBOSE] KeyboardInterrupt catturato nel main")
         vprint("[VERBOSE] Exit code: 130")
         sys.exit(130)
+    
+    finally:
+        if PDF_INFO_CACHE is not None:
+            PDF_INFO_CACHE.save()
 
 
 if __name__ == '__main__':
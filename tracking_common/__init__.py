@@ -0,0 +1 @@
+# Moduli condivisi dagli script di tracciamento (hand_tracking, body_tracking).
@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+Benchmark headless delle pipeline di tracciamento (mani e posa), senza webcam né finestre.
+
+Esegue lo stesso ciclo degli script interattivi (lettura -> pre-elaborazione -> modello ->
+disegno -> codifica JPEG) su un video registrato o su frame sintetici, senza `cv2.imshow`,
+e riporta FPS, latenza per fase (media, percentili e istogramma) e uso della CPU.
+Con --json i risultati vengono salvati, con --compare confrontati con un'esecuzione
+precedente: così ogni modifica ai cicli si misura prima di arrivare su un chiosco.
+
+Esempi (dalla radice del repository):
+    python -m tracking_common.benchmark --pipeline hands --source sessione.mp4
+    python -m tracking_common.benchmark --pipeline pose --source synthetic:1920x1080 --frames 300
+    python -m tracking_common.benchmark --pipeline none --source synthetic --json base.json
+    python -m tracking_common.benchmark --source sessione.mp4 --compare base.json
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+try:
+    import resource  # Solo Unix: serve per la memoria massima usata dal processo.
+except ImportError:
+    resource = None
+
+# Eseguito come script (`python tracking_common/benchmark.py`): rende importabile il pacchetto.
+if __package__ in (None, ''):
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from tracking_common.capture import FramePreprocessor
+from tracking_common.replay import open_source
+
+
+# Le fasi misurate per ogni frame, nell'ordine in cui vengono eseguite.
+STAGES = ('read', 'preprocess', 'inference', 'draw', 'encode')
+
+# Limiti superiori (in ms) delle classi degli istogrammi; l'ultima classe è "oltre".
+# 33 ms e 66 ms corrispondono a un frame a 30 e a 15 FPS.
+HISTOGRAM_EDGES_MS = (1, 2, 4, 8, 16, 33, 66, 133)
+
+# Larghezza massima (in caratteri) delle barre degli istogrammi.
+HISTOGRAM_WIDTH = 30
+
+PIPELINES = ('hands', 'pose', 'none')
+
+
+# --- 1. LE PIPELINE ---
+
+def build_pipeline(name):
+    """
+    Crea il modello e le funzioni di una pipeline.
+
+    Returns:
+        Tupla (modello, infer, draw): `modello` è un context manager (da usare con `with`),
+        `infer(model, frame_rgb)` restituisce i risultati di MediaPipe e
+        `draw(frame_bgr, results)` disegna lo scheletro come negli script interattivi.
+        Con 'none' non c'è nessun modello: si misurano solo lettura, pre-elaborazione e codifica.
+    """
+    if name == 'none':
+        return None, (lambda model, frame: None), (lambda frame, results: None)
+
+    # MediaPipe viene importato solo qui: la pipeline 'none' funziona anche senza.
+    import mediapipe as mp
+    mp_drawing = mp.solutions.drawing_utils
+
+    if name == 'hands':
+        mp_hands = mp.solutions.hands
+        # Stesse soglie di hand_tracking/demo/hand_tracking.py e della web app.
+        model = mp_hands.Hands(min_detection_confidence=0.7, min_tracking_confidence=0.5)
+
+        def draw(frame, results):
+            for hand_landmarks in results.multi_hand_landmarks or ():
+                mp_drawing.draw_landmarks(frame, hand_landmarks, mp_hands.HAND_CONNECTIONS)
+        return model, (lambda model, frame: model.process(frame)), draw
+
+    if name == 'pose':
+        mp_pose = mp.solutions.pose
+        # Stesse soglie di body_tracking/body_tracking.py.
+        model = mp_pose.Pose(min_detection_confidence=0.5, min_tracking_confidence=0.5)
+
+        def draw(frame, results):
+            if results.pose_landmarks:
+                mp_drawing.draw_landmarks(frame, results.pose_landmarks, mp_pose.POSE_CONNECTIONS)
+        return model, (lambda model, frame: model.process(frame)), draw
+
+    raise ValueError(f"Pipeline sconosciuta: '{name}' (disponibili: {', '.join(PIPELINES)})")
+
+
+# --- 2. IL CICLO MISURATO ---
+
+def run_benchmark(source, pipeline='hands', frames=None, warmup=10, mirror=True, encode=True,
+                  jpeg_quality=None):
+    """
+    Esegue la pipeline su tutti i frame della sorgente e ne misura ogni fase.
+
+    Args:
+        source: Sorgente con l'interfaccia di `Camera` (vedi replay.open_source)
+        pipeline: 'hands', 'pose' o 'none'
+        frames: Numero massimo di frame misurati (None = fino alla fine della sorgente)
+        warmup: Frame iniziali esclusi dalle statistiche (caricamento del modello, cache)
+        mirror: Specchia i frame come negli script interattivi
+        encode: Misura anche la codifica JPEG (come fa la web app per lo streaming)
+        jpeg_quality: Qualità JPEG (None = predefinita di OpenCV)
+
+    Returns:
+        Dizionario con i risultati (vedi `summarize`)
+    """
+    model, infer, draw = build_pipeline(pipeline)
+    preprocess = FramePreprocessor(mirror=mirror)
+    encode_params = [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality] if jpeg_quality else []
+
+    samples = {stage: [] for stage in STAGES}
+    raw = None
+    count = 0
+    wall_start = cpu_start = None
+
+    total = None if frames is None else warmup + frames
+    with model if model is not None else contextlib.nullcontext():
+        while total is None or count < total:
+            measured = count >= warmup
+            if measured and wall_start is None:
+                # Il cronometro parte dopo il riscaldamento, per tempo reale e tempo CPU.
+                wall_start, cpu_start = time.perf_counter(), time.process_time()
+
+            t0 = time.perf_counter()
+            raw = source.read(out=raw)
+            if raw is None:
+                break
+            t1 = time.perf_counter()
+            frame_bgr, frame_rgb = preprocess(raw)
+            t2 = time.perf_counter()
+            results = infer(model, frame_rgb)
+            t3 = time.perf_counter()
+            draw(frame_bgr, results)
+            t4 = time.perf_counter()
+            if encode:
+                cv2.imencode('.jpg', frame_bgr, encode_params)
+            t5 = time.perf_counter()
+
+            if measured:
+                for stage, start, end in zip(STAGES, (t0, t1, t2, t3, t4), (t1, t2, t3, t4, t5)):
+                    samples[stage].append(end - start)
+            count += 1
+
+    # Le fasi non eseguite non compaiono nel report.
+    if model is None:
+        samples.pop('inference')
+        samples.pop('draw')
+    if not encode:
+        samples.pop('encode')
+    # Anche con `wall_start` impostato la sorgente può finire prima del primo frame misurato.
+    if not samples['read']:
+        raise RuntimeError(f"La sorgente ha prodotto solo {count} frame, tutti di riscaldamento "
+                           f"(--warmup {warmup})")
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    return summarize(samples, wall, cpu, pipeline=pipeline, source=source.describe(), warmup=warmup)
+
+
+# --- 3. STATISTICHE ---
+
+def stage_stats(seconds):
+    """Media, percentili e istogramma (in ms) di una lista di durate in secondi."""
+    ms = np.asarray(seconds, dtype=np.float64) * 1000
+    counts = np.bincount(np.searchsorted(HISTOGRAM_EDGES_MS, ms, side='right'),
+                         minlength=len(HISTOGRAM_EDGES_MS) + 1)
+    p50, p90, p99 = np.percentile(ms, (50, 90, 99))
+    return {
+        'mean_ms': float(ms.mean()),
+        'p50_ms': float(p50),
+        'p90_ms': float(p90),
+        'p99_ms': float(p99),
+        'max_ms': float(ms.max()),
+        'histogram': counts.tolist(),
+    }
+
+
+def peak_memory_mb():
+    """Memoria massima (RSS) usata dal processo, in MB; None dove non è disponibile."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux la riporta in kB, macOS in byte.
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def summarize(samples, wall, cpu, **info):
+    frames = len(samples['read'])
+    return {
+        **info,
+        'frames': frames,
+        'seconds': wall,
+        'fps': frames / wall if wall > 0 else 0.0,
+        # Tempo CPU / tempo reale: oltre 1.0 significa che il processo usa più core.
+        'cpu_cores': cpu / wall if wall > 0 else 0.0,
+        'cpu_count': os.cpu_count(),
+        'peak_memory_mb': peak_memory_mb(),
+        'histogram_edges_ms': list(HISTOGRAM_EDGES_MS),
+        'stages': {stage: stage_stats(values) for stage, values in samples.items()},
+    }
+
+
+# --- 4. REPORT ---
+
+def histogram_labels():
+    labels = [f"<{HISTOGRAM_EDGES_MS[0]} ms"]
+    labels += [f"{a}-{b} ms" for a, b in zip(HISTOGRAM_EDGES_MS, HISTOGRAM_EDGES_MS[1:])]
+    labels.append(f">{HISTOGRAM_EDGES_MS[-1]} ms")
+    return labels
+
+
+def print_report(result, histograms=True):
+    print(f"[BENCHMARK] Pipeline '{result['pipeline']}' su {result['source']}")
+    print(f"[BENCHMARK] {result['frames']} frame in {result['seconds']:.2f} s -> "
+          f"{result['fps']:.1f} FPS (esclusi {result['warmup']} frame di riscaldamento)")
+    memory = f", memoria massima {result['peak_memory_mb']:.0f} MB" if result['peak_memory_mb'] else ""
+    print(f"[CPU] {result['cpu_cores'] * 100:.0f}% ({result['cpu_cores']:.2f} core su "
+          f"{result['cpu_count']}){memory}")
+
+    print(f"\n{'fase':<12}{'media':>9}{'p50':>9}{'p90':>9}{'p99':>9}{'max':>9}  (ms)")
+    for stage, stats in result['stages'].items():
+        print(f"{stage:<12}{stats['mean_ms']:>9.2f}{stats['p50_ms']:>9.2f}{stats['p90_ms']:>9.2f}"
+              f"{stats['p99_ms']:>9.2f}{stats['max_ms']:>9.2f}")
+
+    if not histograms:
+        return
+    labels = histogram_labels()
+    for stage, stats in result['stages'].items():
+        counts = stats['histogram']
+        top = max(counts) or 1
+        print(f"\n[ISTOGRAMMA] {stage}")
+        for label, n in zip(labels, counts):
+            if n:
+                bar = '#' * max(1, round(n / top * HISTOGRAM_WIDTH))
+                print(f"  {label:>12} {n:>6}  {bar}")
+
+
+def print_comparison(result, baseline):
+    """Confronta FPS e latenze con un'esecuzione precedente salvata con --json."""
+    def delta(new, old):
+        return f"{(new - old) / old * 100:+.1f}%" if old else "n/d"
+
+    print(f"\n[CONFRONTO] con '{baseline['pipeline']}' su {baseline['source']}")
+    print(f"  FPS        {baseline['fps']:>9.1f} -> {result['fps']:>9.1f}  {delta(result['fps'], baseline['fps'])}")
+    print(f"  CPU (core) {baseline['cpu_cores']:>9.2f} -> {result['cpu_cores']:>9.2f}  "
+          f"{delta(result['cpu_cores'], baseline['cpu_cores'])}")
+    for stage, stats in result['stages'].items():
+        old = baseline['stages'].get(stage)
+        if old:
+            print(f"  {stage:<10} {old['p50_ms']:>9.2f} -> {stats['p50_ms']:>9.2f}  "
+                  f"{delta(stats['p50_ms'], old['p50_ms'])}  (p50, ms)")
+
+
+# --- 5. RIGA DI COMANDO ---
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark headless delle pipeline di tracciamento (mani/posa).",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__.split('Esempi', 1)[1].join(('Esempi', '')),
+    )
+    parser.add_argument('--pipeline', choices=PIPELINES, default='hands',
+                        help="Modello da misurare ('none' = solo lettura, pre-elaborazione e codifica)")
+    parser.add_argument('--source', default='synthetic',
+                        help="File video, indice della webcam o 'synthetic[:LARGHEZZAxALTEZZA]' "
+                             "(predefinito: synthetic, 640x480)")
+    parser.add_argument('--frames', type=int, default=300,
+                        help="Frame da misurare, 0 = fino alla fine del video (predefinito: 300)")
+    parser.add_argument('--warmup', type=int, default=10,
+                        help="Frame iniziali esclusi dalle statistiche (predefinito: 10)")
+    parser.add_argument('--fps', type=float, default=None,
+                        help="Legge la sorgente a frequenza fissa invece che alla massima velocità")
+    parser.add_argument('--loop', action='store_true',
+                        help="Riparte dall'inizio del video finché non sono stati misurati --frames frame")
+    parser.add_argument('--no-mirror', action='store_true', help="Non specchia i frame")
+    parser.add_argument('--no-encode', action='store_true', help="Non misura la codifica JPEG")
+    parser.add_argument('--jpeg-quality', type=int, default=None, help="Qualità JPEG (1-100)")
+    parser.add_argument('--no-histograms', action='store_true', help="Non stampa gli istogrammi")
+    parser.add_argument('--json', type=Path, help="Salva i risultati in un file JSON")
+    parser.add_argument('--compare', type=Path, help="Confronta con un file JSON salvato in precedenza")
+    args = parser.parse_args()
+
+    frames = args.frames or None
+    max_frames = args.warmup + frames if frames else None
+    source = open_source(args.source, replay_fps=args.fps, loop=args.loop, max_frames=max_frames)
+    if not source.isOpened():
+        print(f"[ERRORE] Impossibile aprire la sorgente: {args.source}")
+        return 1
+    try:
+        result = run_benchmark(source, args.pipeline, frames=frames, warmup=args.warmup,
+                               mirror=not args.no_mirror, encode=not args.no_encode,
+                               jpeg_quality=args.jpeg_quality)
+    except RuntimeError as e:
+        print(f"[ERRORE] {e}")
+        return 1
+    finally:
+        source.release()
+
+    print_report(result, histograms=not args.no_histograms)
+    if args.compare:
+        print_comparison(result, json.loads(args.compare.read_text(encoding='utf-8')))
+    if args.json:
+        args.json.write_text(json.dumps(result, indent=2), encoding='utf-8')
+        print(f"\n[SALVATAGGIO] Risultati scritti in {args.json}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,127 @@
+# --- CATTURA VIDEO CONDIVISA DAGLI SCRIPT DI TRACCIAMENTO ---
+#
+# Tutti gli script di tracciamento facevano, per ogni frame:
+#   cv2.flip -> cvtColor(BGR2RGB) -> modello -> cvtColor(RGB2BGR) -> disegno
+# cioè tre nuove copie del frame intero, alla risoluzione che `cv2.VideoCapture(0)`
+# negozia da solo con la webcam. Questo modulo:
+#
+# 1. imposta esplicitamente risoluzione, FPS e formato dei pixel (FOURCC) della webcam;
+# 2. specchia e converte il frame in buffer allocati una volta sola (niente nuove copie);
+# 3. produce insieme la versione BGR (per disegnare e mostrare/codificare il frame) e
+#    quella RGB (per MediaPipe), così il ritorno da RGB a BGR non serve più.
+
+import cv2
+import numpy as np
+
+
+# Impostazioni predefinite della webcam. MJPG permette 30 FPS anche in alta risoluzione
+# sulle webcam USB 2.0; YUYV (non compresso) evita la decodifica JPEG ma a 1080p
+# spesso scende a 5-10 FPS.
+DEFAULT_WIDTH = 640
+DEFAULT_HEIGHT = 480
+DEFAULT_FPS = 30
+DEFAULT_FOURCC = 'MJPG'
+
+
+def fourcc_to_str(code):
+    """Converte il codice numerico FOURCC letto da OpenCV in una stringa (es. 'MJPG')."""
+    code = int(code)
+    return ''.join(chr((code >> (8 * i)) & 0xFF) for i in range(4)).strip('\x00')
+
+
+class Camera:
+    """
+    Una sorgente video OpenCV con risoluzione, FPS e FOURCC impostati esplicitamente.
+
+    Args:
+        source: Indice della webcam (0, 1, ...) o percorso/URL di un video
+        width, height: Risoluzione richiesta (None = quella predefinita del driver)
+        fps: Frame al secondo richiesti (None = predefinito)
+        fourcc: Formato dei pixel, es. 'MJPG' o 'YUYV' (None = predefinito)
+        buffer_size: Frame tenuti in coda dal driver; 1 riduce il ritardo
+
+    Il driver può non accettare i valori richiesti: `describe()` riporta quelli effettivi.
+    """
+
+    def __init__(self, source=0, width=DEFAULT_WIDTH, height=DEFAULT_HEIGHT, fps=DEFAULT_FPS,
+                 fourcc=DEFAULT_FOURCC, buffer_size=1):
+        self.source = source
+        self.capture = cv2.VideoCapture(source)
+        # Il FOURCC va impostato PRIMA della risoluzione: molti driver scelgono le
+        # risoluzioni disponibili in base al formato dei pixel.
+        if fourcc:
+            self.capture.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*fourcc))
+        if width:
+            self.capture.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        if height:
+            self.capture.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        if fps:
+            self.capture.set(cv2.CAP_PROP_FPS, fps)
+        if buffer_size:
+            # Non tutti i backend supportano questa proprietà; in quel caso viene ignorata.
+            self.capture.set(cv2.CAP_PROP_BUFFERSIZE, buffer_size)
+
+    def describe(self):
+        """Le impostazioni effettivamente negoziate con la webcam, in una riga."""
+        width = int(self.capture.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(self.capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        fps = self.capture.get(cv2.CAP_PROP_FPS)
+        fourcc = fourcc_to_str(self.capture.get(cv2.CAP_PROP_FOURCC)) or '?'
+        return f"Sorgente {self.source}: {width}x{height} @ {fps:.0f} FPS, {fourcc}"
+
+    def isOpened(self):
+        return self.capture.isOpened()
+
+    def read(self, out=None):
+        """
+        Legge un frame BGR.
+
+        Args:
+            out: Array in cui scrivere il frame, per non allocarne uno nuovo (deve avere
+                 la forma giusta, altrimenti OpenCV ne alloca uno nuovo)
+
+        Returns:
+            Il frame, o None se la lettura fallisce
+        """
+        success, frame = self.capture.read(out)
+        return frame if success else None
+
+    def release(self):
+        self.capture.release()
+
+
+class FramePreprocessor:
+    """
+    Specchia un frame BGR e lo converte in RGB usando buffer preallocati.
+
+    Restituisce due array riutilizzati a ogni chiamata:
+    - `bgr`: il frame specchiato in BGR, su cui disegnare e da mostrare/codificare;
+    - `rgb`: lo stesso frame in RGB per MediaPipe, marcato in sola lettura (così
+      MediaPipe può usarlo senza farne una copia interna).
+
+    ATTENZIONE: gli array vengono sovrascritti dal frame successivo; chi deve
+    conservarli più a lungo di un frame ne deve fare una copia.
+    """
+
+    def __init__(self, mirror=True):
+        self.mirror = mirror
+        self.bgr = None
+        self.rgb = None
+
+    def __call__(self, frame):
+        if self.rgb is None or self.rgb.shape != frame.shape:
+            # Prima chiamata (o cambio di risoluzione): alloca i buffer una volta sola.
+            self.bgr = np.empty_like(frame)
+            self.rgb = np.empty_like(frame)
+
+        if self.mirror:
+            # `dst=` scrive il risultato nel buffer esistente invece di crearne uno nuovo.
+            cv2.flip(frame, 1, dst=self.bgr)
+            bgr = self.bgr
+        else:
+            bgr = frame
+
+        self.rgb.flags.writeable = True
+        cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB, dst=self.rgb)
+        self.rgb.flags.writeable = False
+        return bgr, self.rgb
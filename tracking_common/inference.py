@@ -0,0 +1,373 @@
+# --- POOL DI PROCESSI PER L'INFERENZA DI MEDIAPIPE SU PIÙ FLUSSI VIDEO ---
+#
+# Ogni script esegue `hands.process()` / `pose.process()` nel proprio ciclo dei frame:
+# un flusso video usa al massimo un core, e più telecamere nello stesso processo si
+# contendono il GIL. Questo modulo offre un servizio di inferenza:
+#
+# - un pool di processi, ciascuno con i suoi modelli MediaPipe già caricati e "scaldati";
+# - i frame passano ai processi attraverso un anello di buffer in memoria condivisa
+#   (nessuna serializzazione dell'immagine, solo il numero del buffer nella coda);
+# - i risultati tornano come Future (con callback facoltativa) sotto forma di array NumPy;
+# - ogni flusso è assegnato sempre allo stesso processo, che tiene un modello per flusso:
+#   il tracciamento di MediaPipe dipende dai frame precedenti dello stesso video;
+# - i frame in coda per un processo vengono elaborati a lotti, con un solo messaggio
+#   di risposta per lotto;
+# - la profondità della coda è misurata, e quando i buffer sono tutti occupati (o un
+#   flusso ha già troppi frame in attesa) `submit` attende o rifiuta il frame:
+#   è la "contropressione" che evita code infinite quando il pool è saturo.
+
+import itertools
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+
+import numpy as np
+
+
+# Modelli disponibili: numero di landmark e colonne per landmark dei risultati.
+# Le mani restituiscono (x, y, z) come gestures.landmarks_to_array; la posa aggiunge la
+# visibilità di ogni punto, (x, y, z, visibility).
+MODELS = {
+    'hands': (21, 3),
+    'pose': (33, 4),
+}
+
+# Opzioni predefinite dei modelli: le stesse soglie degli script interattivi.
+DEFAULT_OPTIONS = {
+    'hands': {'min_detection_confidence': 0.7, 'min_tracking_confidence': 0.5},
+    'pose': {'min_detection_confidence': 0.5, 'min_tracking_confidence': 0.5},
+}
+
+# Ogni quanto (secondi) il thread dei risultati controlla che i processi siano vivi.
+WORKER_CHECK_INTERVAL = 1.0
+
+
+# --- 1. IL PROCESSO DI INFERENZA ---
+
+def create_model(model, options):
+    """Crea un'istanza del modello MediaPipe (importato qui: serve solo nei processi)."""
+    import mediapipe as mp
+    if model == 'hands':
+        return mp.solutions.hands.Hands(**options)
+    return mp.solutions.pose.Pose(**options)
+
+
+def results_to_array(model, results):
+    """
+    Converte i risultati di MediaPipe in un array float32.
+
+    Returns:
+        Mani: (mani, 21, 3). Posa: (0 o 1, 33, 4). Senza rilevamenti la prima dimensione è 0.
+    """
+    points, columns = MODELS[model]
+    if model == 'hands':
+        detections = results.multi_hand_landmarks or []
+        rows = [[(p.x, p.y, p.z) for p in hand.landmark] for hand in detections]
+    else:
+        detections = [results.pose_landmarks] if results.pose_landmarks else []
+        rows = [[(p.x, p.y, p.z, p.visibility) for p in pose.landmark] for pose in detections]
+    if not rows:
+        return np.empty((0, points, columns), dtype=np.float32)
+    return np.array(rows, dtype=np.float32)
+
+
+def worker_main(worker_id, model, options, shm_name, slots, slot_bytes, max_batch, tasks, results):
+    """
+    Il ciclo di un processo del pool: prende i lotti di frame dalla sua coda, esegue il
+    modello del flusso di ciascun frame e restituisce i landmark con un solo messaggio.
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    ring = np.ndarray((slots, slot_bytes), dtype=np.uint8, buffer=shm.buf)
+    models = {}
+    # Il primo modello viene creato e "scaldato" subito con un frame nero: caricamento del
+    # grafo e prima inferenza (la più lenta) avvengono prima che arrivi il primo frame vero.
+    spare = [create_model(model, options)]
+    spare[0].process(np.zeros((64, 64, 3), dtype=np.uint8))
+    results.put(('ready', worker_id, None))
+
+    def model_for(stream):
+        if stream not in models:
+            models[stream] = spare.pop() if spare else create_model(model, options)
+        return models[stream]
+
+    running = True
+    try:
+        while running:
+            task = tasks.get()
+            if task is None:
+                break
+            batch = [task]
+            # Il lotto: i frame già in coda, fino a max_batch, senza attendere gli altri.
+            while len(batch) < max_batch:
+                try:
+                    task = tasks.get_nowait()
+                except queue.Empty:
+                    break
+                if task is None:
+                    running = False
+                    break
+                batch.append(task)
+
+            done = []
+            for job_id, stream, slot, height, width in batch:
+                image = ring[slot, :height * width * 3].reshape(height, width, 3)
+                image.flags.writeable = False
+                start = time.perf_counter()
+                try:
+                    landmarks = results_to_array(model, model_for(stream).process(image))
+                    error = None
+                except Exception as e:
+                    landmarks, error = None, f"{type(e).__name__}: {e}"
+                done.append((job_id, landmarks, error, time.perf_counter() - start))
+            results.put(('done', worker_id, done))
+    finally:
+        for instance in list(models.values()) + spare:
+            instance.close()
+        # La vista sulla memoria condivisa va eliminata prima di chiuderla.
+        del ring
+        shm.close()
+
+
+# --- 2. IL POOL ---
+
+class InferencePool:
+    """
+    Un pool di processi che eseguono un modello MediaPipe sui frame di più flussi.
+
+    Args:
+        model: 'hands' o 'pose'
+        workers: Numero di processi (predefinito: i core meno uno, almeno 1)
+        slots: Buffer di memoria condivisa, cioè frame in volo al massimo (predefinito: 2 per processo)
+        max_width, max_height: Dimensione massima dei frame accettati
+        max_inflight_per_stream: Frame di uno stesso flusso in attesa al massimo; oltre,
+            `submit` attende o rifiuta (un video dal vivo preferisce saltare un frame)
+        max_batch: Frame elaborati al massimo da un processo per ogni lotto
+        options: Opzioni del modello (predefinite: DEFAULT_OPTIONS[model])
+        start_timeout: Secondi concessi ai processi per caricare i modelli
+
+    Uso:
+        with InferencePool('hands', workers=4) as pool:
+            future = pool.submit('camera-0', frame_rgb)
+            hands = future.result()   # array (mani, 21, 3)
+    """
+
+    def __init__(self, model='hands', workers=None, slots=None, max_width=1920, max_height=1080,
+                 max_inflight_per_stream=2, max_batch=4, options=None, start_timeout=60.0):
+        if model not in MODELS:
+            raise ValueError(f"Modello sconosciuto: '{model}' (disponibili: {', '.join(MODELS)})")
+        self.model = model
+        self.workers = workers or max(1, (os.cpu_count() or 2) - 1)
+        self.slots = slots or 2 * self.workers
+        self.slot_bytes = max_width * max_height * 3
+        self.max_inflight_per_stream = max_inflight_per_stream
+
+        self.shm = shared_memory.SharedMemory(create=True, size=self.slots * self.slot_bytes)
+        self.ring = np.ndarray((self.slots, self.slot_bytes), dtype=np.uint8, buffer=self.shm.buf)
+
+        # Stato condiviso tra chi chiama `submit` e il thread dei risultati.
+        self.condition = threading.Condition()
+        self.free_slots = list(range(self.slots))
+        self.jobs = {}                       # job_id -> (future, slot, stream, worker, inviato_alle)
+        self.job_ids = itertools.count()
+        self.inflight = Counter()            # Frame in volo per flusso.
+        self.depth = [0] * self.workers      # Frame in coda o in elaborazione per processo.
+        self.stream_workers = {}             # Flusso -> processo assegnato.
+        self.submitted = self.completed = self.rejected = self.failed = 0
+        self.latency = None                  # Media mobile (s) da submit al risultato.
+        self.closed = False
+
+        # Fork dove disponibile: con 'spawn' ogni processo reimporterebbe lo script
+        # principale, che nel caso della web app apre le telecamere.
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context('fork' if 'fork' in methods else 'spawn')
+        self.tasks = [context.Queue() for _ in range(self.workers)]
+        self.results = context.Queue()
+        options = dict(DEFAULT_OPTIONS[model], **(options or {}))
+        self.processes = [
+            context.Process(target=worker_main, name=f'inference-{model}-{i}', daemon=True,
+                            args=(i, model, options, self.shm.name, self.slots, self.slot_bytes,
+                                  max_batch, self.tasks[i], self.results))
+            for i in range(self.workers)
+        ]
+        for process in self.processes:
+            process.start()
+
+        # Attende che tutti i processi abbiano caricato e scaldato il modello.
+        deadline = time.perf_counter() + start_timeout
+        ready = 0
+        while ready < self.workers:
+            try:
+                kind, _, _ = self.results.get(timeout=max(0.1, deadline - time.perf_counter()))
+            except queue.Empty:
+                self.close()
+                raise RuntimeError(f"I processi di inferenza non sono partiti entro {start_timeout:.0f} s")
+            ready += kind == 'ready'
+
+        self.collector = threading.Thread(target=self._collect, name='inference-results', daemon=True)
+        self.collector.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def _worker_for(self, stream):
+        """Il processo di un flusso: sempre lo stesso, scelto tra i meno carichi al primo frame."""
+        if stream not in self.stream_workers:
+            load = Counter(self.stream_workers.values())
+            self.stream_workers[stream] = min(range(self.workers), key=lambda i: load[i])
+        return self.stream_workers[stream]
+
+    def submit(self, stream, frame, block=True, timeout=None, callback=None):
+        """
+        Invia un frame RGB al modello del flusso `stream`.
+
+        Args:
+            stream: Identificativo del flusso (qualsiasi valore hashable, es. l'id della telecamera)
+            frame: Array uint8 (altezza, larghezza, 3), al massimo max_width × max_height
+            block: Se i buffer sono tutti occupati, attende (True) o rinuncia subito (False)
+            timeout: Attesa massima in secondi quando block=True (None = senza limite)
+            callback: Funzione chiamata con il Future quando il risultato è pronto
+
+        Returns:
+            Un Future con l'array dei landmark, oppure None se il frame è stato rifiutato
+            per contropressione (da contare come frame saltato).
+        """
+        if frame.dtype != np.uint8 or frame.ndim != 3 or frame.shape[2] != 3:
+            raise ValueError(f"Atteso un frame uint8 (altezza, larghezza, 3), non {frame.dtype} {frame.shape}")
+        if frame.nbytes > self.slot_bytes:
+            raise ValueError(f"Frame {frame.shape[1]}x{frame.shape[0]} più grande dei buffer del pool")
+        height, width = frame.shape[:2]
+        deadline = None if timeout is None else time.perf_counter() + timeout
+
+        with self.condition:
+            while not self.free_slots or self.inflight[stream] >= self.max_inflight_per_stream:
+                if self.closed:
+                    raise RuntimeError("Il pool di inferenza è chiuso")
+                remaining = None if deadline is None else deadline - time.perf_counter()
+                if not block or (remaining is not None and remaining <= 0):
+                    self.rejected += 1
+                    return None
+                self.condition.wait(remaining)
+            if self.closed:
+                raise RuntimeError("Il pool di inferenza è chiuso")
+            slot = self.free_slots.pop()
+            job_id = next(self.job_ids)
+            worker = self._worker_for(stream)
+            future = Future()
+            self.jobs[job_id] = (future, slot, stream, worker, time.perf_counter())
+            self.inflight[stream] += 1
+            self.depth[worker] += 1
+            self.submitted += 1
+
+        # Il buffer è riservato a questo frame: la copia può avvenire fuori dal lock.
+        np.copyto(self.ring[slot, :frame.nbytes].reshape(height, width, 3), frame)
+        if callback is not None:
+            future.add_done_callback(callback)
+        self.tasks[worker].put((job_id, stream, slot, height, width))
+        return future
+
+    def _finish(self, job_id, landmarks=None, error=None):
+        """Libera il buffer di un frame e completa il suo Future."""
+        with self.condition:
+            job = self.jobs.pop(job_id, None)
+            if job is None:
+                return
+            future, slot, stream, worker, submitted_at = job
+            self.free_slots.append(slot)
+            self.inflight[stream] -= 1
+            self.depth[worker] -= 1
+            if error is None:
+                self.completed += 1
+                elapsed = time.perf_counter() - submitted_at
+                self.latency = elapsed if self.latency is None else self.latency + 0.1 * (elapsed - self.latency)
+            else:
+                self.failed += 1
+            # Sveglia chi attende un buffer libero in `submit`.
+            self.condition.notify_all()
+        if error is None:
+            future.set_result(landmarks)
+        else:
+            future.set_exception(RuntimeError(error))
+
+    def _collect(self):
+        """Thread che riceve i risultati dai processi e completa i Future."""
+        while True:
+            try:
+                message = self.results.get(timeout=WORKER_CHECK_INTERVAL)
+            except queue.Empty:
+                self._check_workers()
+                continue
+            if message is None:
+                break
+            kind, _, batch = message
+            if kind != 'done':
+                continue
+            for job_id, landmarks, error, _ in batch:
+                self._finish(job_id, landmarks, error)
+
+    def _check_workers(self):
+        """Se un processo è morto, i suoi frame non avranno mai risposta: falliscono subito."""
+        for worker, process in enumerate(self.processes):
+            if process.is_alive() or self.closed:
+                continue
+            with self.condition:
+                lost = [job_id for job_id, job in self.jobs.items() if job[3] == worker]
+            for job_id in lost:
+                self._finish(job_id, error=f"Processo di inferenza {worker} terminato "
+                                           f"(codice {process.exitcode})")
+
+    @property
+    def queue_depth(self):
+        """Frame inviati e non ancora completati, su tutto il pool."""
+        with self.condition:
+            return len(self.jobs)
+
+    def stats(self):
+        """Contatori e profondità delle code, ad esempio per un endpoint di monitoraggio."""
+        with self.condition:
+            return {
+                'model': self.model,
+                'workers': self.workers,
+                'slots': self.slots,
+                'queue_depth': len(self.jobs),
+                'worker_depth': list(self.depth),
+                'streams': len(self.stream_workers),
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'rejected': self.rejected,
+                'failed': self.failed,
+                'latency_ms': None if self.latency is None else round(self.latency * 1000, 2),
+            }
+
+    def close(self):
+        """Ferma i processi e libera la memoria condivisa; i frame in sospeso falliscono."""
+        with self.condition:
+            if self.closed:
+                return
+            self.closed = True
+            self.condition.notify_all()
+        for tasks in self.tasks:
+            tasks.put(None)
+        for process in self.processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        collector = getattr(self, 'collector', None)
+        if collector is not None:
+            self.results.put(None)
+            collector.join(timeout=5)
+        with self.condition:
+            pending = list(self.jobs)
+        for job_id in pending:
+            self._finish(job_id, error="Il pool di inferenza è stato chiuso")
+        del self.ring
+        self.shm.close()
+        self.shm.unlink()
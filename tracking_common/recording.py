@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+Registrazione dei landmark in formato colonnare e rilettura con memory-map.
+
+Gli script di tracciamento buttano via i landmark appena il frame è disegnato: una
+sessione non si può analizzare dopo, né si può riprovare la logica dei gesti senza
+rifare i gesti davanti alla telecamera. Questo modulo salva i landmark di ogni frame
+in una cartella di file binari, una colonna per file:
+
+    sessione.landmarks/
+        meta.json        modello, numero di punti, tipi delle colonne, data di inizio...
+        frame.bin        uint32   numero del frame
+        time.bin         float64  secondi dall'inizio della registrazione
+        id.bin           int16    indice della mano (o della persona); -1 = nessun rilevamento
+        landmarks.bin    float32  (punti, 4): x, y, z, visibility
+
+Ogni riga è un rilevamento (una mano in un frame); un frame senza rilevamenti occupa
+comunque una riga con id -1 e landmark NaN, così la rilettura conserva i "vuoti" che
+azzerano lo stato dei gesti. Una riga delle mani occupa 350 byte: un'ora a 30 FPS con
+una mano sono circa 38 MB.
+
+I file non hanno intestazioni: `LandmarkRecording` li apre con `np.memmap`, senza
+leggerli, quindi anche ore di registrazione si "caricano" all'istante e le analisi
+vettoriali di NumPy leggono dal disco solo le pagine che servono.
+
+Esempi (dalla radice del repository):
+    python -m tracking_common.recording sessione.landmarks
+    python -m tracking_common.recording registrazioni/*.landmarks
+"""
+
+import argparse
+import json
+import sys
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+
+# Versione del formato, salvata in meta.json: un lettore futuro può convertire i file vecchi.
+FORMAT_VERSION = 1
+
+# Estensione consigliata per le cartelle delle registrazioni.
+SUFFIX = '.landmarks'
+
+# Punti per rilevamento di ciascun modello di MediaPipe.
+MODEL_POINTS = {
+    'hands': 21,
+    'pose': 33,
+}
+
+# Colonne per punto: x, y, z e visibility (NaN se il modello non la fornisce, come le mani).
+COLUMNS_PER_POINT = 4
+
+# Le colonne e i loro tipi, nell'ordine dei file. Il tempo è float64: in float32, dopo
+# qualche ora di registrazione, la risoluzione scenderebbe sotto il millisecondo.
+COLUMN_DTYPES = {
+    'frame': np.uint32,
+    'time': np.float64,
+    'id': np.int16,
+    'landmarks': np.float32,
+}
+
+# Righe tenute in memoria prima di scriverle su disco (circa 1.4 MB per le mani).
+DEFAULT_CHUNK_ROWS = 4096
+
+
+# --- 1. LA SCRITTURA ---
+
+class LandmarkRecorder:
+    """
+    Aggiunge i landmark di ogni frame a una registrazione su disco.
+
+    Le righe vengono copiate in blocchi di `chunk_rows` righe allocati una volta sola e,
+    quando un blocco è pieno, accodate ai file di ogni colonna con una sola scrittura:
+    `append` non alloca memoria e non tocca il disco a ogni frame.
+
+    Args:
+        path: Cartella della registrazione (creata se non esiste; non deve contenerne già una)
+        model: 'hands' o 'pose' (determina il numero di punti)
+        chunk_rows: Righe per blocco
+        metadata: Dizionario di informazioni aggiuntive salvate in meta.json (es. la sorgente)
+    """
+
+    def __init__(self, path, model='hands', chunk_rows=DEFAULT_CHUNK_ROWS, metadata=None):
+        if model not in MODEL_POINTS:
+            raise ValueError(f"Modello sconosciuto: '{model}' (disponibili: {', '.join(MODEL_POINTS)})")
+        self.path = Path(path)
+        self.model = model
+        self.points = MODEL_POINTS[model]
+        self.chunk_rows = chunk_rows
+        self.path.mkdir(parents=True, exist_ok=True)
+        if (self.path / 'meta.json').exists():
+            raise FileExistsError(f"{self.path} contiene già una registrazione")
+
+        self.started = time.perf_counter()
+        meta = {
+            'version': FORMAT_VERSION,
+            'model': model,
+            'points': self.points,
+            'columns': {name: np.dtype(dtype).str for name, dtype in COLUMN_DTYPES.items()},
+            'started': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'metadata': metadata or {},
+        }
+        (self.path / 'meta.json').write_text(json.dumps(meta, indent=2))
+
+        shapes = {'landmarks': (self.points, COLUMNS_PER_POINT)}
+        self.chunk = {name: np.empty((chunk_rows, *shapes.get(name, ())), dtype=dtype)
+                      for name, dtype in COLUMN_DTYPES.items()}
+        self.files = {name: open(self.path / f'{name}.bin', 'ab') for name in COLUMN_DTYPES}
+        self.filled = 0      # Righe occupate nel blocco corrente.
+        self.frames = 0      # Frame registrati.
+        self.rows = 0        # Righe registrate (blocco corrente compreso).
+        self.lock = threading.Lock()  # `close` può arrivare da un altro thread (es. atexit).
+        self.closed = False
+
+    def append(self, landmarks, timestamp=None):
+        """
+        Registra i rilevamenti di un frame.
+
+        Dopo `close` non fa nulla: chi registra da un thread può ancora chiamarla mentre
+        il programma si chiude (es. `close` registrato con atexit).
+
+        Args:
+            landmarks: Array (rilevamenti, punti, 3 o 4), es. da gestures.landmarks_to_array;
+                senza la quarta colonna la visibility viene salvata come NaN
+            timestamp: Secondi dall'inizio della registrazione (None = adesso)
+        """
+        landmarks = np.asarray(landmarks)
+        if landmarks.ndim != 3 or landmarks.shape[1] != self.points \
+                or landmarks.shape[2] not in (3, COLUMNS_PER_POINT):
+            raise ValueError(f"Landmark di forma {landmarks.shape}: attesa (n, {self.points}, 3 o 4)")
+        if timestamp is None:
+            timestamp = time.perf_counter() - self.started
+        count = len(landmarks)
+        rows = max(count, 1)
+        if rows > self.chunk_rows:
+            raise ValueError(f"{count} rilevamenti in un frame: il blocco ne contiene {self.chunk_rows}")
+
+        with self.lock:
+            if self.closed:
+                return
+            if self.filled + rows > self.chunk_rows:
+                self._write_chunk()
+            rows_slice = slice(self.filled, self.filled + rows)
+            self.chunk['frame'][rows_slice] = self.frames
+            self.chunk['time'][rows_slice] = timestamp
+            if count:
+                self.chunk['id'][rows_slice] = np.arange(count)
+                columns = landmarks.shape[2]
+                self.chunk['landmarks'][rows_slice, :, :columns] = landmarks
+                if columns < COLUMNS_PER_POINT:
+                    self.chunk['landmarks'][rows_slice, :, columns:] = np.nan
+            else:
+                self.chunk['id'][rows_slice] = -1
+                self.chunk['landmarks'][rows_slice] = np.nan
+            self.filled += rows
+            self.rows += rows
+            self.frames += 1
+
+    def _write_chunk(self):
+        """Accoda il blocco corrente ai file delle colonne (da chiamare con il lock)."""
+        if not self.filled:
+            return
+        for name, data in self.chunk.items():
+            self.files[name].write(data[:self.filled].tobytes())
+            self.files[name].flush()
+        self.filled = 0
+
+    def flush(self):
+        """Scrive su disco le righe ancora in memoria (es. prima di rileggere la registrazione)."""
+        with self.lock:
+            if not self.closed:
+                self._write_chunk()
+
+    def close(self):
+        with self.lock:
+            if self.closed:
+                return
+            self._write_chunk()
+            for file in self.files.values():
+                file.close()
+            self.closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+# --- 2. LA LETTURA ---
+
+class LandmarkRecording:
+    """
+    Una registrazione aperta in sola lettura con memory-map.
+
+    Le colonne sono array NumPy (di sola lettura) lunghi quanto le righe:
+    - frame (uint32), time (float64), id (int16, -1 = frame senza rilevamenti);
+    - landmarks (float32) di forma (righe, punti, 4).
+    Si possono usare direttamente nelle operazioni vettoriali, es. la velocità media del
+    polso: `np.diff(rec.landmarks[rec.detected, 0, :2], axis=0)`.
+
+    Si può aprire anche una registrazione ancora in corso: vengono lette le righe già
+    scritte su disco, fino all'ultima completa in tutte le colonne.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.meta = json.loads((self.path / 'meta.json').read_text())
+        if self.meta['version'] > FORMAT_VERSION:
+            raise ValueError(f"{self.path}: formato versione {self.meta['version']}, "
+                             f"questo lettore arriva alla {FORMAT_VERSION}")
+        self.model = self.meta['model']
+        self.points = self.meta['points']
+        self.metadata = self.meta.get('metadata', {})
+
+        shapes = {'landmarks': (self.points, COLUMNS_PER_POINT)}
+        dtypes = {name: np.dtype(dtype) for name, dtype in self.meta['columns'].items()}
+        row_bytes = {name: dtype.itemsize * int(np.prod(shapes.get(name, ())))
+                     for name, dtype in dtypes.items()}
+        # Con un'interruzione durante una scrittura le colonne possono avere lunghezze
+        # diverse: si tengono solo le righe presenti in tutte.
+        self.rows = min((self.path / f'{name}.bin').stat().st_size // row_bytes[name] for name in dtypes)
+        for name, dtype in dtypes.items():
+            shape = (self.rows, *shapes.get(name, ()))
+            if self.rows:
+                column = np.memmap(self.path / f'{name}.bin', dtype=dtype, mode='r', shape=shape)
+            else:
+                column = np.empty(shape, dtype=dtype)  # np.memmap non accetta file vuoti.
+            setattr(self, name, column)
+        self._starts = None
+
+    def __len__(self):
+        return self.rows
+
+    @property
+    def detected(self):
+        """Maschera booleana delle righe con un rilevamento (esclude i frame vuoti)."""
+        return self.id >= 0
+
+    @property
+    def starts(self):
+        """Indice della prima riga di ogni frame, più la fine (calcolato una volta sola)."""
+        if self._starts is None:
+            changes = np.flatnonzero(self.frame[1:] != self.frame[:-1]) + 1
+            self._starts = np.concatenate(([0], changes, [self.rows])) if self.rows else np.zeros(1, np.intp)
+        return self._starts
+
+    @property
+    def frame_count(self):
+        return len(self.starts) - 1
+
+    @property
+    def duration(self):
+        """Secondi tra il primo e l'ultimo frame registrato."""
+        return float(self.time[-1] - self.time[0]) if self.rows else 0.0
+
+    def frames(self, columns=3):
+        """
+        Rilegge la registrazione frame per frame, alla massima velocità.
+
+        Args:
+            columns: 3 per (x, y, z), come li usa gestures.GestureEngine; 4 per avere anche la visibility
+
+        Yields:
+            (tempo, landmark) con i landmark di forma (rilevamenti, punti, columns). Sono
+            viste sui file mappati, non copie: vanno copiate se servono dopo il frame.
+        """
+        starts = self.starts
+        for start, end in zip(starts[:-1], starts[1:]):
+            if self.id[start] < 0:
+                end = start  # Frame senza rilevamenti: forma (0, punti, columns).
+            yield float(self.time[start]), self.landmarks[start:end, :, :columns]
+
+    def summary(self):
+        hands = self.id[self.detected]
+        return {
+            'model': self.model,
+            'started': self.meta['started'],
+            'frames': self.frame_count,
+            'rows': self.rows,
+            'duration_s': round(self.duration, 2),
+            'fps': round((self.frame_count - 1) / self.duration, 1) if self.duration else None,
+            'frames_with_detections': int(len(np.unique(self.frame[self.detected]))),
+            'max_detections': int(hands.max()) + 1 if len(hands) else 0,
+            'size_mb': round(sum(f.stat().st_size for f in self.path.glob('*.bin')) / 1e6, 2),
+            'metadata': self.metadata,
+        }
+
+
+# --- 3. RIGA DI COMANDO: RIEPILOGO DELLE REGISTRAZIONI ---
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Riepilogo di una o più registrazioni di landmark.",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__.split('Esempi', 1)[1].join(('Esempi', '')),
+    )
+    parser.add_argument('paths', nargs='+', help="Cartelle delle registrazioni")
+    args = parser.parse_args()
+
+    for path in args.paths:
+        try:
+            recording = LandmarkRecording(path)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"[ERRORE] {path}: {e}")
+            continue
+        print(f"[REGISTRAZIONE] {path}")
+        for key, value in recording.summary().items():
+            print(f"  {key:<24}{value}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
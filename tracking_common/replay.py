@@ -0,0 +1,284 @@
+# --- SORGENTI VIDEO SENZA WEBCAM: FILE REGISTRATI E FRAME SINTETICI ---
+#
+# Gli script di tracciamento leggono dalla webcam, che sulle macchine di CI (o su un
+# portatile in treno) non c'è. Le sorgenti di questo modulo hanno la stessa interfaccia
+# di `capture.Camera` (`read(out=None)`, `isOpened()`, `describe()`, `release()`), quindi
+# possono sostituirla ovunque:
+#
+# - ReplaySource: rilegge un video registrato (anche in loop);
+# - SyntheticSource: genera frame artificiali (una forma che si muove su uno sfondo
+#   rumoroso), deterministici e senza alcun file;
+# - StreamSource: legge un flusso di rete (es. una telecamera IP via RTSP) e si
+#   riconnette da sola se il flusso si interrompe.
+#
+# Le sorgenti registrate e sintetiche possono produrre i frame alla massima velocità
+# possibile (per i benchmark) oppure a una frequenza fissa, come farebbe una webcam vera.
+
+import time
+
+import cv2
+import numpy as np
+
+from .capture import Camera, DEFAULT_WIDTH, DEFAULT_HEIGHT, DEFAULT_FPS, DEFAULT_FOURCC
+
+
+# Prefisso che in `open_source` identifica la sorgente sintetica, es. 'synthetic:1280x720'.
+SYNTHETIC = 'synthetic'
+
+# Schemi degli URL trattati come flussi dal vivo (StreamSource) invece che come file.
+STREAM_SCHEMES = ('rtsp://', 'rtsps://', 'rtmp://', 'http://', 'https://', 'udp://', 'tcp://')
+
+# Secondi di attesa prima di riaprire un flusso interrotto (e durata delle interruzioni simulate).
+RECONNECT_DELAY = 2.0
+
+
+class FramePacer:
+    """
+    Regola la frequenza di una sorgente: `wait()` attende l'istante del frame successivo.
+
+    Con fps=None non attende mai (velocità massima). Se la sorgente è in ritardo non
+    recupera i frame persi con una raffica, ma riparte dall'istante corrente.
+    """
+
+    def __init__(self, fps=None):
+        self.interval = 1.0 / fps if fps else 0.0
+        self.next_time = None
+
+    def wait(self):
+        if not self.interval:
+            return
+        now = time.perf_counter()
+        if self.next_time is None or now - self.next_time > self.interval:
+            self.next_time = now
+        elif self.next_time > now:
+            time.sleep(self.next_time - now)
+        self.next_time += self.interval
+
+
+class ReplaySource:
+    """
+    Rilegge un file video come se fosse una webcam.
+
+    Args:
+        path: Percorso del video (o qualsiasi URL che OpenCV sa aprire)
+        fps: Frame al secondo da rispettare (None = velocità massima, 0 = FPS del file)
+        loop: Se True, a fine video riparte dall'inizio
+        max_frames: Numero massimo di frame da produrre (None = senza limite)
+    """
+
+    def __init__(self, path, fps=None, loop=False, max_frames=None):
+        self.source = str(path)
+        self.capture = cv2.VideoCapture(self.source)
+        if fps == 0:
+            fps = self.capture.get(cv2.CAP_PROP_FPS) or DEFAULT_FPS
+        self.fps = fps
+        self.loop = loop
+        self.max_frames = max_frames
+        self.frames_read = 0
+        self.pacer = FramePacer(fps)
+
+    def describe(self):
+        width = int(self.capture.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(self.capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        total = int(self.capture.get(cv2.CAP_PROP_FRAME_COUNT))
+        rate = f"{self.fps:.0f} FPS" if self.fps else "velocità massima"
+        loop = ", in loop" if self.loop else ""
+        return f"Video {self.source}: {width}x{height}, {total} frame, {rate}{loop}"
+
+    def isOpened(self):
+        return self.capture.isOpened()
+
+    def read(self, out=None):
+        """Il frame BGR successivo (scritto in `out` se possibile), o None a fine video."""
+        if self.max_frames is not None and self.frames_read >= self.max_frames:
+            return None
+        self.pacer.wait()
+        success, frame = self.capture.read(out)
+        if not success and self.loop and self.frames_read > 0:
+            self.capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            success, frame = self.capture.read(out)
+        if not success:
+            return None
+        self.frames_read += 1
+        return frame
+
+    def release(self):
+        self.capture.release()
+
+
+class SyntheticSource:
+    """
+    Genera frame BGR artificiali: un cerchio che descrive un'ellisse su uno sfondo rumoroso.
+
+    I frame sono sempre gli stessi a parità di `seed`, quindi due esecuzioni di un
+    benchmark elaborano esattamente le stesse immagini. MediaPipe non ci troverà mani o
+    pose: il costo misurato è quello del rilevamento sul frame intero, che è il caso
+    peggiore (senza tracciamento tra un frame e l'altro).
+
+    Args:
+        width, height: Risoluzione dei frame
+        fps: Frame al secondo da rispettare (None = velocità massima)
+        max_frames: Numero di frame da produrre (None = infiniti)
+        seed: Seme del generatore dello sfondo
+    """
+
+    def __init__(self, width=DEFAULT_WIDTH, height=DEFAULT_HEIGHT, fps=None, max_frames=None, seed=0):
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.max_frames = max_frames
+        self.frames_read = 0
+        self.pacer = FramePacer(fps)
+        # Lo sfondo viene generato una volta sola: ogni frame costa una copia e un cerchio,
+        # così la "lettura" non pesa sulle misure delle fasi successive.
+        rng = np.random.default_rng(seed)
+        self.background = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+        self.background = cv2.GaussianBlur(self.background, (0, 0), 3)
+
+    def describe(self):
+        rate = f"{self.fps:.0f} FPS" if self.fps else "velocità massima"
+        total = self.max_frames if self.max_frames is not None else "infiniti"
+        return f"Sorgente sintetica: {self.width}x{self.height}, {total} frame, {rate}"
+
+    def isOpened(self):
+        return True
+
+    def read(self, out=None):
+        """Il frame BGR successivo (scritto in `out` se ha la forma giusta), o None alla fine."""
+        if self.max_frames is not None and self.frames_read >= self.max_frames:
+            return None
+        self.pacer.wait()
+        if out is None or out.shape != self.background.shape:
+            out = np.empty_like(self.background)
+        np.copyto(out, self.background)
+        angle = self.frames_read * 0.05
+        center = (int(self.width * (0.5 + 0.3 * np.cos(angle))),
+                  int(self.height * (0.5 + 0.3 * np.sin(angle))))
+        cv2.circle(out, center, min(self.width, self.height) // 8, (60, 170, 230), -1)
+        self.frames_read += 1
+        return out
+
+    def release(self):
+        pass
+
+
+class StandInSource(SyntheticSource):
+    """
+    Una sorgente sintetica al posto di un flusso di rete (vedi `open_source`).
+
+    Con `drop_every` simula anche le interruzioni della rete: ogni `drop_every` frame la
+    lettura si blocca per `drop_seconds` secondi, come StreamSource mentre si riconnette.
+    Così si verifica senza telecamere IP che chi legge sopravviva alle riconnessioni.
+    """
+
+    def __init__(self, url, width=DEFAULT_WIDTH, height=DEFAULT_HEIGHT, fps=DEFAULT_FPS, max_frames=None,
+                 drop_every=None, drop_seconds=RECONNECT_DELAY):
+        # Il seme dipende dall'URL: telecamere diverse mostrano sfondi diversi.
+        super().__init__(width, height, fps=fps, max_frames=max_frames, seed=sum(url.encode()))
+        self.url = url
+        self.drop_every = drop_every
+        self.drop_seconds = drop_seconds
+        self.reconnections = 0
+
+    def describe(self):
+        drops = f", interruzione di {self.drop_seconds:.0f} s ogni {self.drop_every} frame" if self.drop_every else ""
+        return f"Sostituto locale di {self.url}: {self.width}x{self.height} @ {self.fps:.0f} FPS{drops}"
+
+    def read(self, out=None):
+        if self.drop_every and self.frames_read and self.frames_read % self.drop_every == 0:
+            time.sleep(self.drop_seconds)
+            self.reconnections += 1
+        return super().read(out)
+
+
+class StreamSource:
+    """
+    Un flusso video di rete (RTSP, HTTP, ...), che si riconnette se si interrompe.
+
+    A differenza di un file, un flusso dal vivo detta da solo la propria frequenza, quindi
+    non viene regolato con FramePacer. Se una lettura fallisce, la connessione viene
+    riaperta fino a `max_retries` volte di fila, a `reconnect_delay` secondi l'una
+    dall'altra; solo dopo `read()` restituisce None.
+
+    Args:
+        url: Indirizzo del flusso, es. 'rtsp://192.168.1.20:554/stream1'
+        reconnect_delay: Secondi di attesa prima di ogni tentativo di riconnessione
+        max_retries: Tentativi consecutivi prima di arrendersi
+    """
+
+    def __init__(self, url, reconnect_delay=RECONNECT_DELAY, max_retries=5):
+        self.source = url
+        self.reconnect_delay = reconnect_delay
+        self.max_retries = max_retries
+        self.reconnections = 0
+        self.frames_read = 0
+        self.capture = self._open()
+
+    def _open(self):
+        capture = cv2.VideoCapture(self.source)
+        # Con il backend FFmpeg riduce il ritardo accumulato nel buffer di ricezione.
+        capture.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        return capture
+
+    def describe(self):
+        width = int(self.capture.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(self.capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        fps = self.capture.get(cv2.CAP_PROP_FPS)
+        return f"Flusso {self.source}: {width}x{height} @ {fps:.0f} FPS"
+
+    def isOpened(self):
+        return self.capture.isOpened()
+
+    def read(self, out=None):
+        """Il frame BGR successivo, o None se il flusso non riparte dopo `max_retries` tentativi."""
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                time.sleep(self.reconnect_delay)
+                self.capture.release()
+                self.capture = self._open()
+                self.reconnections += 1
+            success, frame = self.capture.read(out)
+            if success:
+                self.frames_read += 1
+                return frame
+        return None
+
+    def release(self):
+        self.capture.release()
+
+
+def open_source(spec, width=DEFAULT_WIDTH, height=DEFAULT_HEIGHT, fps=DEFAULT_FPS,
+                fourcc=DEFAULT_FOURCC, replay_fps=None, loop=False, max_frames=None,
+                stand_in=False, drop_every=None):
+    """
+    Apre la sorgente descritta da `spec`:
+
+    - un numero (o una stringa di sole cifre): la webcam con quell'indice (`Camera`);
+    - 'synthetic' o 'synthetic:LARGHEZZAxALTEZZA': frame sintetici (`SyntheticSource`);
+    - un URL di rete (rtsp://, http://, ...): un flusso dal vivo (`StreamSource`);
+    - qualsiasi altra stringa: un file video (`ReplaySource`).
+
+    `width`, `height`, `fps` e `fourcc` valgono per la webcam (e la risoluzione anche per
+    la sorgente sintetica); `replay_fps`, `loop` e `max_frames` per le sorgenti registrate
+    e sintetiche (replay_fps=None = velocità massima).
+
+    Con `stand_in=True` gli URL di rete vengono sostituiti da una sorgente sintetica locale
+    a `fps` frame al secondo: si può provare una configurazione con telecamere IP senza
+    averle (o senza un server RTSP) a disposizione; con `drop_every` il sostituto si
+    interrompe ogni `drop_every` frame per RECONNECT_DELAY secondi, come un flusso che si riconnette.
+    """
+    if isinstance(spec, int) or str(spec).isdigit():
+        return Camera(int(spec), width, height, fps, fourcc)
+    spec = str(spec)
+    if spec.lower().startswith(STREAM_SCHEMES):
+        if stand_in:
+            return StandInSource(spec, width, height, fps=fps, max_frames=max_frames, drop_every=drop_every)
+        return StreamSource(spec)
+    if spec == SYNTHETIC or spec.startswith(SYNTHETIC + ':'):
+        if ':' in spec:
+            try:
+                width, height = (int(v) for v in spec.split(':', 1)[1].lower().split('x'))
+            except ValueError:
+                raise ValueError(f"Sorgente sintetica non valida: '{spec}' (atteso es. 'synthetic:1280x720')")
+        return SyntheticSource(width, height, fps=replay_fps, max_frames=max_frames)
+    return ReplaySource(spec, fps=replay_fps, loop=loop, max_frames=max_frames)